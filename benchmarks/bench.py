@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for script generation and the batch runner.
+
+gcsim is replaced by the stand-in in tests/fake_gcsim.py, so these measure the batcher's own costs: how many variants
+per second `gcsim_batcher.generate` produces for large test matrices, and how much time `gcsim_batcher.run` adds per
+config and how well it scales with --jobs when each sim takes a fixed amount of time.
+
+Results are written as JSON (to stdout, or to --output). Pass --compare with a previous run's JSON to flag anything
+that got more than --tolerance worse.
+
+    uv run benchmarks/bench.py --output bench.json
+    uv run benchmarks/bench.py --compare bench.json
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+import gcsim
+
+from gcsim_batcher.config import Test
+from gcsim_batcher.generate import ScriptTemplate, multi_variants, write_variants
+from gcsim_batcher.run import RunOptions, run_batch
+
+
+ROOT = Path(__file__).parent.parent
+FAKE_GCSIM = ROOT / "tests" / "fake_gcsim.py"
+BASE_SCRIPT = ROOT / "tests" / "ChevSaraBen.txt"
+
+CHARACTERS = ["bennett", "chevreuse", "sara", "beidou"]
+ARTIFACT_SETS = [["no"], ["esf"], ["gt"], ["cw"], ["no", "esf"], ["gt", "cw"], ["no", "gt"], ["esf", "cw"]]
+
+
+def _matrix(weapons: int) -> list[Test]:
+    """
+    A test matrix with a weapon test and an artifact test for every character.
+    """
+    config = []
+    for character in CHARACTERS:
+        config.append(Test(character, Test.WeaponTest(artifact_set=None,
+                                                      weapons=[f"weapon{i}" for i in range(weapons)])))
+        config.append(Test(character, Test.ArtifactTest(weapon_name="weapon0", artifact_sets=ARTIFACT_SETS)))
+    return config
+
+
+def bench_generate(weapons: int, write: bool) -> dict:
+    template = ScriptTemplate.from_file(BASE_SCRIPT)
+    config = _matrix(weapons)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        variants = multi_variants(template, BASE_SCRIPT, config, Path(directory), Path(directory))
+        count = sum(1 for _ in (write_variants(variants) if write else variants))
+        elapsed = time.perf_counter() - start
+    return {
+        "name": f"generate_{'write' if write else 'memory'}",
+        "params": {"weapons": weapons, "variants": count},
+        "value": count / elapsed,
+        "unit": "variants/s",
+        "higher_is_better": True,
+    }
+
+
+def _write_configs(directory: Path, count: int) -> list[Path]:
+    template = ScriptTemplate.from_file(BASE_SCRIPT)
+    configs = []
+    for i in range(count):
+        config = directory / f"config_{i}.txt"
+        config.write_text(f"# fake_dps={1000 + i}\n" + template.render())
+        configs.append(config)
+    return configs
+
+
+def bench_run(configs: int, jobs: int, delay: float) -> dict:
+    """
+    Time a batch in which each gcsim call takes `delay` seconds. Each config makes two calls (optimize, then sim).
+    """
+    with tempfile.TemporaryDirectory() as directory, contextlib.chdir(directory):
+        paths = _write_configs(Path(directory), configs)
+        os.environ["FAKE_GCSIM_DELAY"] = str(delay)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sys.stderr):
+            run_batch(paths, Path(directory) / "out.csv", jobs=jobs, options=RunOptions())
+        elapsed = time.perf_counter() - start
+
+    ideal = 2 * delay * configs / jobs
+    return {
+        "name": "run",
+        "params": {"configs": configs, "jobs": jobs, "delay": delay},
+        "value": elapsed / configs,
+        "unit": "s/config",
+        "higher_is_better": False,
+        "overhead_per_config": (elapsed - ideal) * jobs / configs,
+        "efficiency": ideal / elapsed if elapsed else 0,
+    }
+
+
+def run_all(quick: bool) -> list[dict]:
+    results = []
+    for weapons in ([50] if quick else [50, 500]):
+        for write in (False, True):
+            results.append(bench_generate(weapons, write))
+
+    configs = 8 if quick else 32
+    results.append(bench_run(configs, jobs=1, delay=0))
+    for jobs in ([1, 4] if quick else [1, 2, 4, 8]):
+        results.append(bench_run(configs, jobs=jobs, delay=0.1))
+    return results
+
+
+def _key(result: dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """
+    Describe each benchmark that is more than `tolerance` (a fraction) worse than in `baseline`.
+    """
+    previous = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None or not old["value"]:
+            continue
+        change = (result["value"] - old["value"]) / old["value"]
+        if (-change if result["higher_is_better"] else change) > tolerance:
+            regressions.append(f"{result['name']} {result['params']}: {old['value']:.4g} -> {result['value']:.4g} "
+                               f"{result['unit']} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark script generation and the batch runner.")
+    parser.add_argument("--output", help="Write the results here instead of to stdout.", type=Path)
+    parser.add_argument("--compare", help="A previous run's results to check for regressions.", type=Path)
+    parser.add_argument("--tolerance",
+                        help="How much worse (as a fraction) a result may be before it's a regression (default: 0.2).",
+                        type=float,
+                        default=0.2)
+    parser.add_argument("--quick", help="Run smaller benchmarks.", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, force=True)
+    gcsim.gcsim_binary_path = lambda: FAKE_GCSIM
+
+    try:
+        version = metadata.version("gcsim-batcher")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+
+    report = {
+        "version": version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "results": run_all(args.quick),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        regressions = compare(report["results"], json.loads(args.compare.read_text())["results"], args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 import sys
 
-from .util import gcsim as gcsim_command
-
 
 def gcsim():
+    from .util import gcsim as gcsim_command  # Import here so that importing the package stays cheap for the client
     try:
         gcsim_command(*sys.argv[1:])
     except KeyboardInterrupt:
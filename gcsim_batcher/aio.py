@@ -0,0 +1,221 @@
+"""
+An asyncio interface to the batcher, for embedding it in services: configs run as asyncio subprocesses under a
+concurrency limit, and results are delivered through an async iterator as each config finishes.
+
+    async for result in aio.sweep(Path("team.txt"), Path("tests.yaml"), Path("configs"), jobs=8):
+        ...
+"""
+import asyncio
+import logging
+import os
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Sequence
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
+from typing import TextIO
+
+import gcsim as gcsim_module
+
+from .cache import cache_key
+from .generate import manifest_path, multi_variants_from_files, write_variants
+from .optimizer import (open_log, optimize_arguments, read_viewer, sim_arguments, start_result, substats_optimized,
+                        truncate_log)
+from .results import DPSSummary, OptimizerResult, parse_summary_line
+from .run import RunOptions, cache_arguments, cache_result
+from .schedule import CpuAllocation, available_cores, plan
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_gcsim(args: Sequence[str],
+                     log_file: TextIO | None,
+                     processes: asyncio.Semaphore,
+                     allocation: CpuAllocation) -> tuple[int, DPSSummary | None]:
+    """
+    Like `optimizer._run_gcsim`, but as an asyncio subprocess that holds one of `processes` while it runs. If the
+    calling task is cancelled, gcsim is killed.
+    """
+    async with processes:
+        process = await asyncio.create_subprocess_exec(gcsim_module.gcsim_binary_path(), *args,
+                                                       stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.STDOUT,
+                                                       env=allocation.environment())
+        try:
+            summary = None
+            async for raw_line in process.stdout:
+                line = raw_line.decode(errors="ignore")
+                if log_file is not None:
+                    log_file.write(line)
+                summary = parse_summary_line(line) or summary
+            return await process.wait(), summary
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await asyncio.shield(process.wait())
+
+
+@asynccontextmanager
+async def _open_log(log_directory: Path | None, config_file: Path, mode: str) -> AsyncIterator[TextIO | None]:
+    """
+    `optimizer.open_log`, opened and closed in a worker thread so that the event loop never waits on the disk.
+    """
+    context = open_log(log_directory, config_file, mode)
+    log_file = await asyncio.to_thread(context.__enter__)
+    try:
+        yield log_file
+    finally:
+        await asyncio.to_thread(context.__exit__, None, None, None)
+
+
+# The `RunOptions` that only apply to `run.run_batch`'s batches
+_UNSUPPORTED_OPTIONS = ("precision", "substat_memo", "memory_budget", "memory_reserve", "tracer", "store", "progress",
+                        "history", "pin_cores")
+
+
+def _check_options(options: RunOptions):
+    unsupported = [name for name in _UNSUPPORTED_OPTIONS if getattr(options, name) not in (None, False)]
+    if unsupported:
+        raise ValueError(f"Options not supported by the asyncio API: {', '.join(unsupported)}")
+
+
+async def run_config(config_file: Path,
+                     options: RunOptions = RunOptions(),
+                     processes: asyncio.Semaphore | None = None,
+                     threads: int = 1) -> OptimizerResult:
+    """
+    Run both optimizer phases for one config, like `run.run_locally`, with each gcsim process holding one of
+    `processes` and using up to `threads` threads. `options.cache` is used as in `run.run_config`; the options that
+    only apply to whole batches (precision targets, substat reuse, memory limits, tracing, the store, progress,
+    duration history and core pinning) are not supported here, and raise a `ValueError` if set. Note that
+    `run.run_options` sets some of them by default.
+    """
+    _check_options(options)
+    processes = processes or asyncio.Semaphore(1)
+    allocation = CpuAllocation(threads)
+    key = None
+    if options.cache is not None:
+        key = cache_key(await asyncio.to_thread(Path(config_file).read_text), cache_arguments(options))
+        result = await asyncio.to_thread(options.cache.get, key, config_file)
+        if result is not None:
+            return result
+
+    result = await asyncio.to_thread(start_result, config_file, options.viewer_json_directory)
+    if not (options.substats_optimized or await asyncio.to_thread(substats_optimized, result.config_file)):
+        async with _open_log(options.log_directory, result.config_file, 'w') as log_file:
+            start = time.perf_counter()
+            result.returncode, _ = await _run_gcsim(optimize_arguments(result.config_file), log_file, processes,
+                                                    allocation)
+            result.optimize_seconds = time.perf_counter() - start
+        if result.returncode != 0:
+            logger.error("Substat optimization for %s failed with exit code %d", result.name, result.returncode)
+            return result
+    else:
+        await asyncio.to_thread(truncate_log, options.log_directory, result.config_file)
+
+    async with _open_log(options.log_directory, result.config_file, 'a') as log_file:
+        start = time.perf_counter()
+        result.returncode, result.summary = await _run_gcsim(
+            sim_arguments(result, options.additional_arguments, options.compress_viewer), log_file, processes,
+            allocation)
+        result.sim_seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        logger.error("Sim for %s failed with exit code %d", result.name, result.returncode)
+        return result
+
+    await asyncio.to_thread(read_viewer, result)
+    if options.cache is not None:
+        await asyncio.to_thread(cache_result, options, key, config_file, result)
+    return result
+
+
+async def _aiter(configs: Iterable[Path] | AsyncIterable[Path]) -> AsyncIterator[Path]:
+    """
+    Iterate over `configs`, pulling from a plain iterable (such as a generator writing variants) in a worker thread.
+    """
+    if isinstance(configs, AsyncIterable):
+        async for config in configs:
+            yield config
+        return
+
+    iterator = iter(configs)
+    exhausted = object()
+    while (config := await asyncio.to_thread(next, iterator, exhausted)) is not exhausted:
+        yield config
+
+
+async def run_batch(configs: Iterable[Path] | AsyncIterable[Path],
+                    jobs: int | None = None,
+                    options: RunOptions = RunOptions(),
+                    processes: asyncio.Semaphore | None = None) -> AsyncIterator[OptimizerResult]:
+    """
+    Run the optimizer on `configs`, yielding each config's result as soon as it finishes (so not necessarily in
+    order). A config that fails yields a result with a non-zero `returncode` rather than stopping the batch.
+
+    Up to `jobs` gcsim processes run at once (by default one per core, each with the threads from `schedule.plan`).
+    Pass the same `processes` semaphore to several batches to share one limit between them instead, e.g. for several
+    users' batches in one event loop.
+
+    Configs are only taken from `configs` while fewer than `jobs` are in flight, so that a config that has started
+    keeps its process for both phases, and no more are started while the consumer isn't asking for results, so a slow
+    consumer holds the batch back rather than letting finished results pile up. Closing the iterator (or cancelling
+    the task consuming it) kills the running gcsim processes.
+
+    Raises `ValueError` for the same unsupported options as `run_config`.
+    """
+    _check_options(options)
+    cores = available_cores()
+    jobs, threads = plan(len(cores), jobs, options.threads)
+    processes = processes or asyncio.Semaphore(jobs)
+    in_flight: set[asyncio.Task] = set()
+
+    async def run(config: Path) -> OptimizerResult:
+        try:
+            return await run_config(config, options, processes, threads)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error('Config %s failed: %s', config, e)
+            return OptimizerResult(config_file=Path(config), returncode=-1)
+
+    try:
+        async for config in _aiter(configs):
+            while len(in_flight) >= jobs:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    in_flight.discard(task)
+                    yield task.result()
+            in_flight.add(asyncio.create_task(run(config)))
+            for task in [task for task in in_flight if task.done()]:
+                in_flight.discard(task)
+                yield task.result()
+
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                in_flight.discard(task)
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+async def sweep(script_file: Path | Sequence[Path],
+                test_configuration_file: Path,
+                output_directory: Path,
+                jobs: int | None = None,
+                options: RunOptions = RunOptions(),
+                processes: asyncio.Semaphore | None = None) -> AsyncIterator[OptimizerResult]:
+    """
+    Generate the variants of `script_file` (one or more base scripts) described by `test_configuration_file` into
+    `output_directory`, and run them with `run_batch` as they are generated.
+    """
+    await asyncio.to_thread(os.makedirs, output_directory, exist_ok=True)
+    # Both are lazy: the variants are loaded and written as `run_batch` pulls them, in a worker thread
+    variants = multi_variants_from_files(script_file, test_configuration_file, output_directory)
+    configs = write_variants(variants, manifest_path(output_directory, script_file, test_configuration_file))
+    async with aclosing(run_batch(configs, jobs, options, processes)) as results:
+        async for result in results:
+            yield result
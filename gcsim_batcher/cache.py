@@ -0,0 +1,141 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections.abc import Sequence
+from dataclasses import asdict
+from pathlib import Path
+
+import gcsim as gcsim_module
+
+from .results import CharacterStats, DPSSummary, OptimizerResult
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CACHE_DIRECTORY = Path(os.getenv("GCSIM_BATCHER_CACHE_DIR") or Path.home() / ".cache" / "gcsim-batcher")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=8)
+def _file_digest(path: Path, size: int, mtime_ns: int) -> str:
+    # `size` and `mtime_ns` are only here so that a replaced binary gets a new cache entry.
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def binary_digest() -> str:
+    """
+    A digest of the gcsim binary in use, so that upgrading gcsim invalidates cached results.
+    """
+    path = Path(gcsim_module.gcsim_binary_path())
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return f"missing:{path}"
+    return _file_digest(path, stat.st_size, stat.st_mtime_ns)
+
+
+def script_digest(config_text: str) -> str:
+    """
+    A hash of a config's text that ignores differences gcsim doesn't see: line endings, trailing whitespace and blank
+    lines.
+    """
+    lines = (line.rstrip() for line in config_text.splitlines())
+    return hashlib.sha256('\n'.join(line for line in lines if line).encode('utf-8')).hexdigest()
+
+
+def cache_key(config_text: str, additional_arguments: Sequence[str] = ()) -> str:
+    """
+    The cache key for a config: a hash of its text, the gcsim binary, and the optimizer arguments.
+    """
+    digest = hashlib.sha256()
+    for part in (config_text, binary_digest(), *additional_arguments):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    A persistent, content-addressed store of optimizer results. Each entry is a small JSON file holding the DPS
+    summary and per-character stats; once the entries exceed `max_bytes`, the least recently used are evicted.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str, config_file: Path) -> OptimizerResult | None:
+        """
+        Look up a result, returning it as if `config_file` had just been run, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning('Discarding unreadable cache entry %s: %s', path, e)
+            path.unlink(missing_ok=True)
+            return None
+
+        path.touch()  # Mark as recently used
+        return OptimizerResult(config_file=Path(config_file),
+                               returncode=0,
+                               summary=DPSSummary(**data['summary']),
+                               characters=[CharacterStats(**c) for c in data['characters']],
+                               team=data.get('team'),
+                               iterations=data.get('iterations'),
+                               cached=True)
+
+    def put(self, key: str, result: OptimizerResult):
+        """
+        Store a successful result. Failed results are never cached.
+        """
+        if not result.ok:
+            return
+
+        data = {'summary': asdict(result.summary),
+                'characters': [asdict(c) for c in result.characters],
+                'team': result.team,
+                'iterations': result.iterations}
+        path = self._path(key)
+        temporary_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        with open(temporary_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in `max_bytes`.
+        """
+        with self._lock:
+            entries = []
+            for path in self.directory.glob('*.json'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                logger.debug('Evicting cache entry %s', path)
+                path.unlink(missing_ok=True)
+                total -= size
@@ -0,0 +1,104 @@
+"""
+Console entry points that hand their command line to a running `gcsim-batcher-daemon` if there is one, and otherwise
+run the command here. This module only imports the standard library, so forwarding a command costs little more than
+starting the interpreter.
+"""
+import importlib
+import json
+import os
+import socket
+import struct
+import sys
+
+
+# Each response frame is a stream number and a payload length; the exit frame carries the exit code instead
+FRAME_HEADER = struct.Struct(">Bi")
+STDOUT, STDERR, EXIT = 1, 2, 0
+
+COMMANDS = {
+    "gcsim": "gcsim_batcher:gcsim",
+    "gcsim-generate-batch": "gcsim_batcher.generate:main",
+    "gcsim-optimizer": "gcsim_batcher.optimizer:main",
+    "gcsim-run-batch": "gcsim_batcher.run:main",
+    "gcsim-sweep": "gcsim_batcher.sweep:main",
+}
+
+
+def socket_path() -> str:
+    """
+    Where the daemon listens: $GCSIM_BATCHER_SOCKET, or a per-user socket in the runtime (or temporary) directory.
+    """
+    if os.getenv("GCSIM_BATCHER_SOCKET"):
+        return os.environ["GCSIM_BATCHER_SOCKET"]
+    directory = os.getenv("XDG_RUNTIME_DIR") or os.getenv("TMPDIR") or "/tmp"
+    return os.path.join(directory, f"gcsim-batcher-{os.getuid()}.sock")
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes | None:
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def forward(command: str, argv: list[str], path: str | None = None) -> int | None:
+    """
+    Run `command` with `argv` in the daemon, streaming its output to this process's stdout and stderr, and return
+    its exit code. Returns None if no daemon is running (or $GCSIM_BATCHER_NO_DAEMON is set).
+    """
+    if os.name != 'posix' or os.getenv("GCSIM_BATCHER_NO_DAEMON"):
+        return None
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None
+
+    streams = {STDOUT: sys.stdout.buffer, STDERR: sys.stderr.buffer}
+    with connection:
+        request = {"command": command, "argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        try:
+            while True:
+                header = _receive_exactly(connection, FRAME_HEADER.size)
+                if header is None:
+                    print("gcsim-batcher: lost connection to the daemon", file=sys.stderr)
+                    return 1
+                stream, value = FRAME_HEADER.unpack(header)
+                if stream == EXIT:
+                    return value
+                data = _receive_exactly(connection, value)
+                if data is None:
+                    continue
+                streams[stream].write(data)
+                streams[stream].flush()
+        except KeyboardInterrupt:
+            # Closing the connection interrupts the command in the daemon
+            return 130
+
+
+def _entry_point(command: str):
+    def main():
+        code = forward(command, sys.argv[1:])
+        if code is not None:
+            sys.exit(code)
+        module, function = COMMANDS[command].split(":")
+        getattr(importlib.import_module(module), function)()
+
+    main.__name__ = command.replace("-", "_")
+    return main
+
+
+gcsim = _entry_point("gcsim")
+generate_batch = _entry_point("gcsim-generate-batch")
+optimizer = _entry_point("gcsim-optimizer")
+run_batch = _entry_point("gcsim-run-batch")
+sweep = _entry_point("gcsim-sweep")
@@ -1,8 +1,11 @@
+import itertools
 import logging
 import os
-from dataclasses import dataclass
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
 from enum import StrEnum
 from pathlib import Path
+from typing import Any, NamedTuple
 
 import yaml
 import yamlcore
@@ -14,6 +17,52 @@ logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO, force=DEBUG)
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_REFINES = (1, 5)
+
+
+def _validate_artifact_set(artifact_set: Sequence[str]):
+    if len(artifact_set) < 1 or len(artifact_set) > 2:
+        raise ValueError(f"Invalid artifact set: {artifact_set}. Must be a single set or a pair of sets.")
+
+
+class Combination(NamedTuple):
+    """
+    One point in a `Test.MatrixTest`: the gear to give `character`. `weapon` and `artifact_set` are None when the
+    matrix leaves them as they are in the script.
+    """
+    character: str
+    weapon: str | None
+    refine: int | None
+    artifact_set: Sequence[str] | None
+
+
+def _matches(combination: Combination, rule: Mapping[str, Any]) -> bool:
+    """
+    Whether `combination` matches every key of an include/exclude rule. `character`, `weapon` and `refine` may be a
+    single value or a list of acceptable values; `artifact_set` may be a set choice (matched regardless of order) or a
+    single set name, which matches any choice containing it.
+    """
+    for key, expected in rule.items():
+        if key == 'artifact_set':
+            actual = combination.artifact_set
+            if actual is None:
+                return False
+            if isinstance(expected, str):
+                if expected not in actual:
+                    return False
+            elif sorted(expected) != sorted(actual):
+                return False
+        elif key in ('character', 'weapon', 'refine'):
+            actual = getattr(combination, key)
+            if isinstance(expected, list) and actual not in expected:
+                return False
+            elif not isinstance(expected, list) and actual != expected:
+                return False
+        else:
+            raise ValueError(f"Invalid matrix filter key: {key}.")
+    return True
+
+
 @dataclass
 class Test:
     """
@@ -25,19 +74,57 @@ class Test:
         weapon_name: str | None
         artifact_sets: list[list[str]]
         output_directory: str | None = None
+        refines: Sequence[int] = DEFAULT_REFINES
         def __post_init__(self):
             logger.debug(f"Creating ArtifactTest with weapon_name={self.weapon_name} and artifact_sets={self.artifact_sets}")
             for artifact_set in self.artifact_sets:
-                if len(artifact_set) < 1 or len(artifact_set) > 2:
-                    raise ValueError(f"Invalid artifact set: {artifact_set}. Must be a single set or a pair of sets.")
+                _validate_artifact_set(artifact_set)
 
     @dataclass
     class WeaponTest:
         artifact_set: list[str] | None
         weapons: list[str]
         output_directory: str | None = None
+        refines: Sequence[int] = DEFAULT_REFINES
 
-    type Test = ArtifactTest | WeaponTest
+    @dataclass
+    class MatrixTest:
+        """
+        Every combination of a character, weapon, refine and artifact set choice, less any excluded by the filters.
+        Leaving out `weapons` or `artifact_sets` keeps the script's own. If `include` is given, only combinations
+        matching at least one of its rules are kept; combinations matching any `exclude` rule are dropped.
+        """
+        characters: list[str]
+        weapons: list[str] | None = None
+        artifact_sets: list[list[str]] | None = None
+        refines: Sequence[int] = DEFAULT_REFINES
+        include: list[dict] = field(default_factory=list)
+        exclude: list[dict] = field(default_factory=list)
+        output_directory: str | None = None
+
+        def __post_init__(self):
+            if not self.characters or not all(self.characters):
+                raise ValueError("A matrix test needs at least one character.")
+            for artifact_set in self.artifact_sets or []:
+                _validate_artifact_set(artifact_set)
+
+        def combinations(self) -> Iterator[Combination]:
+            """
+            Lazily yield the combinations that pass the filters, varying the artifact sets fastest and the character
+            slowest.
+            """
+            weapons: Sequence[str | None] = self.weapons or [None]
+            refines: Sequence[int | None] = self.refines if self.weapons else [None]
+            artifact_sets: Sequence[Sequence[str] | None] = self.artifact_sets or [None]
+            for combination in itertools.starmap(Combination, itertools.product(self.characters, weapons, refines,
+                                                                                artifact_sets)):
+                if self.include and not any(_matches(combination, rule) for rule in self.include):
+                    continue
+                if any(_matches(combination, rule) for rule in self.exclude):
+                    continue
+                yield combination
+
+    type Test = ArtifactTest | WeaponTest | MatrixTest
 
     character: str
     test: Test
@@ -58,10 +145,20 @@ def _config_from_yaml_list(data: list, character: str | None = None) -> list[Tes
             Parse a test configuration from a dictionary.
             """
             output_directory = item.get('output_directory', None)
-            if 'artifact_sets' in item:
-                return Test.ArtifactTest(item['weapon'], item['artifact_sets'], output_directory)
+            refines = item.get('refines', DEFAULT_REFINES)
+            if 'matrix' in item:
+                matrix = item['matrix']
+                return Test.MatrixTest(characters=matrix.get('characters') or [item.get('character', character)],
+                                       weapons=matrix.get('weapons'),
+                                       artifact_sets=matrix.get('artifact_sets'),
+                                       refines=matrix.get('refines', DEFAULT_REFINES),
+                                       include=item.get('include', []),
+                                       exclude=item.get('exclude', []),
+                                       output_directory=output_directory)
+            elif 'artifact_sets' in item:
+                return Test.ArtifactTest(item['weapon'], item['artifact_sets'], output_directory, refines)
             elif 'weapons' in item:
-                return Test.WeaponTest(item['artifact_set'], item['weapons'], output_directory)
+                return Test.WeaponTest(item['artifact_set'], item['weapons'], output_directory, refines)
             else:
                 raise ValueError(f"Invalid test configuration in YAML data: {item}.")
 
@@ -70,6 +167,23 @@ def _config_from_yaml_list(data: list, character: str | None = None) -> list[Tes
     return [_parse_test(item) for item in data]
 
 
+def load_scripts(file: Path) -> list[Path]:
+    """
+    The extra base scripts listed under `scripts` in a YAML test configuration, as paths (or glob patterns) relative
+    to the current directory. Every test is run against each of them as well as the script given on the command line.
+    """
+    if file.suffix != '.yaml' or not file.exists():
+        return []
+    with open(file, 'r') as f:
+        data = yaml.load(f, Loader=yamlcore.CoreLoader)
+    if not isinstance(data, dict):
+        return []
+    scripts = data.get('scripts', [])
+    if not isinstance(scripts, list) or not all(isinstance(script, str) for script in scripts):
+        raise ValueError("`scripts` must be a list of script paths or glob patterns.")
+    return [file.parent / script for script in scripts]
+
+
 def load_config(file: Path,
                 output_directory: Path | None = None,
                 config_type: PlainTextConfigType | None = None,
@@ -0,0 +1,204 @@
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import selectors
+import signal
+import socket
+import socketserver
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+from .client import COMMANDS, EXIT, FRAME_HEADER, STDERR, STDOUT, socket_path
+from .run import default_jobs, share_process_limit
+
+
+logger = logging.getLogger(__name__)
+
+
+# Commands that run gcsim directly rather than through a batch, and so take a slot of the shared limit themselves
+_SINGLE_PROCESS_COMMANDS = {"gcsim", "gcsim-optimizer"}
+
+
+def _run_command(command: str,
+                 argv: list[str],
+                 cwd: str,
+                 env: dict[str, str],
+                 stdout: socket.socket,
+                 stderr: socket.socket,
+                 processes,
+                 initializer: Callable[[], None] | None):
+    """
+    Run a command in a child of the fork server, as if it had been started from the client's shell.
+    """
+    os.dup2(stdout.fileno(), 1)
+    os.dup2(stderr.fileno(), 2)
+    stdout.close()
+    stderr.close()
+    sys.stdout.reconfigure(line_buffering=True)
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(env)
+    if initializer is not None:
+        initializer()
+
+    share_process_limit(processes)
+    sys.argv = [command, *argv]
+    module, function = COMMANDS[command].split(":")
+    main = getattr(importlib.import_module(module), function)
+    if command in _SINGLE_PROCESS_COMMANDS:
+        with processes:
+            main()
+    else:
+        main()
+
+
+class Daemon:
+    """
+    A long-lived server on a Unix socket that runs the batcher's commands for `client.forward`. Commands run in
+    processes forked from a server that has already imported the batcher, and share a limit of `jobs` gcsim
+    processes, so that concurrent commands queue for the CPU rather than oversubscribing it. Their output is streamed
+    back to the client as it is written.
+
+    `initializer` is called in each command's process before it runs.
+    """
+
+    def __init__(self,
+                 path: str | None = None,
+                 jobs: int | None = None,
+                 initializer: Callable[[], None] | None = None):
+        self.path = path or socket_path()
+        self.jobs = jobs or default_jobs()
+        self.initializer = initializer
+        self._context = multiprocessing.get_context("forkserver")
+        self._context.set_forkserver_preload(sorted({target.split(":")[0] for target in COMMANDS.values()}))
+        self._processes = self._context.BoundedSemaphore(self.jobs)
+
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)  # Left behind by a daemon that didn't shut down cleanly
+            else:
+                raise RuntimeError(f"A daemon is already listening on {self.path}")
+            finally:
+                probe.close()
+
+        previous_umask = os.umask(0o177)  # Only this user may connect
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.path, self._handler())
+        finally:
+            os.umask(previous_umask)
+        self._server.daemon_threads = True
+
+    def serve_forever(self):
+        logger.info('Daemon listening on %s with %d gcsim processes', self.path, self.jobs)
+        self._server.serve_forever()
+
+    def shutdown(self):
+        self._server.shutdown()
+
+    def close(self):
+        self._server.server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _handle(self, connection: socket.socket, request: dict):
+        command = request.get("command")
+        if command not in COMMANDS:
+            message = f"gcsim-batcher-daemon: unknown command {command!r}\n".encode()
+            connection.sendall(FRAME_HEADER.pack(STDERR, len(message)) + message + FRAME_HEADER.pack(EXIT, 2))
+            return
+
+        stdout, child_stdout = socket.socketpair()
+        stderr, child_stderr = socket.socketpair()
+        process = self._context.Process(target=_run_command,
+                                        args=(command, request["argv"], request["cwd"], request["env"],
+                                              child_stdout, child_stderr, self._processes, self.initializer))
+        process.start()
+        child_stdout.close()
+        child_stderr.close()
+        logger.info('Started %s %s (pid %d)', command, " ".join(request["argv"]), process.pid)
+
+        selector = selectors.DefaultSelector()
+        selector.register(stdout, selectors.EVENT_READ, STDOUT)
+        selector.register(stderr, selectors.EVENT_READ, STDERR)
+        selector.register(connection, selectors.EVENT_READ, None)
+        client_connected = True
+        open_streams = 2
+
+        def interrupt():
+            nonlocal client_connected
+            if client_connected:
+                logger.info('Client of pid %d went away; interrupting it', process.pid)
+                client_connected = False
+                selector.unregister(connection)
+                os.kill(process.pid, signal.SIGINT)
+
+        while open_streams:
+            for key, _ in selector.select():
+                if key.data is None:
+                    if not connection.recv(1):
+                        interrupt()
+                    continue
+                data = key.fileobj.recv(65536)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+                    open_streams -= 1
+                    continue
+                if client_connected:
+                    try:
+                        connection.sendall(FRAME_HEADER.pack(key.data, len(data)) + data)
+                    except OSError:
+                        interrupt()
+        selector.close()
+
+        process.join()
+        exitcode = process.exitcode if process.exitcode >= 0 else 128 - process.exitcode
+        logger.info('%s (pid %d) exited with %d', command, process.pid, exitcode)
+        if client_connected:
+            connection.sendall(FRAME_HEADER.pack(EXIT, exitcode))
+
+    def _handler(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if line:
+                    daemon._handle(self.connection, json.loads(line))
+
+        return Handler
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, force=True)
+
+    parser = argparse.ArgumentParser(
+        description="Keep gcsim-batcher loaded in the background, so that gcsim, gcsim-generate-batch, "
+                    "gcsim-optimizer, gcsim-run-batch and gcsim-sweep start instantly and share the CPU.")
+    parser.add_argument("--socket", help=f"The Unix socket to listen on (default: {socket_path()}).")
+    parser.add_argument("-j", "--jobs",
+                        help="The number of gcsim processes to run at once across all commands (default: the number "
+                             "of cores).",
+                        type=int,
+                        default=default_jobs())
+    args = parser.parse_args()
+
+    if os.name != 'posix':
+        parser.error("The daemon needs Unix sockets, which aren't available on this platform.")
+
+    daemon = Daemon(args.socket, args.jobs)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
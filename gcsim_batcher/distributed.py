@@ -0,0 +1,408 @@
+import argparse
+import base64
+import itertools
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .cache import DEFAULT_CACHE_DIRECTORY, ResultCache
+from .optimizer import VIEWER_JSON_DIRECTORY, PrecisionTarget
+from .results import OptimizerResult, result_from_dict, result_to_dict
+from .schedule import CorePool, available_cores, plan
+from .substats import SubstatMemo
+from .run import RunOptions, StageLimits, add_run_arguments, default_jobs, run_batch_from_args, run_config
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PORT = 8642
+DEFAULT_LEASE_SECONDS = 600
+# The coordinator's default --jobs: how many configs it hands out at once, across all of its workers
+DEFAULT_FLEET_JOBS = 64
+# How often a config waiting on a worker checks for expired leases and lost workers
+CHECK_SECONDS = 5.0
+
+
+class NoWorkersError(RuntimeError):
+    """
+    No worker has been in touch with the coordinator for longer than the lease timeout.
+    """
+
+
+@dataclass
+class _Task:
+    id: int
+    config_file: Path
+    script: str
+    done: threading.Event = field(default_factory=threading.Event)
+    result: OptimizerResult | None = None
+    worker: str | None = None
+    lease_expires: float = 0.0
+
+
+class Coordinator:
+    """
+    Serves a batch's configs to workers over HTTP. Each config is leased to one worker at a time; a worker must send
+    heartbeats while it runs the config, and a lease that expires (because the worker disappeared) puts the config
+    back in the queue for another worker. The first result reported for a config wins.
+
+    `run` has the signature of a `run.ConfigRunner`, so a coordinator can stand in for local execution in
+    `run.run_batch`: each call queues a config and blocks until a worker reports its result. Expired leases are
+    requeued while it waits, and if no worker has asked for work, sent a heartbeat or reported a result for longer
+    than `worker_timeout` (the lease timeout by default), it raises `NoWorkersError` rather than waiting forever,
+    failing the config.
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = DEFAULT_PORT,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 token: str | None = None,
+                 collect_viewer: bool = False,
+                 worker_timeout: float | None = None):
+        self.lease_seconds = lease_seconds
+        self.worker_timeout = worker_timeout or lease_seconds
+        self.token = token
+        self.collect_viewer = collect_viewer
+        self._ids = itertools.count()
+        self._pending: list[_Task] = []
+        self._leased: dict[int, _Task] = {}
+        self._lock = threading.Lock()
+        self._finished = False
+        self._options = RunOptions()
+        self._last_contact = time.monotonic()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        with self._lock:
+            self._last_contact = time.monotonic()
+        self._thread.start()
+        logger.info('Coordinator listening on %s', self.url)
+
+    def finish(self):
+        """
+        Tell workers there is no more work, once they next ask for some.
+        """
+        with self._lock:
+            self._finished = True
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def run(self, config_file: Path, options: RunOptions, limits: StageLimits) -> OptimizerResult:
+        task = _Task(id=next(self._ids), config_file=Path(config_file), script=Path(config_file).read_text())
+        with self._lock:
+            self._options = options
+            self._pending.append(task)
+        while not task.done.wait(min(CHECK_SECONDS, self.lease_seconds)):
+            with self._lock:
+                now = time.monotonic()
+                self._expire_leases(now)
+                if now - self._last_contact > self.worker_timeout and not task.done.is_set():
+                    self._leased.pop(task.id, None)
+                    if task in self._pending:
+                        self._pending.remove(task)
+                    raise NoWorkersError(f"No worker has been in touch for {now - self._last_contact:.0f} seconds")
+        return task.result
+
+    def _expire_leases(self, now: float):
+        """
+        Put the configs whose leases have expired back in the queue. Called with the lock held.
+        """
+        for task in list(self._leased.values()):
+            if task.lease_expires < now:
+                logger.warning('Lease on %s by %s expired; requeueing it', task.config_file.name, task.worker)
+                del self._leased[task.id]
+                self._pending.insert(0, task)
+
+    def _lease(self, worker: str) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._last_contact = now
+            self._expire_leases(now)
+
+            if not self._pending:
+                return {"done": self._finished}
+
+            task = self._pending.pop(0)
+            task.worker = worker
+            task.lease_expires = now + self.lease_seconds
+            self._leased[task.id] = task
+            options = self._options
+
+        logger.info('Leased %s to %s', task.config_file.name, worker)
+        return {"id": task.id,
+                "name": task.config_file.name,
+                "script": task.script,
+                "additional_arguments": list(options.additional_arguments),
+                "substats_optimized": options.substats_optimized,
+                "reoptimize_substats": options.reoptimize_substats,
+                "compress_viewer": options.compress_viewer,
+                "precision": asdict(options.precision) if options.precision is not None else None,
+                "collect_viewer": self.collect_viewer,
+                "lease_seconds": self.lease_seconds}
+
+    def _heartbeat(self, task_id: int, worker: str) -> dict:
+        with self._lock:
+            self._last_contact = time.monotonic()
+            task = self._leased.get(task_id)
+            if task is None or task.worker != worker:
+                return {"ok": False}
+            task.lease_expires = time.monotonic() + self.lease_seconds
+        return {"ok": True}
+
+    def _complete(self, task_id: int, worker: str, result: dict, viewer: dict | None) -> dict:
+        with self._lock:
+            self._last_contact = time.monotonic()
+            task = self._leased.pop(task_id, None)
+            if task is None:
+                # Either reassigned and finished elsewhere, or requeued after its lease expired
+                task = next((task for task in self._pending if task.id == task_id), None)
+                if task is None:
+                    return {"ok": False}
+                self._pending.remove(task)
+
+        task.result = result_from_dict(result)
+        task.result.config_file = task.config_file
+        task.result.output_file = None
+        if viewer is not None:
+            directory = self._options.viewer_json_directory
+            directory.mkdir(parents=True, exist_ok=True)
+            task.result.output_file = directory / Path(viewer["name"]).name
+            task.result.output_file.write_bytes(base64.b64decode(viewer["data"]))
+        logger.info('%s finished by %s', task.config_file.name, worker)
+        task.done.set()
+        return {"ok": True}
+
+    def _handler(self):
+        coordinator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if coordinator.token is not None and self.headers.get("Authorization") != f"Bearer {coordinator.token}":
+                    self.send_error(403)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path == "/lease":
+                    response = coordinator._lease(body["worker"])
+                elif self.path == "/heartbeat":
+                    response = coordinator._heartbeat(body["id"], body["worker"])
+                elif self.path == "/result":
+                    response = coordinator._complete(body["id"], body["worker"], body["result"], body.get("viewer"))
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
+
+
+def _post(url: str, path: str, payload: dict, token: str | None) -> dict:
+    request = urllib.request.Request(url + path, data=json.dumps(payload).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    if token is not None:
+        request.add_header("Authorization", f"Bearer {token}")
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.load(response)
+
+
+def work(url: str,
+         jobs: int | None = None,
+         name: str | None = None,
+         token: str | None = None,
+         options: RunOptions = RunOptions(),
+         poll_seconds: float = 2.0,
+         max_failures: int = 5):
+    """
+    Pull configs from the coordinator at `url` and run them here with up to `jobs` gcsim processes at once, until the
+    coordinator says the batch is done (or stops answering). gcsim is found with `gcsim.gcsim_binary_path()` as usual.
+    `options` supplies local settings such as the cache and log directory; everything else comes from the
+    coordinator.
+    """
+    jobs = jobs or default_jobs()
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    cores = available_cores()
+    limits = StageLimits(jobs, cores=CorePool(cores, plan(len(cores), jobs)[1]))
+    active: dict[int, str] = {}
+    active_lock = threading.Lock()
+    stopping = threading.Event()
+
+    def heartbeat(lease_seconds: float):
+        while not stopping.wait(lease_seconds / 3):
+            with active_lock:
+                task_ids = list(active)
+            for task_id in task_ids:
+                try:
+                    _post(url, "/heartbeat", {"id": task_id, "worker": name}, token)
+                except (urllib.error.URLError, OSError) as e:
+                    logger.warning('Heartbeat for task %d failed: %s', task_id, e)
+
+    with tempfile.TemporaryDirectory(prefix="gcsim-worker-") as directory:
+        work_directory = Path(directory)
+
+        def run_task(task: dict) -> dict:
+            config_file = work_directory / task["name"]
+            config_file.write_text(task["script"])
+            task_options = RunOptions(additional_arguments=task["additional_arguments"],
+                                      cache=options.cache,
+                                      log_directory=options.log_directory,
+                                      viewer_json_directory=work_directory / VIEWER_JSON_DIRECTORY,
+                                      compress_viewer=task["compress_viewer"],
+                                      substats_optimized=task["substats_optimized"],
+                                      substat_memo=options.substat_memo,
+                                      reoptimize_substats=task.get("reoptimize_substats", False),
+                                      precision=PrecisionTarget(**task["precision"]) if task.get("precision") else None)
+            try:
+                result = run_config(config_file, task_options, limits)
+            except Exception as e:
+                logger.error('Config %s failed: %s', task["name"], e)
+                result = OptimizerResult(config_file=config_file, returncode=-1)
+
+            payload = {"id": task["id"], "worker": name, "result": result_to_dict(result)}
+            if task["collect_viewer"] and result.output_file is not None and result.output_file.exists():
+                payload["viewer"] = {"name": result.output_file.name,
+                                     "data": base64.b64encode(result.output_file.read_bytes()).decode()}
+            return payload
+
+        def worker_thread():
+            failures = 0
+            heartbeat_started = False
+            while not stopping.is_set():
+                try:
+                    task = _post(url, "/lease", {"worker": name}, token)
+                    failures = 0
+                except (urllib.error.URLError, OSError) as e:
+                    failures += 1
+                    if failures >= max_failures:
+                        logger.warning('Coordinator at %s is not responding (%s); stopping', url, e)
+                        stopping.set()
+                        return
+                    time.sleep(poll_seconds)
+                    continue
+
+                if "id" not in task:
+                    if task.get("done"):
+                        stopping.set()
+                        return
+                    time.sleep(poll_seconds)
+                    continue
+
+                with active_lock:
+                    active[task["id"]] = task["name"]
+                    if not heartbeat_started:
+                        threading.Thread(target=heartbeat, args=(task["lease_seconds"],), daemon=True).start()
+                        heartbeat_started = True
+                try:
+                    payload = run_task(task)
+                finally:
+                    with active_lock:
+                        del active[task["id"]]
+                try:
+                    _post(url, "/result", payload, token)
+                except (urllib.error.URLError, OSError) as e:
+                    logger.error('Could not report result for %s: %s', task["name"], e)
+
+        threads = [threading.Thread(target=worker_thread) for _ in range(jobs)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            stopping.set()
+
+
+def coordinator_main():
+    logging.basicConfig(level=logging.INFO, force=True)
+
+    parser = argparse.ArgumentParser(
+        description="Serve a batch of configs to gcsim-worker processes, and collect their results.")
+    parser.add_argument("input_directory", help="The directory containing the .txt config files.", type=Path)
+    parser.add_argument("output_file", help="The path of the output CSV file.", type=Path)
+    parser.add_argument("--host",
+                        help="The address to listen on (default: 127.0.0.1; use 0.0.0.0 to accept workers from "
+                             "other machines).",
+                        default="127.0.0.1")
+    parser.add_argument("--port", help=f"The port to listen on (default: {DEFAULT_PORT}).", type=int,
+                        default=DEFAULT_PORT)
+    parser.add_argument("--lease-seconds",
+                        help="How long a worker may go without a heartbeat before its config is given to another "
+                             f"worker (default: {DEFAULT_LEASE_SECONDS}).",
+                        type=float,
+                        default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument("--token", help="A shared secret workers must present.")
+    parser.add_argument("--collect-viewer", help="Have workers send back their viewer files.", action="store_true")
+    # The coordinator runs no gcsim processes itself: `run.run_batch` keeps up to twice --jobs configs in flight (each
+    # blocking a thread in `Coordinator.run`), so --jobs caps the work of the whole fleet, not this machine's cores.
+    add_run_arguments(parser,
+                      jobs_help="Caps the configs handed out to workers at once, across all of them: up to twice this "
+                                "many are leased or queued at a time, whatever this machine's core count. Set it to at "
+                                f"least the total --jobs of the workers (default: {DEFAULT_FLEET_JOBS}).",
+                      default_jobs=DEFAULT_FLEET_JOBS)
+    args = parser.parse_args()
+
+    configs = sorted(file for file in args.input_directory.iterdir()
+                     if file.is_file() and not file.name.startswith('.'))
+    if not configs:
+        logging.error("No valid config files found to process.")
+        return
+
+    coordinator = Coordinator(args.host, args.port, args.lease_seconds, args.token, args.collect_viewer)
+    coordinator.start()
+    try:
+        run_batch_from_args(configs, args, runner=coordinator.run)
+    finally:
+        coordinator.finish()
+        # Give idle workers a chance to hear that the batch is done before the server goes away
+        time.sleep(5)
+        coordinator.stop()
+
+
+def worker_main():
+    logging.basicConfig(level=logging.INFO, force=True)
+
+    parser = argparse.ArgumentParser(description="Run configs served by a gcsim-coordinator.")
+    parser.add_argument("url", help="The coordinator's URL, e.g. http://buildbox:8642.")
+    parser.add_argument("-j", "--jobs",
+                        help="The number of gcsim processes to run concurrently (default: the number of cores).",
+                        type=int,
+                        default=default_jobs())
+    parser.add_argument("--name", help="A name for this worker in the coordinator's logs.")
+    parser.add_argument("--token", help="The coordinator's shared secret.")
+    parser.add_argument("--log-directory",
+                        help="Save each config's full gcsim output to <log-directory>/<config name>.log.",
+                        type=Path)
+    parser.add_argument("--no-cache",
+                        help="Don't use this machine's result cache or memoized substats.",
+                        action="store_true")
+    args = parser.parse_args()
+
+    options = RunOptions(cache=None if args.no_cache else ResultCache(DEFAULT_CACHE_DIRECTORY),
+                         log_directory=args.log_directory,
+                         substat_memo=None if args.no_cache else SubstatMemo(DEFAULT_CACHE_DIRECTORY / "substats"))
+    work(args.url.rstrip("/"), args.jobs, args.name, args.token, options)
@@ -2,9 +2,12 @@
 
 import argparse
 from enum import StrEnum
+import glob
+import hashlib
 import logging
 import re
 from pathlib import Path
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 from typing import NamedTuple
 
 from .util import DEBUG
@@ -18,6 +21,7 @@ class Mode(StrEnum):
     WEAPON = "weapon"
     ARTIFACT = "artifact"
     MULTI = "multi"
+    MATRIX = "matrix"
 
 def _output_directory_name(output_directory: Path | str | None,
                            script_file: Path,
@@ -61,23 +65,169 @@ def update_weapon(script_lines: list[str], character_name: str, weapon_name: str
     return new_lines
 
 
-def generate_weapon_scripts(script_path: Path,
-                            character_name: str,
-                            artifact_sets: list[str] | None,
-                            weapons: list[str],
-                            output_directory: Path):
-    logger.debug(f"Generating artifact scripts for {character_name} with sets {artifact_sets} and weapons {weapons} in {output_directory}.")
+_OPTIONS_LINE = re.compile(r'^options\b.*$', re.MULTILINE)
+_ITERATION_OPTION = re.compile(r'\biteration=(\d+)')
+# The iteration count gcsim uses when a script doesn't set one
+DEFAULT_ITERATIONS = 1000
+
+
+def iteration_count(script: str) -> int:
+    """
+    The sim's iteration count as set in the script's `options` line, or gcsim's default.
+    """
+    match = _OPTIONS_LINE.search(script)
+    option = _ITERATION_OPTION.search(match.group()) if match is not None else None
+    return int(option.group(1)) if option is not None else DEFAULT_ITERATIONS
+
+
+def update_iterations(script: str, iterations: int) -> str:
+    """
+    Set the sim's iteration count in the script's `options` line, adding the option (or the line) if needed.
+    """
+    match = _OPTIONS_LINE.search(script)
+    if match is None:
+        return f"options iteration={iterations};\n{script}"
+
+    line = match.group()
+    if _ITERATION_OPTION.search(line):
+        line = _ITERATION_OPTION.sub(f"iteration={iterations}", line)
+    else:
+        line = re.sub(r'\s*;', f" iteration={iterations};", line, count=1)
+    return script[:match.start()] + line + script[match.end():]
+
+
+Weapon = NamedTuple('Weapon', [('name', str), ('refine', int)])
+
+
+_SLOT_PATTERN = re.compile(r'^(?P<character>\S+) add (?P<kind>weapon|set)\b')
+
+
+_WEAPON_LINE = re.compile(r'^(?P<character>\S+) add weapon="(?P<name>[^"]*)" refine=(?P<refine>\d+)', re.MULTILINE)
+_SET_LINE = re.compile(r'^(?P<character>\S+) add set="(?P<name>[^"]*)"', re.MULTILINE)
+
+
+class Gear(NamedTuple):
+    weapon: Weapon | None
+    artifact_sets: list[str]
+
 
+def read_gear(script: str) -> dict[str, Gear]:
+    """
+    Read each character's weapon and artifact sets back out of a script, as written by the generators.
+    """
+    gear: dict[str, Gear] = {}
+    for match in _WEAPON_LINE.finditer(script):
+        gear[match.group('character')] = Gear(Weapon(match.group('name'), int(match.group('refine'))), [])
+    for match in _SET_LINE.finditer(script):
+        gear.setdefault(match.group('character'), Gear(None, [])).artifact_sets.append(match.group('name'))
+    return gear
+
+
+def weapon_line(character_name: str, weapon: Weapon) -> str:
+    return f"{character_name} add weapon=\"{weapon.name}\" refine={weapon.refine} lvl=90/90;"
+
+
+def artifact_set_lines(character_name: str, artifact_sets: Sequence[str]) -> list[str]:
+    count = 2 if len(artifact_sets) == 2 else 4
+    return [f"{character_name} add set=\"{set_}\" count={count};" for set_ in artifact_sets]
+
+
+class ScriptTemplate:
+    """
+    A script parsed once into static blocks of text and the slots that variants change: each character's
+    `add weapon` and `add set` lines. Rendering a variant only splices those slots, so it costs roughly the size of
+    the output rather than a rescan of the whole script.
+
+    Rendering matches `update_weapon` and `update_artifact_sets`: every weapon line for a character is replaced, and
+    the first set line is replaced by the new sets while the character's other set lines are dropped.
+    """
+
+    def __init__(self, script: str):
+        # Each part is either a block of unchanged lines, or a (kind, character, first) slot followed by its
+        # original line
+        self._parts: list[str | tuple[str, str, bool]] = []
+        # The number of `add weapon` and `add set` lines for each character
+        self.weapon_lines: dict[str, int] = {}
+        self.set_lines: dict[str, int] = {}
+
+        static: list[str] = []
+        for line in script.splitlines():
+            match = _SLOT_PATTERN.match(line)
+            if match is None:
+                static.append(line)
+                continue
+
+            if static:
+                self._parts.append('\n'.join(static))
+                static = []
+            character, kind = match.group('character'), match.group('kind')
+            counts = self.weapon_lines if kind == 'weapon' else self.set_lines
+            self._parts.append((kind, character, character not in counts))
+            self._parts.append(line)
+            counts[character] = counts.get(character, 0) + 1
+        if static:
+            self._parts.append('\n'.join(static))
+
+        self._script = script
+
+    @classmethod
+    def from_file(cls, script_path: Path) -> 'ScriptTemplate':
+        with open(script_path, 'r') as f:
+            return cls(f.read())
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._script
+
+    def render(self,
+               weapons: Mapping[str, Weapon] | None = None,
+               artifact_sets: Mapping[str, Sequence[str]] | None = None) -> str:
+        """
+        Render the script with the given characters' weapons and/or artifact sets replaced.
+        """
+        weapons = weapons or {}
+        artifact_sets = artifact_sets or {}
+        pieces = []
+        parts = iter(self._parts)
+        for part in parts:
+            if isinstance(part, str):
+                pieces.append(part)
+                continue
+
+            kind, character, first = part
+            original = next(parts)
+            if kind == 'weapon' and character in weapons:
+                pieces.append(weapon_line(character, weapons[character]))
+            elif kind == 'set' and character in artifact_sets:
+                if first:
+                    pieces.extend(artifact_set_lines(character, artifact_sets[character]))
+            else:
+                pieces.append(original)
+        return '\n'.join(pieces)
+
+
+def load_template(script_path: Path, character_name: str) -> ScriptTemplate | None:
     script = read_script(script_path, character_name)
-    if script is None:
-        return
+    return ScriptTemplate(script) if script is not None else None
 
-    out_path = output_directory
-    out_path.mkdir(parents=True, exist_ok=True)
 
-    script_lines = script.splitlines()
-    if artifact_sets:
-        script_lines = update_artifact_sets(script_lines, character_name, artifact_sets)
+def _write_variants(variants: Iterable[tuple[str, str]], output_directory: Path):
+    output_directory.mkdir(parents=True, exist_ok=True)
+    for file_name, script in variants:
+        with open(output_directory / file_name, 'w') as f:
+            f.write(script)
+
+
+def weapon_variants(template: ScriptTemplate,
+                    character_name: str,
+                    artifact_sets: list[str] | None,
+                    weapons: list[str],
+                    refines: Sequence[int] = (1, 5)) -> Iterator[tuple[str, str]]:
+    """
+    Yield the file name and script for each weapon and refine, optionally with `artifact_sets` as well.
+    """
+    if artifact_sets and character_name not in template.set_lines:
+        logger.error(f"No artifact sets found for {character_name} in the script.")
+    sets = {character_name: artifact_sets} if artifact_sets else None
 
     def make_file_name(weapon: str, refine: int):
         if artifact_sets:
@@ -85,15 +235,26 @@ def generate_weapon_scripts(script_path: Path,
         else:
             return f"{character_name}_weapon_{weapon}_r{refine}.txt"
 
-    for weapon, refine in [(weapon, refine) for refine in (1, 5) for weapon in weapons]:
-        lines = update_weapon(script_lines, character_name, weapon, refine)
-        new_script = '\n'.join(lines)
-        file_path = (out_path / make_file_name(weapon, refine)).with_suffix('.txt')
-        with open(file_path, 'w') as f:
-            f.write(new_script)
+    for weapon, refine in [(weapon, refine) for refine in refines for weapon in weapons]:
+        yield make_file_name(weapon, refine), template.render({character_name: Weapon(weapon, refine)}, sets)
+
+
+def generate_weapon_scripts(script_path: Path,
+                            character_name: str,
+                            artifact_sets: list[str] | None,
+                            weapons: list[str],
+                            output_directory: Path,
+                            template: ScriptTemplate | None = None):
+    logger.debug(f"Generating artifact scripts for {character_name} with sets {artifact_sets} and weapons {weapons} in {output_directory}.")
+
+    template = template or load_template(script_path, character_name)
+    if template is None:
+        return
+
+    _write_variants(weapon_variants(template, character_name, artifact_sets, weapons), output_directory)
 
     logger.info(f"Generated scripts for {character_name} with weapons: {weapons}.")
-    logger.info(f"Scripts saved in {out_path}.")
+    logger.info(f"Scripts saved in {output_directory}.")
 
 
 def update_artifact_sets(script_lines: list[str], character_name: str, artifact_sets: list[str]):
@@ -117,106 +278,301 @@ def update_artifact_sets(script_lines: list[str], character_name: str, artifact_
     return new_lines
 
 
-Weapon = NamedTuple('Weapon', [('name', str), ('refine', int)])
+def artifact_variants(template: ScriptTemplate,
+                      character_name: str,
+                      weapon: Weapon | None,
+                      artifact_sets: list[list[str]]) -> Iterator[tuple[str, str]]:
+    """
+    Yield the file name and script for each artifact set choice, optionally with `weapon` as well.
+    """
+    set_lines = template.set_lines.get(character_name, 0)
+    if not set_lines:
+        logger.error(f"No artifact sets found for {character_name} in the script.")
+        return
+    if set_lines > 1:
+        logger.info(f"Multiple sets found for {character_name}; replacing the first and removing the others.")
+    weapons = {character_name: weapon} if weapon else None
+
+    def make_file_name(set: list[str]):
+        if weapon:
+            return f"{character_name}_{weapon.name}_{weapon.refine}_artifacts_{'_'.join(set)}.txt"
+        else:
+            return f"{character_name}_artifacts_{'_'.join(set)}.txt"
+
+    for sets in artifact_sets:
+        yield make_file_name(sets), template.render(weapons, {character_name: sets})
 
 
 def generate_artifacts_scripts(script_path: Path,
                                character_name: str,
                                weapon: Weapon | None,
                                artifact_sets: list[list[str]],
-                               output_directory: Path):
+                               output_directory: Path,
+                               template: ScriptTemplate | None = None):
     logger.debug(f"Generating artifact scripts for {character_name} with weapon {weapon} and sets {artifact_sets} in {output_directory}.")
 
-    script = read_script(script_path, character_name)
-    if script is None:
+    template = template or load_template(script_path, character_name)
+    if template is None:
         return
 
-    out_path = output_directory
-    out_path.mkdir(parents=True, exist_ok=True)
+    _write_variants(artifact_variants(template, character_name, weapon, artifact_sets), output_directory)
+
+    logger.info(f"Generated scripts for {character_name} with 2pc artifact combinations in {output_directory}.")
+
+
+def matrix_variants(template: ScriptTemplate, combinations: Iterable) -> Iterator[tuple[str, str]]:
+    """
+    Yield the file name and script for each `config.Combination`, as lazily as `combinations` is produced.
+    Combinations that change the sets of a character without set lines in the script are skipped (see
+    `multi_variants`, which reports them once per test).
+    """
+    for combination in combinations:
+        character = combination.character
+        name = [character]
+        weapons = sets = None
+        if combination.weapon is not None:
+            weapons = {character: Weapon(combination.weapon, combination.refine)}
+            name.append(f"weapon_{combination.weapon}_r{combination.refine}")
+        if combination.artifact_set is not None:
+            if character not in template.set_lines:
+                continue
+            sets = {character: combination.artifact_set}
+            name.append(f"artifacts_{'_'.join(combination.artifact_set)}")
+        yield "_".join(name) + ".txt", template.render(weapons, sets)
+
+
+def multi_variants(template: ScriptTemplate,
+                   script_file: Path,
+                   config: list,
+                   output_root: Path,
+                   output_directory: Path | None = None) -> Iterator[tuple[Path, str]]:
+    """
+    Yield the output path and script for every variant described by the tests in `config`, in order.
+    """
+    from gcsim_batcher.config import Test  # Import here to avoid circular imports
 
-    script_lines = script.splitlines()
-    if weapon:
-        script_lines = update_weapon(script_lines, character_name, weapon.name, weapon.refine)
+    for test in config:
+        if isinstance(test.test, Test.MatrixTest):
+            missing = [character for character in test.test.characters if character not in template]
+            if missing:
+                logger.error(f"{', '.join(missing)} not found in script")
+                continue
+            test_directory = output_root / _output_directory_name(test.test.output_directory,
+                                                                  script_file,
+                                                                  "_".join(test.test.characters),
+                                                                  Mode.MATRIX)
+            logger.info(f"Generating matrix scripts for characters {test.test.characters}.")
+            if test.test.artifact_sets:
+                for character in test.test.characters:
+                    if character not in template.set_lines:
+                        logger.error(f"No artifact sets found for {character} in the script.")
+            for file_name, script in matrix_variants(template, test.test.combinations()):
+                yield test_directory / file_name, script
+            continue
+
+        if test.character not in template:
+            logger.error(f"{test.character} not found in script")
+            continue
 
-    def make_file_name(set: list[str]):
-        if weapon:
-            return f"{character_name}_{weapon.name}_{weapon.refine}_artifacts_{'_'.join(set)}.txt"
+        if isinstance(test.test, Test.ArtifactTest):
+            test_directory = output_root / _output_directory_name(test.test.output_directory,
+                                                                  script_file,
+                                                                  test.character,
+                                                                  Mode.ARTIFACT)
+            # Without a weapon, every refine would produce the same scripts
+            for refine in (test.test.refines if test.test.weapon_name else (None,)):
+                logger.info(f"Generating artifact scripts for character {test.character} with weapon {test.test.weapon_name}, refine {refine}, sets {test.test.artifact_sets}.")
+                weapon = Weapon(test.test.weapon_name, refine) if test.test.weapon_name else None
+                for file_name, script in artifact_variants(template, test.character, weapon, test.test.artifact_sets):
+                    yield test_directory / file_name, script
+        elif isinstance(test.test, Test.WeaponTest):
+            logger.info(f"Generating weapon scripts for character {test.character} with artifact set {test.test.artifact_set}, weapons {test.test.weapons}.")
+            if not (test.test.output_directory or output_directory):
+                raise ValueError("No output directory specified for weapon test.")
+
+            test_directory = output_root / _output_directory_name(test.test.output_directory,
+                                                                  script_file,
+                                                                  test.character,
+                                                                  Mode.WEAPON)
+            for file_name, script in weapon_variants(template, test.character, test.test.artifact_set, test.test.weapons,
+                                                     test.test.refines):
+                yield test_directory / file_name, script
         else:
-            return f"{character_name}_artifacts_{'_'.join(set)}.txt"
+            logger.warning(f"Unknown test type for character {test.character}. Skipping.")
 
-    for sets in artifact_sets:
-        existing_sets = re.findall(rf"{character_name} add set=(?P<set>.*) count=[0-9];", script)
-        if not existing_sets:
-            logger.error(f"No artifact sets found for {character_name} in the script.")
-            return
 
-        if len(existing_sets) > 1:
-            logger.debug(f"Multiple sets found for {character_name}: {existing_sets}.")
-            logger.info(f"Multiple sets found for {character_name}; replacing the first and removing the others.")
+TEAM_MARKER = "# gcsim-batcher: team="
 
-        updated_lines = update_artifact_sets(script_lines, character_name, sets)
-        if updated_lines is None:
-            return
 
-        new_script = '\n'.join(updated_lines)
-        file_name = make_file_name(sets)
-        file_path = out_path / file_name
-        with open(file_path, 'w') as f:
-            f.write(new_script)
+def config_team(script: str) -> str | None:
+    """
+    The team a variant was generated for in a multi-team sweep, from its `TEAM_MARKER` line, or None.
+    """
+    for line in script.splitlines():
+        if line.startswith(TEAM_MARKER):
+            return line[len(TEAM_MARKER):].strip()
+    return None
 
-        logger.info(f"Generated scripts for {character_name} with 2pc artifact combinations in {out_path}.")
 
+def _is_pattern(path: Path | str) -> bool:
+    return any(character in str(path) for character in "*?[")
 
-def generate_multi_scripts(script_file: Path, test_configuration_file: Path, output_directory: Path | None = None):
+
+def find_scripts(patterns: Iterable[Path | str]) -> list[Path]:
+    """
+    Expand any glob patterns among the base script paths `patterns`, in order and without duplicates.
+    """
+    scripts: list[Path] = []
+    for pattern in patterns:
+        if not _is_pattern(pattern):
+            matches = [Path(pattern)]
+        else:
+            matches = [Path(match) for match in sorted(glob.glob(str(pattern)))]
+            if not matches:
+                logger.error(f"No script files match {pattern}.")
+        scripts.extend(match for match in matches if match not in scripts)
+    return scripts
+
+
+def multi_variants_from_files(script_file: Path | Sequence[Path],
+                              test_configuration_file: Path,
+                              output_directory: Path | None = None) -> Iterator[tuple[Path, str]]:
+    """
+    Load the base scripts and test configuration and lazily yield the output path and script of every variant.
+
+    `script_file` may be several scripts or glob patterns, and the test configuration may list more under `scripts`.
+    With more than one, every test is run against each script in turn, as one team each: each variant's file name is
+    prefixed with its team (the script's name) and the variant is marked with `TEAM_MARKER`.
+
+    Raises `FileNotFoundError` if the test configuration or any of the scripts is missing, rather than yielding
+    nothing, so that `write_variants` doesn't take every variant for stale.
+    """
     if not test_configuration_file.exists():
-        logger.error(f"Test configuration file {test_configuration_file} does not exist.")
-        return
+        raise FileNotFoundError(f"Test configuration file {test_configuration_file} does not exist.")
+
+    from gcsim_batcher.config import load_config, load_scripts  # Import here to avoid circular imports
+    script_files = find_scripts([script_file] if isinstance(script_file, (Path, str)) else script_file)
+    script_files += [script for script in find_scripts(load_scripts(test_configuration_file))
+                     if script not in script_files]
+    missing = [script for script in script_files if not script.exists()]
+    if missing:
+        raise FileNotFoundError(f"Script files do not exist: {', '.join(map(str, missing))}")
+    if not script_files:
+        raise FileNotFoundError(f"No script files match {script_file}.")
+    teams = [script.stem for script in script_files]
+    if len(set(teams)) < len(teams):
+        raise ValueError(f"Base scripts must have different names to tell their teams apart: {script_files}")
 
-    from gcsim_batcher.config import (  # Import here to avoid circular imports
-        Test, load_config)
     config_root, config = load_config(test_configuration_file, output_directory=output_directory)
-    output_root = config_root or _output_directory_name(output_directory, script_file, None, Mode.MULTI)
+    output_root = config_root or _output_directory_name(output_directory, script_files[0], None, Mode.MULTI)
     logger.debug(f"Output root directory: {output_root}")
 
-    for test in config:
-        if isinstance(test.test, Test.ArtifactTest):
-            for refine in (1, 5):
-                logger.info(f"Generating artifact scripts for character {test.character} with weapon {test.test.weapon_name}, refine {refine}, sets {test.test.artifact_sets}.")
-                if test.test.weapon_name:
-                    weapon = Weapon(test.test.weapon_name, refine)
-                else:
-                    weapon = None
-
-                generate_artifacts_scripts(
-                    script_file,
-                    test.character,
-                    weapon,
-                    test.test.artifact_sets,
-                    output_root / _output_directory_name(test.test.output_directory,
-                                                         script_file,
-                                                         test.character,
-                                                         Mode.ARTIFACT)
-                )
-        elif isinstance(test.test, Test.WeaponTest):
-            logger.info(f"Generating weapon scripts for character {test.character} with artifact set {test.test.artifact_set}, weapons {test.test.weapons}.")
-            if not (test.test.output_directory or output_directory):
-                raise ValueError("No output directory specified for weapon test.")
+    if len(script_files) == 1:
+        template = ScriptTemplate.from_file(script_files[0])
+        yield from multi_variants(template, script_files[0], config, output_root, output_directory)
+        return
 
-            generate_weapon_scripts(
-                script_file,
-                test.character,
-                test.test.artifact_set,
-                test.test.weapons,
-                output_root / _output_directory_name(test.test.output_directory, script_file, test.character, Mode.WEAPON
-                )
-            )
+    for team, script in zip(teams, script_files):
+        logger.info(f"Generating variants for team {team}.")
+        template = ScriptTemplate.from_file(script)
+        for path, variant in multi_variants(template, script, config, output_root, output_directory):
+            yield path.with_name(f"{team}_{path.name}"), f"{TEAM_MARKER}{team}\n{variant}"
+
+
+def manifest_path(output_directory: Path,
+                  script_file: Path | Sequence[Path],
+                  test_configuration_file: Path) -> Path:
+    """
+    Where `write_variants` records the variants generated from a script (or several) and test configuration into
+    `output_directory`.
+    """
+    script_files = [script_file] if isinstance(script_file, (Path, str)) else list(script_file)
+    if len(script_files) == 1 and not _is_pattern(script_files[0]):
+        name = Path(script_files[0]).stem
+    else:
+        name = "teams-" + hashlib.sha256("\0".join(map(str, script_files)).encode('utf-8')).hexdigest()[:8]
+    return Path(output_directory) / ".gcsim-batcher" / f"{name}.{test_configuration_file.stem}.manifest"
+
+
+def _read_manifest(manifest: Path) -> dict[str, str | None]:
+    """
+    The variant paths recorded in `manifest`, each with the hash of the script generated for it (None in manifests
+    written before hashes were recorded).
+    """
+    try:
+        lines = manifest.read_text().splitlines()
+    except FileNotFoundError:
+        return {}
+    variants = {}
+    for line in lines:
+        path, separator, digest = line.rpartition("\t")
+        variants[path if separator else line] = digest if separator else None
+    return variants
+
+
+def write_variants(variants: Iterable[tuple[Path, str]], manifest: Path | None = None) -> Iterator[Path]:
+    """
+    Write each variant to its path as it is produced, yielding the paths. A file that already holds the variant's
+    script is left untouched, so regenerating after a small edit only rewrites the variants that actually changed.
+
+    With `manifest`, the paths are recorded there once every variant has been produced, along with a hash of each
+    generated script, and variants recorded by a previous run that weren't produced this time are deleted. A variant
+    is unchanged if its script matches the recorded hash, even if the file has since been rewritten by gcsim's
+    substat optimization. If producing the variants fails (or the caller stops
+    early), the manifest and the previous run's variants are left alone.
+    """
+    previous = _read_manifest(manifest) if manifest is not None else {}
+    created_directories = set()
+    written: dict[str, str] = {}
+    unchanged = 0
+    for path, script in variants:
+        if path.parent not in created_directories:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            created_directories.add(path.parent)
+        digest = hashlib.sha256(script.encode('utf-8')).hexdigest()
+        if previous.get(str(path)) is not None:
+            current = script if previous[str(path)] == digest and path.exists() else None
         else:
-            logger.warning(f"Unknown test type for character {test.character}. Skipping.")
+            try:
+                with open(path, 'r') as f:
+                    current = f.read()
+            except FileNotFoundError:
+                current = None
+        if current == script:
+            unchanged += 1
+        else:
+            with open(path, 'w') as f:
+                f.write(script)
+        written[str(path)] = digest
+        yield path
+
+    stale = 0
+    if manifest is not None:
+        for path in previous.keys() - written.keys():
+            logger.debug(f"Removing stale variant {path}")
+            Path(path).unlink(missing_ok=True)
+            stale += 1
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        manifest.write_text("".join(f"{path}\t{digest}\n" for path, digest in written.items()))
+    logger.info(f"Generated {len(written)} variants: {len(written) - unchanged} written, {unchanged} unchanged, "
+                f"{stale} stale removed.")
+
+
+def generate_multi_scripts(script_file: Path | Sequence[Path],
+                           test_configuration_file: Path,
+                           output_directory: Path | None = None):
+    manifest = manifest_path(output_directory or Path("configs"), script_file, test_configuration_file)
+    for _ in write_variants(multi_variants_from_files(script_file, test_configuration_file, output_directory),
+                            manifest):
+        pass
 
 
 def main():
     parser = argparse.ArgumentParser(description="Generate testing scripts for a character.")
-    parser.add_argument("script_file", help="The script file to process", type=Path)
+    parser.add_argument("script_file",
+                        help="The script file to process. For multi, this may be a quoted glob pattern such as "
+                             "'teams/*.txt' to generate the tests for every team that matches.",
+                        type=Path)
     parser.add_argument(
         "--output_directory",
         help="The directory to save the generated scripts",
@@ -248,8 +604,14 @@ def main():
 
     multi_parser = subparsers.add_parser("multi", help="Generate scripts from various combinations of character, weapon, and artifact sets")
     multi_parser.add_argument("test_configuration_file", help="Configuration file for the test", type=Path)
+    multi_parser.add_argument("--script",
+                              help="Another base script (or glob pattern) to generate the tests for, as another team. "
+                                   "May be given more than once.",
+                              type=Path,
+                              action="append",
+                              default=[])
     multi_parser.set_defaults(func=lambda args: generate_multi_scripts(
-        args.script_file,
+        [args.script_file, *args.script],
         args.test_configuration_file,
         _output_directory_name(args.output_directory, args.script_file, None, Mode.MULTI)
     ))
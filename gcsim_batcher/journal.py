@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from .results import OptimizerResult, result_from_dict, result_to_dict
+
+
+logger = logging.getLogger(__name__)
+
+
+def journal_path(csv_path: Path) -> Path:
+    """
+    Where the journal for a batch writing to `csv_path` lives.
+    """
+    return csv_path.with_name(csv_path.name + ".journal")
+
+
+class Journal:
+    """
+    An append-only record of the configs a batch has finished, one JSON object per line. Each entry is written with a
+    single write and flushed to disk before the next, so an interrupted batch leaves at worst a torn final line, which
+    is ignored when resuming.
+
+    The first entry records how long the CSV was when the batch started, so a resumed batch can rewrite its rows in
+    order without disturbing anything written to the CSV before it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def start(self, csv_offset: int):
+        """
+        Begin a new journal, replacing any existing one.
+        """
+        temporary_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary_path, 'w') as f:
+            f.write(json.dumps({'event': 'start', 'csv_offset': csv_offset}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.path)
+        self._file = open(self.path, 'a')
+
+    def resume(self) -> tuple[int, dict[str, OptimizerResult]]:
+        """
+        Reopen an existing journal, returning the CSV offset the batch started at and the finished results keyed by
+        config path.
+        """
+        csv_offset = 0
+        finished = {}
+        with open(self.path, 'r') as f:
+            for line_number, line in enumerate(f, start=1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning('Ignoring incomplete journal entry at %s:%d', self.path, line_number)
+                    continue
+                if entry['event'] == 'start':
+                    csv_offset = entry['csv_offset']
+                elif entry['event'] == 'done':
+                    finished[entry['config']] = result_from_dict(entry['result'])
+
+        self._file = open(self.path, 'a')
+        if self.path.stat().st_size and not self.path.read_bytes().endswith(b'\n'):
+            self._file.write('\n')  # Terminate a torn final entry so that new entries start on their own line
+        return csv_offset, finished
+
+    def record(self, config: Path, result: OptimizerResult):
+        """
+        Record that `config` has finished with `result`.
+        """
+        line = json.dumps({'event': 'done', 'config': str(config), 'result': result_to_dict(result)}) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,124 @@
+import logging
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+
+# How often to look at free memory again while waiting for it
+POLL_SECONDS = 1.0
+
+_SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$', re.IGNORECASE)
+
+
+def parse_size(text: str) -> int:
+    """
+    Parse a size like "512M" or "8GiB" into bytes. Units are powers of 1024; a bare number is bytes.
+    """
+    match = _SIZE_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Invalid size: {text!r}")
+    return int(float(match.group(1)) * 1024 ** " kmgt".index(match.group(2).lower() or " "))
+
+
+def format_size(size: int | None) -> str:
+    return f"{size / 2**20:.0f} MiB" if size is not None else "unknown"
+
+
+def available_memory() -> int | None:
+    """
+    How much memory could be used without swapping, or None where that can't be read.
+    """
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def wait_for_peak_rss(process) -> tuple[int, int | None]:
+    """
+    Wait for a `subprocess.Popen` to exit, returning its exit code and its peak resident set size in bytes (None on
+    platforms that don't report it).
+    """
+    if not hasattr(os, "wait4"):
+        return process.wait(), None
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        return process.wait(), None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return process.returncode, usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+class MemoryGovernor:
+    """
+    Decides whether there is enough memory to start another gcsim process. Each phase (optimize or sim) is expected
+    to need as much as the largest peak RSS seen for it so far. A process is only started if the expected needs of all
+    running processes fit in `budget`, and if it would leave at least `reserve` bytes of memory available; otherwise
+    it waits until one of those becomes true. While a phase's needs are still unknown, processes of that phase are
+    started one at a time if there is a budget, so that the first measurement comes before the budget is committed.
+
+    A process is always allowed to start if nothing else is running, so that a budget smaller than a single config
+    slows the batch down rather than stopping it.
+    """
+
+    def __init__(self, budget: int | None = None, reserve: int | None = None):
+        self.budget = budget
+        self.reserve = reserve
+        self.estimates: dict[str, int] = {}
+        self._running: dict[int, int] = {}
+        self._tickets = iter(range(sys.maxsize))
+        self._condition = threading.Condition()
+
+    def _fits(self, phase: str) -> bool:
+        if not self._running:
+            return True
+        estimate = self.estimates.get(phase)
+        if self.budget is not None:
+            if estimate is None or sum(self._running.values()) + estimate > self.budget:
+                return False
+        if self.reserve is not None:
+            available = available_memory()
+            if available is not None and available - (estimate or 0) < self.reserve:
+                return False
+        return True
+
+    @contextmanager
+    def admit(self, phase: str):
+        """
+        Wait until there is memory for a process of `phase`, and hold its share until the context exits.
+        """
+        with self._condition:
+            if not self._fits(phase):
+                logger.info('Waiting for memory before starting another %s (%d running, %s available)',
+                            phase, len(self._running), format_size(available_memory()))
+                while not self._fits(phase):
+                    self._condition.wait(POLL_SECONDS)
+            ticket = next(self._tickets)
+            self._running[ticket] = self.estimates.get(phase, 0)
+        try:
+            yield
+        finally:
+            with self._condition:
+                del self._running[ticket]
+                self._condition.notify_all()
+
+    def observe(self, phase: str, peak_rss: int | None):
+        """
+        Record a process's peak RSS for `phase`.
+        """
+        if peak_rss is None:
+            return
+        with self._condition:
+            if peak_rss > self.estimates.get(phase, 0):
+                self.estimates[phase] = peak_rss
+            self._condition.notify_all()
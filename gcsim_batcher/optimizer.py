@@ -1,8 +1,301 @@
 import argparse
-import os
+import logging
+import math
+import subprocess
 import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import TextIO
 
-from .util import gcsim
+from .generate import config_team, update_iterations
+from .memory import wait_for_peak_rss
+from .results import DPSSummary, OptimizerResult, parse_summary_line, pool_character_stats, pool_summaries
+from .schedule import CpuAllocation
+from .util import gcsim_popen
+from .viewer import find_viewer_file, read_character_stats, write_summary_sidecar
+
+
+logger = logging.getLogger(__name__)
+
+
+VIEWER_JSON_DIRECTORY = Path("viewer_json")
+
+
+def _run_gcsim(args: Sequence[str],
+               log_file: TextIO | None,
+               allocation: CpuAllocation | None = None) -> tuple[int, DPSSummary | None, int | None]:
+    """
+    Run gcsim, reading its output a line at a time and picking out the DPS summary as it goes past. The output is only
+    kept if `log_file` is given. If an `allocation` is given, gcsim is limited to its share of the CPU.
+
+    Returns gcsim's exit code, the summary, and gcsim's peak RSS in bytes (if the platform reports it).
+    """
+    process = gcsim_popen(*args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="ignore",
+                          env=allocation.environment() if allocation is not None else None)
+    if allocation is not None:
+        allocation.pin(process.pid)
+    summary = None
+    with process.stdout:
+        for line in process.stdout:
+            if log_file is not None:
+                log_file.write(line)
+            summary = parse_summary_line(line) or summary
+    returncode, peak_rss = wait_for_peak_rss(process)
+    return returncode, summary, peak_rss
+
+
+SUBSTATS_OPTIMIZED_MARKER = "# gcsim-batcher: substats optimized"
+
+
+def substats_optimized(config_file: Path) -> bool:
+    """
+    Whether `config_file` is marked (with `SUBSTATS_OPTIMIZED_MARKER` on a line of its own) as already having
+    optimized substats, so that only the final sim needs to run.
+    """
+    with open(config_file, 'r') as f:
+        return any(line.strip() == SUBSTATS_OPTIMIZED_MARKER for line in f)
+
+
+@contextmanager
+def open_log(log_directory: Path | None, config_file: Path, mode: str):
+    """
+    Open `config_file`'s log in `log_directory` with `mode`, yielding None instead if there is no log directory.
+    """
+    if log_directory is None:
+        yield None
+        return
+    log_directory.mkdir(parents=True, exist_ok=True)
+    with open(log_directory / config_file.with_suffix(".log").name, mode) as f:
+        yield f
+
+
+def truncate_log(log_directory: Path | None, config_file: Path):
+    """
+    Empty `config_file`'s log, when optimization is skipped and the sim would otherwise append to a previous run's.
+    """
+    if log_directory is not None:
+        with open_log(log_directory, config_file, 'w'):
+            pass
+
+
+def start_result(config_file: Path, viewer_json_directory: Path = VIEWER_JSON_DIRECTORY) -> OptimizerResult:
+    """
+    Create the (as yet empty) result for optimizing `config_file`, to be filled in by `optimize_substats` and
+    `simulate`.
+    """
+    config_file = Path(config_file)
+    if not config_file.exists():
+        raise FileNotFoundError(f"Input file not found at {config_file}")
+
+    viewer_json_directory.mkdir(parents=True, exist_ok=True)
+    output_file = viewer_json_directory / config_file.with_suffix(".json").name
+    return OptimizerResult(config_file=config_file, returncode=0, output_file=output_file,
+                           team=config_team(config_file.read_text()))
+
+
+def optimize_arguments(config_file: Path) -> list[str]:
+    """
+    gcsim's arguments for phase 1, the substat optimization.
+    """
+    return ["-c", str(config_file), "-s", "-substatOptimFull"]
+
+
+def sim_arguments(result: OptimizerResult,
+                  additional_arguments: Sequence[str] = (),
+                  compress_viewer: bool = False) -> list[str]:
+    """
+    gcsim's arguments for phase 2, the final sim that writes the result's viewer file.
+    """
+    return ["-c", str(result.config_file), "-out", str(result.output_file), f"-gz={str(compress_viewer).lower()}",
+            *additional_arguments]
+
+
+def optimize_substats(result: OptimizerResult,
+                      log_directory: Path | None = None,
+                      allocation: CpuAllocation | None = None) -> OptimizerResult:
+    """
+    Phase 1: run gcsim's full substat optimization on the result's config.
+    """
+    config_file = result.config_file
+    logger.info("Running substat optimization for %s...", config_file)
+    with open_log(log_directory, config_file, 'w') as log_file:
+        start = time.perf_counter()
+        result.returncode, _, result.optimize_peak_rss = _run_gcsim(optimize_arguments(config_file), log_file,
+                                                                    allocation)
+        result.optimize_seconds = time.perf_counter() - start
+
+    if result.returncode != 0:
+        logger.error("Substat optimization for %s failed with exit code %d", config_file, result.returncode)
+    return result
+
+
+def simulate(result: OptimizerResult,
+             additional_arguments: Sequence[str] = (),
+             log_directory: Path | None = None,
+             compress_viewer: bool = False) -> OptimizerResult:
+    """
+    Phase 2: run the full sim of the result's config, writing the viewer file (gzipped if `compress_viewer`) and its
+    `.summary.json` sidecar, and parse the DPS summary and per-character stats.
+    """
+    run_sim(result, additional_arguments, log_directory, compress_viewer)
+    if result.returncode == 0:
+        read_viewer(result)
+    return result
+
+
+def run_sim(result: OptimizerResult,
+            additional_arguments: Sequence[str] = (),
+            log_directory: Path | None = None,
+            compress_viewer: bool = False,
+            allocation: CpuAllocation | None = None) -> OptimizerResult:
+    """
+    The gcsim half of `simulate`: run the sim and parse the DPS summary from its output.
+    """
+    config_file = result.config_file
+    logger.info("Generating viewer file for %s...", config_file)
+    with open_log(log_directory, config_file, 'a') as log_file:
+        start = time.perf_counter()
+        result.returncode, result.summary, result.sim_peak_rss = _run_gcsim(
+            sim_arguments(result, additional_arguments, compress_viewer), log_file, allocation)
+        result.sim_seconds = time.perf_counter() - start
+
+    if result.returncode != 0:
+        logger.error("Sim for %s failed with exit code %d", config_file, result.returncode)
+    return result
+
+
+@dataclass(frozen=True)
+class PrecisionTarget:
+    """
+    How precisely a sim should measure mean DPS: it runs `initial_iterations` iterations, then more in chunks until the
+    standard error of the mean is at most `standard_error` (a fraction of the mean DPS if `relative`), or until
+    `max_iterations` have run.
+    """
+    standard_error: float
+    relative: bool = False
+    initial_iterations: int = 100
+    max_iterations: int = 100_000
+
+    @classmethod
+    def parse(cls, text: str, **kwargs) -> "PrecisionTarget":
+        """
+        Parse a target like "50" (DPS) or "0.5%" (of the mean DPS).
+        """
+        relative = text.strip().endswith("%")
+        value = float(text.strip().removesuffix("%"))
+        if value <= 0:
+            raise ValueError(f"The standard error target must be positive: {text!r}")
+        return cls(value / 100 if relative else value, relative, **kwargs)
+
+    def threshold(self, dps: float) -> float:
+        return self.standard_error * abs(dps) if self.relative else self.standard_error
+
+    def arguments(self) -> list[str]:
+        """
+        The target as arguments, for cache keys.
+        """
+        return [f"--target-se={self.standard_error}{'r' if self.relative else ''}",
+                f"--initial-iterations={self.initial_iterations}",
+                f"--max-iterations={self.max_iterations}"]
+
+
+def run_sim_adaptive(result: OptimizerResult,
+                     target: PrecisionTarget,
+                     additional_arguments: Sequence[str] = (),
+                     log_directory: Path | None = None,
+                     compress_viewer: bool = False,
+                     allocation: CpuAllocation | None = None) -> OptimizerResult:
+    """
+    Like `simulate`, but instead of the iteration count in the script, run the sim in chunks until `target` is met.
+    Each chunk is an independent sim of the script with its iteration count replaced, and the chunks' statistics are
+    pooled into the result, whose `iterations` records how many were run in total. The viewer file is that of the last
+    chunk.
+
+    The chunks are only independent if the script doesn't fix the random seed.
+    """
+    config_file = result.config_file
+    script = config_file.read_text()
+    summaries: list[tuple[int, DPSSummary]] = []
+    characters = []
+    result.sim_seconds = 0.0
+    iterations = 0
+    chunk = target.initial_iterations
+    with tempfile.TemporaryDirectory(prefix="gcsim-chunk-") as directory:
+        # Keep the config's name, so that the log file and gcsim's output refer to it
+        chunk_file = Path(directory) / config_file.name
+        while True:
+            chunk_file.write_text(update_iterations(script, chunk))
+            chunk_result = run_sim(replace(result, config_file=chunk_file), additional_arguments, log_directory,
+                                   compress_viewer, allocation)
+            result.returncode = chunk_result.returncode
+            result.sim_seconds += chunk_result.sim_seconds
+            if chunk_result.sim_peak_rss is not None:
+                result.sim_peak_rss = max(result.sim_peak_rss or 0, chunk_result.sim_peak_rss)
+            if chunk_result.returncode != 0 or chunk_result.summary is None:
+                return result
+            read_viewer(chunk_result)
+            result.output_file = chunk_result.output_file
+            summaries.append((chunk, chunk_result.summary))
+            characters.append((chunk, chunk_result.characters))
+            iterations += chunk
+
+            summary = pool_summaries(summaries)
+            threshold = target.threshold(summary.dps)
+            logger.info("%s: %d iterations, standard error %.2f (target %.2f)",
+                        config_file.name, iterations, summary.std_dps / math.sqrt(iterations), threshold)
+            if summary.std_dps / math.sqrt(iterations) <= threshold or iterations >= target.max_iterations:
+                break
+            needed = math.ceil((summary.std_dps / threshold) ** 2) if threshold > 0 else target.max_iterations
+            chunk = min(max(target.initial_iterations, needed - iterations), target.max_iterations - iterations)
+
+    result.summary = summary
+    if all(chunk_characters for _, chunk_characters in characters):
+        result.characters = pool_character_stats(characters)
+    result.iterations = iterations
+    write_summary_sidecar(result)
+    return result
+
+
+def read_viewer(result: OptimizerResult) -> OptimizerResult:
+    """
+    The parsing half of `simulate`: read per-character stats from the viewer file and save the summary sidecar.
+    """
+    result.output_file = find_viewer_file(result.output_file) or result.output_file
+    result.characters = read_character_stats(result.output_file)
+    write_summary_sidecar(result)
+    return result
+
+
+def optimize(config_file: Path,
+             additional_arguments: Sequence[str] = (),
+             viewer_json_directory: Path = VIEWER_JSON_DIRECTORY,
+             log_directory: Path | None = None,
+             compress_viewer: bool = False,
+             skip_optimization: bool = False) -> OptimizerResult:
+    """
+    Optimize substats for `config_file`, then run a full sim of the result, writing the viewer file to
+    `viewer_json_directory` (gzipped if `compress_viewer`) along with a small `.summary.json` sidecar. Returns the
+    parsed DPS summary and per-character stats along with gcsim's exit code and the time spent in each phase.
+
+    Substat optimization is skipped if `skip_optimization` is set or the config is marked with
+    `SUBSTATS_OPTIMIZED_MARKER`.
+
+    gcsim's output is discarded once parsed unless `log_directory` is given, in which case it is saved to
+    `<log_directory>/<config name>.log`.
+    """
+    result = start_result(config_file, viewer_json_directory)
+    if not (skip_optimization or substats_optimized(result.config_file)):
+        optimize_substats(result, log_directory)
+        if result.returncode != 0:
+            return result
+    else:
+        truncate_log(log_directory, result.config_file)
+
+    return simulate(result, additional_arguments, log_directory, compress_viewer)
 
 
 def main():
@@ -16,40 +309,34 @@ def main():
         nargs="*",
         help="Additional arguments to pass to gcsim.",
     )
+    parser.add_argument("--log-directory", help="Save gcsim's full output to this directory.", type=Path)
+    parser.add_argument("--gzip-viewer", help="Keep the viewer file gzip-compressed.", action="store_true")
+    parser.add_argument("--substats-optimized",
+                        help="Skip substat optimization and only run the final sim.",
+                        action="store_true")
     args = parser.parse_args()
 
-    config_file_path = args.filename
-    argument = " ".join(args.additional_arguments)
-
-    base_filename = os.path.basename(config_file_path)
-    output_filename, _ = os.path.splitext(base_filename)
-    output_filename += ".json"
-
-    viewer_json_dir = "viewer_json"
-    os.makedirs(viewer_json_dir, exist_ok=True)
-
-    output_file_path = os.path.join(viewer_json_dir, output_filename)
-
-    if not os.path.exists(config_file_path):
-        print(f"Error: Input file not found at {config_file_path}")
-        sys.exit(1)
-
     try:
-        print(f"Running substat optimization for {config_file_path}...")
-        # First gcsim command
-        gcsim("-c", config_file_path, "-s", "-substatOptimFull")
-
-        print(f"Generating viewer file for {config_file_path}...")
-        # Second gcsim command
-        # We need to handle the case where 'argument' is an empty string.
-        command = ["-c", config_file_path, "-out", output_file_path, "-gz=false"]
-        if argument:
-            command.append(argument)
-        
-        gcsim(*command)
-
-        print("Script finished successfully.")
-
+        result = optimize(Path(args.filename),
+                          args.additional_arguments,
+                          log_directory=args.log_directory,
+                          compress_viewer=args.gzip_viewer,
+                          skip_optimization=args.substats_optimized)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         sys.exit(1)
+
+    if result.summary is not None:
+        summary = result.summary
+        print(f"Average {summary.average_damage:.2f} damage over {summary.duration:.2f} seconds, resulting in "
+              f"{summary.dps:.0f} dps (min: {summary.min_dps:.2f} max: {summary.max_dps:.2f} "
+              f"std: {summary.std_dps:.2f})")
+
+    if result.returncode != 0:
+        print(f"gcsim exited with code {result.returncode}.")
+        sys.exit(result.returncode)
+
+    print("Script finished successfully.")
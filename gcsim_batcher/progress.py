@@ -0,0 +1,290 @@
+import collections
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TextIO
+
+from .results import OptimizerResult
+
+
+logger = logging.getLogger(__name__)
+
+
+# How far back the configs-per-minute rate (and so the ETA) looks
+RATE_WINDOW_SECONDS = 600.0
+# How often the terminal display is redrawn
+DISPLAY_SECONDS = 1.0
+# How often progress is logged instead when the output isn't a terminal
+LOG_SECONDS = 60.0
+
+
+def _cpu_times() -> tuple[float, float] | None:
+    """
+    The machine's busy and total CPU time so far, from /proc/stat, or None where that can't be read.
+    """
+    try:
+        with open("/proc/stat", "r") as f:
+            fields = [float(field) for field in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle and iowait
+    return sum(fields) - idle, sum(fields)
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """
+    Live counts for the batches being run: configs done, failed, running and still to come, the recent rate of
+    configs simmed per minute, the ETA that rate gives, and how busy the machine's CPUs are. Fed by `run.run_batch`
+    and `run.run_config` through `RunOptions.progress`, and read by `ProgressDisplay` and `MetricsServer`.
+
+    Configs that finish without a sim of their own (cached, resumed or duplicate configs) count as done, but not
+    towards the rate, so that they don't make the ETA optimistic.
+    """
+
+    def __init__(self, window_seconds: float = RATE_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.cached = 0
+        self.running = 0
+        self.started_at = time.monotonic()
+        self._open_inputs = 0
+        self._finish_times: collections.deque[float] = collections.deque()
+        self._cpu_sample = (self.started_at, _cpu_times())
+        self._cpu_utilization: float | None = None
+        self._lock = threading.Lock()
+
+    def expect(self, count: int = 1):
+        """
+        Count `count` more configs to run.
+        """
+        with self._lock:
+            self.total += count
+
+    def open_input(self):
+        """
+        Note that more configs may still be `expect`ed, so the total isn't known yet.
+        """
+        with self._lock:
+            self._open_inputs += 1
+
+    def close_input(self):
+        with self._lock:
+            self._open_inputs -= 1
+
+    def config_started(self):
+        with self._lock:
+            self.running += 1
+
+    def config_stopped(self):
+        with self._lock:
+            self.running -= 1
+
+    def config_finished(self, result: OptimizerResult, simmed: bool = True):
+        """
+        Count a config as done. `simmed` is false for a config that reused another's result.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.done += 1
+            if not result.ok:
+                self.failed += 1
+            if result.cached or not simmed:
+                self.cached += 1
+            elif result.ok:
+                self._finish_times.append(now)
+
+    @property
+    def total_known(self) -> bool:
+        return self._open_inputs <= 0
+
+    def configs_per_minute(self) -> float:
+        """
+        The rate configs were simmed at over the last `window_seconds` (or since the start, if that's sooner).
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._finish_times and self._finish_times[0] < now - self.window_seconds:
+                self._finish_times.popleft()
+            simmed = len(self._finish_times)
+        elapsed = min(now - self.started_at, self.window_seconds)
+        return simmed * 60 / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> float | None:
+        """
+        How long the remaining configs should take at the current rate, or None if that can't be told yet.
+        """
+        rate = self.configs_per_minute()
+        if not self.total_known or rate <= 0:
+            return None
+        return max(self.total - self.done, 0) * 60 / rate
+
+    def cpu_utilization(self) -> float | None:
+        """
+        The fraction of the machine's CPU time spent busy since this was last measured, at least a second ago.
+        """
+        now = time.monotonic()
+        with self._lock:
+            sampled_at, previous = self._cpu_sample
+            if now - sampled_at >= 1.0 and previous is not None:
+                current = _cpu_times()
+                if current is not None and current[1] > previous[1]:
+                    self._cpu_utilization = (current[0] - previous[0]) / (current[1] - previous[1])
+                self._cpu_sample = (now, current)
+            return self._cpu_utilization
+
+    def summary(self) -> str:
+        """
+        A one-line summary, e.g. "[120/400] 30% | 4 running | 1 failed | 3.2 configs/min | ETA 1h27m | CPU 97%".
+        """
+        total = f"{self.total}" if self.total_known else f"{self.total}+"
+        parts = [f"[{self.done}/{total}]"]
+        if self.total_known and self.total:
+            parts[0] += f" {self.done * 100 // self.total}%"
+        parts.append(f"{self.running} running")
+        if self.failed:
+            parts.append(f"{self.failed} failed")
+        parts.append(f"{self.configs_per_minute():.1f} configs/min")
+        eta = self.eta_seconds()
+        parts.append(f"ETA {_format_duration(eta)}" if eta is not None else "ETA ?")
+        cpu = self.cpu_utilization()
+        if cpu is not None:
+            parts.append(f"CPU {cpu:.0%}")
+        return " | ".join(parts)
+
+    def metrics(self) -> str:
+        """
+        The counts in the Prometheus text exposition format.
+        """
+        eta = self.eta_seconds()
+        cpu = self.cpu_utilization()
+        metrics = [
+            ("configs_expected", "gauge", "Configs in the batch so far.", self.total),
+            ("configs_done_total", "counter", "Configs finished, including failed and cached ones.", self.done),
+            ("configs_failed_total", "counter", "Configs that failed.", self.failed),
+            ("configs_cached_total", "counter", "Configs that reused a previous or identical config's result.",
+             self.cached),
+            ("configs_running", "gauge", "Configs being run right now.", self.running),
+            ("configs_per_minute", "gauge", "Configs simmed per minute, recently.", self.configs_per_minute()),
+            ("eta_seconds", "gauge", "Expected seconds until the batch finishes.", eta if eta is not None else math.nan),
+            ("cpu_utilization", "gauge", "Fraction of the machine's CPU time spent busy.",
+             cpu if cpu is not None else math.nan),
+            ("cores", "gauge", "CPU cores on the machine.", os.cpu_count() or 1),
+        ]
+        lines = []
+        for name, kind, description, value in metrics:
+            lines.append(f"# HELP gcsim_batcher_{name} {description}")
+            lines.append(f"# TYPE gcsim_batcher_{name} {kind}")
+            lines.append(f"gcsim_batcher_{name} {'NaN' if math.isnan(value) else value}")
+        return "\n".join(lines) + "\n"
+
+
+class ProgressDisplay:
+    """
+    Keeps `progress`'s summary on the last line of a terminal, redrawing it every `DISPLAY_SECONDS`. Log messages
+    written to the same terminal clear the line first, and the summary is redrawn below them. If `stream` isn't a
+    terminal, the summary is logged every `LOG_SECONDS` instead.
+    """
+
+    def __init__(self, progress: Progress, stream: TextIO = sys.stderr):
+        self.progress = progress
+        self.stream = stream
+        self.interactive = stream.isatty()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(DISPLAY_SECONDS if self.interactive else LOG_SECONDS):
+            self._draw()
+
+    def _draw(self):
+        if self.interactive:
+            self.stream.write(f"\r\x1b[K{self.progress.summary()}")
+            self.stream.flush()
+        else:
+            logger.info('Progress: %s', self.progress.summary())
+
+    def _clear_line(self, record: logging.LogRecord) -> bool:
+        self.stream.write("\r\x1b[K")
+        return True
+
+    def _handlers(self) -> list[logging.Handler]:
+        return [handler for handler in logging.getLogger().handlers if getattr(handler, "stream", None) is self.stream]
+
+    def __enter__(self) -> "ProgressDisplay":
+        if self.interactive:
+            for handler in self._handlers():
+                handler.addFilter(self._clear_line)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        for handler in self._handlers():
+            handler.removeFilter(self._clear_line)
+        self._draw()
+        if self.interactive:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+class MetricsServer:
+    """
+    Serves `progress` at http://`host`:`port`/metrics for Prometheus to scrape, while the context is open. Only
+    listens on localhost by default. Port 0 picks a free port (see `url`).
+    """
+
+    def __init__(self, progress: Progress, port: int, host: str = "127.0.0.1"):
+        self.progress = progress
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def __enter__(self) -> "MetricsServer":
+        self._thread.start()
+        logger.info('Serving metrics at %s', self.url)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        progress = self.progress
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                data = progress.metrics().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
@@ -0,0 +1,150 @@
+import logging
+import math
+import re
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+
+SUMMARY_PATTERN = re.compile(r'Average ([\d.]+) damage over ([\d.]+) seconds, resulting in ([\d]+) dps '
+                             r'\(min: ([\d.]+) max: ([\d.]+) std: ([\d.]+)\)')
+
+
+@dataclass
+class DPSSummary:
+    """
+    The team DPS summary gcsim prints at the end of a sim.
+    """
+    average_damage: float
+    duration: float
+    dps: float
+    min_dps: float
+    max_dps: float
+    std_dps: float
+
+
+@dataclass
+class CharacterStats:
+    """
+    Personal DPS statistics for a single character, as reported in the viewer JSON.
+    """
+    name: str
+    min: float
+    max: float
+    mean: float
+    sd: float
+
+
+@dataclass
+class OptimizerResult:
+    """
+    The outcome of running the optimizer pipeline on a single config.
+    """
+    config_file: Path
+    returncode: int
+    output_file: Path | None = None
+    summary: DPSSummary | None = None
+    characters: list[CharacterStats] = field(default_factory=list)
+    optimize_seconds: float = 0.0
+    sim_seconds: float = 0.0
+    cached: bool = False
+    # The team (base script) the config was generated for, in a multi-team sweep
+    team: str | None = None
+    # The number of iterations of the final sim, if it was chosen to reach a precision target
+    iterations: int | None = None
+    # Peak resident set size of each phase's gcsim process, in bytes
+    optimize_peak_rss: int | None = None
+    sim_peak_rss: int | None = None
+    # The `cache.script_digest` of the config as it was before running (gcsim rewrites it with optimized substats)
+    script_digest: str | None = None
+
+    @property
+    def name(self) -> str:
+        return self.config_file.stem
+
+    @property
+    def peak_rss(self) -> int | None:
+        peaks = [peak for peak in (self.optimize_peak_rss, self.sim_peak_rss) if peak is not None]
+        return max(peaks) if peaks else None
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and self.summary is not None
+
+
+def parse_summary_line(line: str) -> DPSSummary | None:
+    """
+    Parse gcsim's "Average ... dps" summary line, returning None if `line` isn't one.
+    """
+    match = SUMMARY_PATTERN.search(line)
+    if match is None:
+        return None
+    return DPSSummary(*(float(group) for group in match.groups()))
+
+
+def _pooled_moments(chunks: Sequence[tuple[int, float, float]]) -> tuple[float, float]:
+    """
+    The mean and standard deviation of the union of samples, given each one's (count, mean, standard deviation).
+    """
+    total = sum(count for count, _, _ in chunks)
+    mean = sum(count * chunk_mean for count, chunk_mean, _ in chunks) / total
+    variance = sum(count * (sd ** 2 + (chunk_mean - mean) ** 2) for count, chunk_mean, sd in chunks) / total
+    return mean, math.sqrt(variance)
+
+
+def pool_summaries(chunks: Sequence[tuple[int, DPSSummary]]) -> DPSSummary:
+    """
+    Combine the summaries of several independent sims of the same config, each with the given iteration count, into
+    the summary of one sim with all of their iterations.
+    """
+    total = sum(iterations for iterations, _ in chunks)
+    dps, std_dps = _pooled_moments([(iterations, summary.dps, summary.std_dps) for iterations, summary in chunks])
+    return DPSSummary(average_damage=sum(iterations * summary.average_damage for iterations, summary in chunks) / total,
+                      duration=sum(iterations * summary.duration for iterations, summary in chunks) / total,
+                      dps=dps,
+                      min_dps=min(summary.min_dps for _, summary in chunks),
+                      max_dps=max(summary.max_dps for _, summary in chunks),
+                      std_dps=std_dps)
+
+
+def pool_character_stats(chunks: Sequence[tuple[int, list[CharacterStats]]]) -> list[CharacterStats]:
+    """
+    Combine each character's stats from several independent sims of the same config, like `pool_summaries`.
+    """
+    pooled = []
+    for position, character in enumerate(chunks[0][1]):
+        stats = [(iterations, characters[position]) for iterations, characters in chunks]
+        mean, sd = _pooled_moments([(iterations, stat.mean, stat.sd) for iterations, stat in stats])
+        pooled.append(CharacterStats(name=character.name,
+                                     min=min(stat.min for _, stat in stats),
+                                     max=max(stat.max for _, stat in stats),
+                                     mean=mean,
+                                     sd=sd))
+    return pooled
+
+
+def result_to_dict(result: OptimizerResult) -> dict:
+    """
+    Convert a result to plain JSON-serializable data.
+    """
+    data = asdict(result)
+    data['config_file'] = str(result.config_file)
+    data['output_file'] = str(result.output_file) if result.output_file is not None else None
+    return data
+
+
+def result_from_dict(data: dict) -> OptimizerResult:
+    """
+    The inverse of `result_to_dict`.
+    """
+    data = dict(data)
+    data['config_file'] = Path(data['config_file'])
+    if data.get('output_file') is not None:
+        data['output_file'] = Path(data['output_file'])
+    if data.get('summary') is not None:
+        data['summary'] = DPSSummary(**data['summary'])
+    data['characters'] = [CharacterStats(**c) for c in data.get('characters', [])]
+    return OptimizerResult(**data)
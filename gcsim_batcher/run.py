@@ -1,98 +1,683 @@
 import argparse
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager, nullcontext
 import csv
-import json
+from dataclasses import dataclass, replace
 import logging
 import os
 from pathlib import Path
-import re
-import subprocess
+import threading
+import time
 
+from .cache import DEFAULT_CACHE_DIRECTORY, DEFAULT_MAX_BYTES, ResultCache, cache_key, script_digest
+from .journal import Journal, journal_path
+from .memory import MemoryGovernor, format_size, parse_size
+from .optimizer import (SUBSTATS_OPTIMIZED_MARKER, VIEWER_JSON_DIRECTORY, PrecisionTarget, optimize_substats,
+                        read_viewer, run_sim, run_sim_adaptive, start_result, substats_optimized, truncate_log)
+from .results import OptimizerResult
+from .schedule import CorePool, DurationHistory, available_cores, plan
+from .progress import MetricsServer, Progress, ProgressDisplay
+from .store import ResultStore
+from .substats import SubstatMemo
+from .trace import Tracer, span
 
-def run_batch(commands, csv_path: Path):
+
+def default_jobs() -> int:
     """
-    Runs a batch of gcsim commands, parses the output, and writes to a CSV file.
+    The default number of configs to run concurrently: one per available core.
     """
-    logging.info('Script started. Output CSV file: %s', csv_path)
+    return os.cpu_count() or 1
 
-    for command in commands:
-        logging.info('Processing command: %s', command)
-        # The command is now a list of arguments
-        command_str = " ".join(command)
-        batch_name_match = re.search(r'"(.*).txt"', command_str)
 
-        if batch_name_match is not None:
-            batch_name = batch_name_match.group(1)
-            logging.info('Batch name: %s', batch_name)
-        else:
-            # Fallback for batch name
+def result_row(result: OptimizerResult, extra: Sequence = ()) -> list:
+    """
+    Build the CSV row for a single config's result. `extra` columns go after the team DPS columns (and the config's
+    team, in a multi-team sweep), before the per-character ones.
+    """
+    summary = result.summary
+    if summary is not None:
+        # Written the way gcsim prints them: whole DPS, everything else to two decimal places
+        average_damage, dps = f"{summary.average_damage:.2f}", f"{summary.dps:.0f}"
+        min_dps, max_dps, std_dps = (f"{value:.2f}" for value in (summary.min_dps, summary.max_dps, summary.std_dps))
+    else:
+        average_damage = dps = min_dps = max_dps = std_dps = None
+
+    row = [result.name, 'Total Avg Damage:', average_damage, 'DPS:', dps, 'Min DPS:', min_dps, 'Max DPS:', max_dps, 'Std DPS:', std_dps]
+    if result.team is not None:
+        row.extend(['Team:', result.team])
+    row.extend(extra)
+
+    for character in result.characters:
+        row.extend([character.name, "Min DPS:", character.min, "Max DPS:", character.max, "Mean DPS:", character.mean, "Std DPS:", character.sd])
+
+    return row
+
+
+@dataclass(frozen=True)
+class RunOptions:
+    """
+    Settings that apply to every config in a batch.
+    """
+    additional_arguments: Sequence[str] = ()
+    # Reuse results of identical configs from previous runs
+    cache: ResultCache | None = None
+    # Keep each config's full gcsim output here
+    log_directory: Path | None = None
+    # Where viewer files are written
+    viewer_json_directory: Path = VIEWER_JSON_DIRECTORY
+    # Keep viewer files gzipped
+    compress_viewer: bool = False
+    # Treat every config as already having optimized substats, so that only the final sim runs
+    substats_optimized: bool = False
+    # Record how long each stage of each config takes
+    tracer: Tracer | None = None
+    # Also save results to this database, as a batch named after the CSV
+    store: ResultStore | None = None
+    # How many threads each gcsim process may use (chosen with the number of processes if None)
+    threads: int | None = None
+    # Pin each gcsim process to its own cores
+    pin_cores: bool = False
+    # Run the configs that took longest last time first, and record how long they take this time
+    history: DurationHistory | None = None
+    # Don't start a gcsim process unless the peak memory expected of all running processes fits in this many bytes
+    memory_budget: int | None = None
+    # Don't start a gcsim process unless it would leave this many bytes of memory available
+    memory_reserve: int | None = None
+    # Reuse the optimized substats of configs with the same character builds instead of optimizing again
+    substat_memo: SubstatMemo | None = None
+    # Optimize every config's substats even if the memo has them, to get exact results (the memo is still updated)
+    reoptimize_substats: bool = False
+    # Run each final sim in chunks until its mean DPS is this precise, instead of at the script's iteration count
+    precision: PrecisionTarget | None = None
+    # Count configs as they run and finish, for a progress display or metrics
+    progress: Progress | None = None
+
+
+STORE_BATCH_SIZE = 100
+
+
+# A limit on gcsim processes shared with other commands on this machine (see `daemon`)
+_shared_process_limit = None
+
+
+def share_process_limit(semaphore):
+    """
+    Make every batch in this process also hold `semaphore` while a gcsim process runs, so that concurrent commands
+    don't oversubscribe the CPU between them.
+    """
+    global _shared_process_limit
+    _shared_process_limit = semaphore
+
+
+class StageLimits:
+    """
+    Concurrency limits for the two gcsim phases of the optimizer. Each phase has its own limit, and `processes` caps
+    the number of gcsim processes running in either phase at once. Each phase's context gives the gcsim process its
+    `schedule.CpuAllocation` from `cores`, if given, and waits for `memory` to admit the process, if given.
+    """
+
+    def __init__(self,
+                 processes: int,
+                 optimize: int | None = None,
+                 sim: int | None = None,
+                 cores: CorePool | None = None,
+                 memory: MemoryGovernor | None = None):
+        self.processes = processes
+        self.optimize = optimize or processes
+        self.sim = sim or processes
+        self._processes = threading.BoundedSemaphore(self.processes)
+        self._optimize = threading.BoundedSemaphore(self.optimize)
+        self._sim = threading.BoundedSemaphore(self.sim)
+        self._shared = _shared_process_limit if _shared_process_limit is not None else nullcontext()
+        self.cores = cores
+        self.memory = memory
+
+    @property
+    def workers(self) -> int:
+        """
+        How many configs can be in flight at once: enough to keep both stages busy.
+        """
+        return min(self.optimize + self.sim, 2 * self.processes)
+
+    @contextmanager
+    def _process(self, phase: str):
+        with self._processes, self._shared, self.memory.admit(phase) if self.memory else nullcontext():
+            if self.cores is None:
+                yield None
+            else:
+                with self.cores.allocate() as allocation:
+                    yield allocation
+
+    @contextmanager
+    def optimizing(self):
+        with self._optimize, self._process("optimize") as allocation:
+            yield allocation
+
+    @contextmanager
+    def simulating(self):
+        with self._sim, self._process("sim") as allocation:
+            yield allocation
+
+    def observe(self, phase: str, peak_rss: int | None):
+        """
+        Tell the memory governor (if any) how much memory a finished gcsim process of `phase` used.
+        """
+        if self.memory is not None:
+            self.memory.observe(phase, peak_rss)
+
+
+def _log_result(result: OptimizerResult):
+    logging.info('%s finished with exit code %d (optimize %.1fs, sim %.1fs, peak memory %s)',
+                 result.name, result.returncode, result.optimize_seconds, result.sim_seconds,
+                 format_size(result.peak_rss))
+    if result.summary is not None:
+        summary = result.summary
+        logging.info('Parsed DPS info: Avg Damage=%s, Duration=%s, DPS=%s, Min DPS=%s, Max DPS=%s, Std DPS=%s',
+                     summary.average_damage, summary.duration, summary.dps, summary.min_dps, summary.max_dps,
+                     summary.std_dps)
+    for character in result.characters:
+        logging.info('Character details: %s, Min DPS=%s, Max DPS=%s, Mean DPS=%s, Std DPS=%s',
+                     character.name, character.min, character.max, character.mean, character.sd)
+
+
+def run_locally(config_file: Path, options: RunOptions, limits: StageLimits) -> OptimizerResult:
+    """
+    Runs both optimizer phases for a config on this machine.
+
+    The substat optimization and the final sim are scheduled separately through `limits`, so that one config's
+    optimization can overlap another's sim. Optimization is skipped for configs marked as already optimized (see
+    `optimizer.substats_optimized`).
+    """
+    result = start_result(config_file, options.viewer_json_directory)
+    if options.substats_optimized or substats_optimized(result.config_file):
+        logging.info('%s: substats already optimized', result.name)
+        truncate_log(options.log_directory, result.config_file)
+    else:
+        with (options.substat_memo.claim(result.config_file, reuse=not options.reoptimize_substats)
+              if options.substat_memo is not None else nullcontext()) as claim:
+            if claim is not None and claim.reused:
+                logging.info('%s: reusing optimized substats of the same builds', result.name)
+                truncate_log(options.log_directory, result.config_file)
+            else:
+                with limits.optimizing() as allocation, span(options.tracer, result.name, "optimize"):
+                    optimize_substats(result, options.log_directory, allocation)
+                    limits.observe("optimize", result.optimize_peak_rss)
+                if result.returncode != 0:
+                    return result
+                if claim is not None:
+                    claim.record()
+
+    with limits.simulating() as allocation, span(options.tracer, result.name, "sim"):
+        if options.precision is not None:
+            run_sim_adaptive(result, options.precision, options.additional_arguments, options.log_directory,
+                             options.compress_viewer, allocation)
+            limits.observe("sim", result.sim_peak_rss)
+            return result
+        run_sim(result, options.additional_arguments, options.log_directory, options.compress_viewer, allocation)
+        limits.observe("sim", result.sim_peak_rss)
+    if result.returncode == 0:
+        with span(options.tracer, result.name, "parse"):
+            read_viewer(result)
+    return result
+
+
+type ConfigRunner = Callable[[Path, RunOptions, StageLimits], OptimizerResult]
+
+
+def cache_arguments(options: RunOptions) -> list[str]:
+    """
+    The arguments a config's cache key is built from: gcsim's, plus stand-ins for the options that change its result.
+    """
+    arguments = list(options.additional_arguments)
+    if options.precision is not None:
+        arguments.extend(options.precision.arguments())
+    if options.substats_optimized:
+        arguments.append("--substats-optimized")
+    if options.substat_memo is not None and not options.reoptimize_substats:
+        # Reused substats are close to, but not exactly, what a full optimization would find
+        arguments.append("--reuse-substats")
+    return arguments
+
+
+def cache_result(options: RunOptions, key: str, config_file: Path, result: OptimizerResult):
+    """
+    Cache `result` under `key`, and under the key of `config_file` as it is now, if the substat optimization rewrote
+    it: a config left as gcsim rewrote it (see `generate.write_variants`) then finds the result on the next run too.
+    """
+    options.cache.put(key, result)
+    if not result.ok:
+        return
+    try:
+        rewritten = cache_key(Path(config_file).read_text(), cache_arguments(options))
+    except OSError:
+        return
+    if rewritten != key:
+        options.cache.put(rewritten, result)
+
+
+def run_config(config_file: Path,
+               options: RunOptions = RunOptions(),
+               limits: StageLimits | None = None,
+               runner: ConfigRunner = run_locally) -> OptimizerResult:
+    """
+    Runs the optimizer on a single config with `runner` (on this machine by default) and logs what it found. If
+    `options.cache` is given, a config whose text, gcsim binary and arguments match a previous run reuses that run's
+    result instead of simulating again.
+    """
+    limits = limits or StageLimits(1)
+    logging.info('Processing config: %s', config_file)
+    key = None
+    if options.cache is not None:
+        key = cache_key(Path(config_file).read_text(), cache_arguments(options))
+        result = options.cache.get(key, config_file)
+        if result is not None:
+            logging.info('%s: using cached result', result.name)
+            return result
+
+    if options.progress is not None:
+        options.progress.config_started()
+    try:
+        result = runner(config_file, options, limits)
+    finally:
+        if options.progress is not None:
+            options.progress.config_stopped()
+
+    if options.cache is not None:
+        cache_result(options, key, config_file, result)
+    _log_result(result)
+    return result
+
+
+def run_batch(configs: Iterable[Path],
+              csv_path: Path,
+              jobs: int | None = None,
+              options: RunOptions = RunOptions(),
+              resume: bool = False,
+              optimize_jobs: int | None = None,
+              sim_jobs: int | None = None,
+              runner: ConfigRunner = run_locally) -> list[OptimizerResult]:
+    """
+    Runs the optimizer on a batch of configs, parses the output, and writes to a CSV file. Each config is run with
+    `runner`, which runs it on this machine by default.
+
+    Up to `jobs` gcsim processes run concurrently, each limited to `options.threads` threads; by default these are
+    chosen to fill the available cores (see `schedule.plan`). `optimize_jobs` and `sim_jobs` further limit how many
+    of those processes may be substat optimizations and final sims respectively. Rows are written in the order
+    of `configs` regardless of which config finishes first, and a config that fails gets an empty row rather than
+    stopping the batch.
+
+    `configs` is consumed lazily, only a little ahead of the configs being run, so it may be a generator that is
+    still producing configs while the first ones are simulated.
+
+    Configs whose scripts are identical (see `cache.script_digest`) are only run once, and each of them gets a row
+    with that run's result.
+
+    Each finished config is recorded in a journal next to the CSV. With `resume`, configs that the journal says
+    finished successfully are skipped, and the batch's CSV rows are rewritten in order from the journal and the
+    remaining configs.
+
+    If `options.store` is set, results are also added to it in bulk as they finish.
+
+    If `options.history` is set and `configs` is a sequence rather than a generator, configs are started longest
+    expected duration first (the CSV rows keep their order).
+
+    If `options.progress` is set, configs are counted in it as they are read, run and finished.
+    """
+    progress = options.progress
+    submitted: list[Path] = []
+    if isinstance(configs, Sequence):
+        submitted = list(configs)
+        order = options.history.longest_first(submitted) if options.history is not None else range(len(submitted))
+        pending_configs = ((i, submitted[i]) for i in order)
+        if progress is not None:
+            progress.expect(len(submitted))
+    else:
+        def read_configs():
+            if progress is not None:
+                progress.open_input()
+            try:
+                for config in configs:
+                    submitted.append(config)
+                    if progress is not None:
+                        progress.expect()
+                    yield len(submitted) - 1, config
+            finally:
+                if progress is not None:
+                    progress.close_input()
+        pending_configs = read_configs()
+
+    cores = available_cores()
+    batch_size = len(submitted) if isinstance(configs, Sequence) else None
+    processes, threads = plan(len(cores), jobs, options.threads, batch_size)
+    memory = None
+    if options.memory_budget is not None or options.memory_reserve is not None:
+        memory = MemoryGovernor(options.memory_budget, options.memory_reserve)
+    limits = StageLimits(processes, optimize_jobs, sim_jobs, CorePool(cores, threads, options.pin_cores), memory)
+    logging.info('Script started. Output CSV file: %s (%d jobs of %d threads: %d optimizing, %d simulating)',
+                 csv_path, limits.processes, threads, limits.optimize, limits.sim)
+
+    results: dict[int, OptimizerResult] = {}
+    next_row = 0
+    # The first config with each script, and the later configs waiting on its result
+    first_with_script: dict[str, int] = {}
+    duplicates: dict[int, list[int]] = {}
+    # Each config's script digest, taken before gcsim rewrites it
+    digests: dict[int, str] = {}
+    reused = 0
+
+    journal = Journal(journal_path(csv_path))
+    finished: dict[str, OptimizerResult] = {}
+    if resume and journal.path.exists():
+        csv_offset, finished = journal.resume()
+        logging.info('Resuming batch: %d configs already finished', sum(result.ok for result in finished.values()))
+        if csv_path.exists():
+            with open(csv_path, 'r+b') as csvfile:
+                csvfile.truncate(csv_offset)
+    else:
+        journal.start(csv_path.stat().st_size if csv_path.exists() else 0)
+
+    def write_ready_rows():
+        nonlocal next_row
+        while next_row in results:
+            with span(options.tracer, results[next_row].name, "write"):
+                extra = ['Iterations:', results[next_row].iterations] if options.precision is not None else ()
+                row = result_row(results[next_row], extra)
+                with open(csv_path, 'a', newline='') as csvfile:
+                    writer = csv.writer(csvfile)
+                    writer.writerow(row)
+                    logging.info('Written row to CSV: %s', row)
+            next_row += 1
+
+    in_flight: dict[Future, int] = {}
+    batch_id = options.store.start_batch(csv_path.stem) if options.store is not None else None
+    unstored: list[OptimizerResult] = []
+
+    def store_results():
+        if unstored:
+            options.store.add_results(batch_id, unstored)
+            unstored.clear()
+
+    def finish(i: int, result: OptimizerResult, simmed: bool = True):
+        if i in digests:
+            result = replace(result, script_digest=digests[i])
+        results[i] = result
+        if progress is not None:
+            progress.config_finished(result, simmed)
+        if options.history is not None:
+            options.history.record(result)
+        with span(options.tracer, result.name, "write"):
+            journal.record(submitted[i], result)
+        if options.store is not None:
+            unstored.append(result)
+            if len(unstored) >= STORE_BATCH_SIZE:
+                store_results()
+        for duplicate in duplicates.pop(i, []):
+            finish(duplicate, replace(result, config_file=Path(submitted[duplicate])), simmed=False)
+
+    def submit_more():
+        nonlocal reused
+        # Keep enough configs queued that a worker never waits on the generator, without reading all of them
+        while len(in_flight) < 2 * limits.workers:
+            start = time.perf_counter()
+            i, config = next(pending_configs, (None, None))
+            if config is None:
+                return
+            if options.tracer is not None:
+                # Time spent waiting on `configs` is time spent generating the config
+                options.tracer.record(Path(config).stem, "generate", start, time.perf_counter())
+            previous = finished.get(str(config))
+            if previous is not None and previous.ok:
+                results[i] = previous
+                if progress is not None:
+                    progress.config_finished(previous, simmed=False)
+                continue
+
             try:
-                # Assuming config path is at index 1
-                base = os.path.basename(command[1])
-                batch_name, _ = os.path.splitext(base)
-            except (IndexError, AttributeError):
-                batch_name = "unknown"
-
-
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        output, _ = process.communicate()
-        logging.info('Command output: %s', output.decode(encoding='utf-8', errors="ignore"))
-
-        lines = output.decode(encoding='utf-8', errors="ignore").split('\\n')
-
-        average_damage = duration = dps = min_dps = max_dps = std_dps = None
-
-        for line in lines:
-            pattern = r'Average ([\d.]+) damage over ([\d.]+) seconds, resulting in ([\d]+) dps \(min: ([\d.]+) max: ([\d.]+) std: ([\d.]+)\)'
-            match = re.search(pattern, line)
-            if match:
-                average_damage = match.group(1)
-                duration = match.group(2)
-                dps = match.group(3)
-                min_dps = match.group(4)
-                max_dps = match.group(5)
-                std_dps = match.group(6)
-                logging.info('Parsed DPS info: Avg Damage=%s, Duration=%s, DPS=%s, Min DPS=%s, Max DPS=%s, Std DPS=%s',
-                                average_damage, duration, dps, min_dps, max_dps, std_dps)
-        
-        json_filename = f'./viewer_json/{batch_name}.json'
-        character_details = []
-        try:
-            with open(json_filename, 'r') as json_file:
-                data = json.load(json_file)
-                logging.info('Loaded JSON data from %s', json_filename)
-                # Extract character DPS details
-                if 'character_details' in data and 'statistics' in data and 'character_dps' in data['statistics']:
-                    for i in range(len(data['character_details'])):
-                        name = data['character_details'][i]['name']
-                        stats = data['statistics']['character_dps'][i]
-                        character_details.append({
-                            "name": name,
-                            "min": stats["min"],
-                            "max": stats["max"],
-                            "mean": stats["mean"],
-                            "sd": stats["sd"]
-                        })
-                        logging.info('Character details: %s, Min DPS=%s, Max DPS=%s, Mean DPS=%s, Std DPS=%s',
-                                        name, stats["min"], stats["max"], stats["mean"], stats["sd"])
-        except FileNotFoundError:
-            logging.warning('JSON file not found: %s', json_filename)
-            pass
-        except json.JSONDecodeError as e:
-            logging.error('Error decoding JSON from file %s: %s', json_filename, str(e))
-            pass
-
-        row = [batch_name, 'Total Avg Damage:', average_damage, 'DPS:', dps, 'Min DPS:', min_dps, 'Max DPS:', max_dps, 'Std DPS:', std_dps]
-
-        for character in character_details:
-            row.extend([character["name"], "Min DPS:", character["min"], "Max DPS:", character["max"], "Mean DPS:", character["mean"], "Std DPS:", character["sd"]])
-
-        with open(csv_path, 'a', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(row)
-            logging.info('Written row to CSV: %s', row)
+                digest = script_digest(Path(config).read_text())
+            except (OSError, UnicodeDecodeError) as e:
+                logging.error('Config %s failed: %s', config, e)
+                finish(i, OptimizerResult(config_file=Path(config), returncode=-1))
+                continue
+            digests[i] = digest
+            original = first_with_script.setdefault(digest, i)
+            if original == i:
+                in_flight[executor.submit(run_config, config, options, limits, runner)] = i
+                continue
+
+            logging.info('%s is identical to %s; reusing its result', Path(config).name, Path(submitted[original]).name)
+            reused += 1
+            if original in results:
+                finish(i, replace(results[original], config_file=Path(config)), simmed=False)
+            else:
+                duplicates.setdefault(original, []).append(i)
+
+    executor = ThreadPoolExecutor(max_workers=limits.workers)
+    try:
+        submit_more()
+        write_ready_rows()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error('Config %s failed: %s', submitted[i], e)
+                    result = OptimizerResult(config_file=Path(submitted[i]), returncode=-1)
+                finish(i, result)
+            submit_more()
+            write_ready_rows()
+    finally:
+        # On Ctrl-C, don't start anything new; finished configs are already in the journal.
+        executor.shutdown(wait=True, cancel_futures=True)
+        journal.close()
+        if options.store is not None:
+            store_results()
+        if options.history is not None:
+            options.history.save()
 
     logging.info('Script finished.')
-    print("Batch run Complete!")
+    if reused:
+        print(f"Batch run Complete! {reused} duplicate configs reused another config's result instead of simming.")
+    else:
+        print("Batch run Complete!")
+    batch_results = [results[i] for i in range(len(submitted))]
+    _print_memory_summary(batch_results)
+    return batch_results
+
+
+def _print_memory_summary(results: Sequence[OptimizerResult], highest: int = 5):
+    """
+    Print the configs whose gcsim processes used the most memory. Every config's peak is also logged as it finishes.
+    """
+    measured = sorted((result for result in results if result.peak_rss is not None),
+                      key=lambda result: result.peak_rss,
+                      reverse=True)
+    if not measured:
+        return
+    print(f"Peak memory per config (highest {min(highest, len(measured))} of {len(measured)}):")
+    for result in measured[:highest]:
+        print(f"  {result.name}: {format_size(result.peak_rss)} (optimize {format_size(result.optimize_peak_rss)}, "
+              f"sim {format_size(result.sim_peak_rss)})")
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+def add_run_arguments(parser: argparse.ArgumentParser, jobs_help: str | None = None, default_jobs: int | None = None):
+    """
+    Add the options that control how a batch is run, shared by every command that runs one. A command that doesn't
+    run gcsim itself can give `--jobs` its own meaning with `jobs_help` and `default_jobs`.
+    """
+    parser.add_argument("-j", "--jobs",
+                        help=jobs_help or "The number of gcsim processes to run concurrently (default: the number of "
+                                          "cores divided by --threads).",
+                        type=int,
+                        default=default_jobs)
+    parser.add_argument("--threads",
+                        help="The number of threads each gcsim process may use (default: the cores divided by --jobs, "
+                             "or 1 if neither is given and there are more configs than cores).",
+                        type=int)
+    parser.add_argument("--pin-cores",
+                        help="Pin each gcsim process to its own cores (Linux only).",
+                        action="store_true")
+    parser.add_argument("--memory-budget",
+                        help="The most memory the batch's gcsim processes may use between them, e.g. 8G. Configs wait "
+                             "to start until the memory they're expected to need (from the peaks seen so far) fits.",
+                        type=parse_size)
+    parser.add_argument("--memory-reserve",
+                        help="Wait to start configs while less than this much memory is free (default: 512M).",
+                        type=parse_size,
+                        default=parse_size("512M"))
+    parser.add_argument("--target-se",
+                        help="Instead of the iteration count in each script, run each final sim in chunks until the "
+                             "standard error of its mean DPS is at most this, either in DPS (e.g. 50) or as a "
+                             "percentage of the mean (e.g. 0.5%%). The iterations used are added to each row.",
+                        type=PrecisionTarget.parse)
+    parser.add_argument("--max-iterations",
+                        help="With --target-se, stop adding chunks after this many iterations (default: 100000).",
+                        type=int,
+                        default=PrecisionTarget.max_iterations)
+    parser.add_argument("--optimize-jobs",
+                        help="The number of substat optimizations to run concurrently (default: --jobs).",
+                        type=int)
+    parser.add_argument("--sim-jobs",
+                        help="The number of final sims to run concurrently (default: --jobs).",
+                        type=int)
+    parser.add_argument("--substats-optimized",
+                        help="Skip substat optimization for every config and only run the final sims. Individual "
+                             f"configs can also be marked with a '{SUBSTATS_OPTIMIZED_MARKER}' line.",
+                        action="store_true")
+    parser.add_argument("--reoptimize-substats",
+                        help="Run the full substat optimization for every config. By default, configs whose "
+                             "characters have the same team, weapon (at any refine) and sets as an already optimized "
+                             "config reuse its substats.",
+                        action="store_true")
+    parser.add_argument("--no-cache",
+                        help="Simulate every config, even if an identical one has been run before, and optimize every "
+                             "config's substats. Nothing is read from or saved to the cache directory.",
+                        action="store_true")
+    parser.add_argument("--cache-directory",
+                        help=f"Where to keep cached results (default: {DEFAULT_CACHE_DIRECTORY}).",
+                        type=Path,
+                        default=DEFAULT_CACHE_DIRECTORY)
+    parser.add_argument("--cache-size",
+                        help=f"The maximum size of the result cache in MiB (default: {DEFAULT_MAX_BYTES // 2**20}).",
+                        type=int,
+                        default=DEFAULT_MAX_BYTES // 2**20)
+    parser.add_argument("--resume",
+                        help="Continue an interrupted batch, skipping configs that already finished.",
+                        action="store_true")
+    parser.add_argument("--log-directory",
+                        help="Save each config's full gcsim output to <log-directory>/<config name>.log.",
+                        type=Path)
+    parser.add_argument("--gzip-viewer",
+                        help="Keep viewer files gzip-compressed on disk.",
+                        action="store_true")
+    parser.add_argument("--trace",
+                        help="Write a timing span for each stage of each config to this JSONL file, and print a "
+                             "summary of the slowest configs and stages at the end.",
+                        type=Path)
+    parser.add_argument("--chrome-trace",
+                        help="Also write the timing spans in Chrome trace event format to this file.",
+                        type=Path)
+    parser.add_argument("--store",
+                        help="Also save results to this SQLite database, which gcsim-results can query.",
+                        type=Path)
+    parser.add_argument("--no-progress",
+                        help="Don't show the progress line (configs done, configs per minute, ETA and CPU use) at the "
+                             "bottom of the terminal.",
+                        action="store_true")
+    parser.add_argument("--metrics-port",
+                        help="Serve live progress metrics for Prometheus at http://127.0.0.1:<port>/metrics.",
+                        type=int)
+    parser.add_argument("--tournament",
+                        help="Sim every config at low iteration counts first, and only give a full sim to those that "
+                             "aren't clearly worse than the leaders.",
+                        action="store_true")
+    parser.add_argument("--tournament-rounds",
+                        help="Comma-separated iteration counts for the preliminary rounds (default: 100,300).",
+                        type=lambda value: [int(iterations) for iterations in value.split(",")],
+                        default=[100, 300])
+    parser.add_argument("--tournament-keep",
+                        help="The number of leaders that always survive to the full sim (default: 3).",
+                        type=_positive_int,
+                        default=3)
+
+
+def run_options(args: argparse.Namespace) -> RunOptions:
+    """
+    Build the `RunOptions` selected by the arguments from `add_run_arguments`.
+    """
+    return RunOptions(cache=None if args.no_cache else ResultCache(args.cache_directory, args.cache_size * 2**20),
+                      log_directory=args.log_directory,
+                      compress_viewer=args.gzip_viewer,
+                      substats_optimized=args.substats_optimized,
+                      tracer=Tracer(args.trace, args.chrome_trace) if args.trace or args.chrome_trace else None,
+                      store=ResultStore(args.store) if args.store else None,
+                      threads=args.threads,
+                      pin_cores=args.pin_cores,
+                      history=None if args.no_cache else DurationHistory(args.cache_directory / "history" /
+                                                                          "durations.json"),
+                      memory_budget=args.memory_budget,
+                      memory_reserve=args.memory_reserve,
+                      substat_memo=None if args.no_cache else SubstatMemo(args.cache_directory / "substats"),
+                      reoptimize_substats=args.reoptimize_substats,
+                      precision=replace(args.target_se, max_iterations=args.max_iterations)
+                      if args.target_se is not None else None,
+                      progress=Progress() if not args.no_progress or args.metrics_port is not None else None)
+
+
+def run_batch_from_args(configs: Iterable[Path],
+                        args: argparse.Namespace,
+                        runner: ConfigRunner = run_locally) -> list[OptimizerResult]:
+    """
+    Run a batch with the settings selected by the arguments from `add_run_arguments`, running each config with
+    `runner`.
+    """
+    options = run_options(args)
+    with ExitStack() as reporting:
+        if not args.no_progress:
+            reporting.enter_context(ProgressDisplay(options.progress))
+        if args.metrics_port is not None:
+            reporting.enter_context(MetricsServer(options.progress, args.metrics_port))
+        return _run_batch_from_args(configs, args, options, runner)
+
+
+def _run_batch_from_args(configs: Iterable[Path],
+                         args: argparse.Namespace,
+                         options: RunOptions,
+                         runner: ConfigRunner) -> list[OptimizerResult]:
+    try:
+        if args.tournament:
+            from .tournament import TournamentSettings, run_tournament  # Import here to avoid circular imports
+            return run_tournament(configs,
+                                  args.output_file,
+                                  TournamentSettings(rounds=args.tournament_rounds, keep=args.tournament_keep),
+                                  jobs=args.jobs,
+                                  options=options,
+                                  resume=args.resume,
+                                  optimize_jobs=args.optimize_jobs,
+                                  sim_jobs=args.sim_jobs,
+                                  runner=runner)
+
+        return run_batch(configs,
+                         args.output_file,
+                         jobs=args.jobs,
+                         options=options,
+                         resume=args.resume,
+                         optimize_jobs=args.optimize_jobs,
+                         sim_jobs=args.sim_jobs,
+                         runner=runner)
+    finally:
+        if options.tracer is not None:
+            options.tracer.close()
+            print(options.tracer.summary())
 
 
 def main():
@@ -101,22 +686,25 @@ def main():
     parser = argparse.ArgumentParser(description="Generate and run a batch of gcsim optimizer commands.")
     parser.add_argument("input_directory", help="The directory containing the .txt config files.", type=Path)
     parser.add_argument("output_file", help="The path of the output CSV file.", type=Path)
+    add_run_arguments(parser)
     args = parser.parse_args()
 
-    commands = []
-    for file in args.input_directory.iterdir():
-        if file.exists():
-            commands.append(["gcsim-optimizer", str(file)])
+    configs = []
+    for file in sorted(args.input_directory.iterdir()):
+        if file.name.startswith('.'):
+            continue  # e.g. the generator's manifest
+        if file.is_file():
+            configs.append(file)
         else:
             logging.warning(f"Warning: Config file not found, skipping: {file}")
 
-    if not commands:
+    if not configs:
         logging.error(f"No valid config files found to process.")
         return
 
-    logging.info(f"Running batch with {len(commands)} commands.")
+    logging.info(f"Running batch with {len(configs)} configs.")
 
-    run_batch(commands, args.output_file)
+    run_batch_from_args(configs, args)
 
     logging.info(f"Batch run for '{args.input_directory}' complete. Output in '{args.output_file}.csv'")
 
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import statistics
+import threading
+from collections.abc import Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from .results import OptimizerResult
+
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores() -> list[int]:
+    """
+    The cores this process may run on: its CPU affinity where the platform has one, otherwise every core.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan(cores: int,
+         jobs: int | None = None,
+         threads: int | None = None,
+         configs: int | None = None) -> tuple[int, int]:
+    """
+    Choose how many gcsim processes to run at once and how many threads each may use, so that together they fill
+    `cores` without oversubscribing them. Whichever of `jobs` and `threads` is given is kept. Otherwise a batch with at
+    least as many `configs` as cores runs one single-threaded process per core, and a smaller one shares the cores
+    out between its configs.
+    """
+    if threads is not None:
+        return jobs or max(1, cores // threads), threads
+    if jobs is not None:
+        return jobs, max(1, cores // jobs)
+    if configs is not None and 0 < configs < cores:
+        return configs, cores // configs
+    return cores, 1
+
+
+@dataclass(frozen=True)
+class CpuAllocation:
+    """
+    The share of the CPU one gcsim process gets: how many threads Go may run at once, and optionally the cores it's
+    pinned to.
+    """
+    threads: int
+    cores: frozenset[int] | None = None
+
+    def environment(self) -> dict[str, str]:
+        """
+        The environment to start gcsim with. GOMAXPROCS caps how many cores the Go runtime uses.
+        """
+        return {**os.environ, "GOMAXPROCS": str(self.threads)}
+
+    def pin(self, pid: int):
+        """
+        Restrict the process to this allocation's cores, if it has any and the platform supports it.
+        """
+        if not self.cores or not hasattr(os, "sched_setaffinity"):
+            return
+        try:
+            # The Go runtime starts threads straight away, and those don't inherit the process's new affinity
+            threads = [int(thread) for thread in os.listdir(f"/proc/{pid}/task")]
+        except OSError:
+            threads = [pid]
+        for thread in threads:
+            try:
+                os.sched_setaffinity(thread, self.cores)
+            except OSError as e:
+                # The process may already have exited
+                logger.debug('Could not pin %d to cores %s: %s', thread, sorted(self.cores), e)
+
+
+class CorePool:
+    """
+    Hands out a `CpuAllocation` of `threads` threads to each running gcsim process. With `pin`, each allocation also
+    gets its own `threads` cores out of `cores`, which are returned when the process finishes.
+    """
+
+    def __init__(self, cores: Sequence[int], threads: int, pin: bool = False):
+        self.threads = threads
+        self.pin = pin
+        self._free = list(cores)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def allocate(self):
+        if not self.pin:
+            yield CpuAllocation(self.threads)
+            return
+
+        with self._lock:
+            taken, self._free = self._free[:self.threads], self._free[self.threads:]
+        try:
+            yield CpuAllocation(self.threads, frozenset(taken) or None)
+        finally:
+            with self._lock:
+                self._free.extend(taken)
+
+
+class DurationHistory:
+    """
+    How long each config took to optimize and sim in previous runs, by name, so that a batch can start its slowest
+    configs first instead of finding a straggler at the end. Kept as a small JSON file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self._durations: dict[str, float] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._durations = {}
+
+    def expected(self, config: Path) -> float | None:
+        return self._durations.get(Path(config).name)
+
+    def record(self, result: OptimizerResult):
+        if result.cached or not result.ok:
+            return
+        with self._lock:
+            self._durations[result.config_file.name] = result.optimize_seconds + result.sim_seconds
+
+    def longest_first(self, configs: Sequence[Path]) -> list[int]:
+        """
+        The indices of `configs` in the order to run them: longest expected duration first. Configs that haven't run
+        before are expected to take as long as the median of those that have.
+        """
+        known = [duration for duration in map(self.expected, configs) if duration is not None]
+        default = statistics.median(known) if known else 0.0
+        return sorted(range(len(configs)),
+                      key=lambda i: duration if (duration := self.expected(configs[i])) is not None else default,
+                      reverse=True)
+
+    def save(self):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix(".tmp")
+            with open(temporary, 'w') as f:
+                json.dump(self._durations, f)
+            os.replace(temporary, self.path)
@@ -0,0 +1,191 @@
+import argparse
+import csv
+import sqlite3
+import sys
+import threading
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .cache import script_digest
+from .generate import read_gear
+from .results import OptimizerResult
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    started TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS configs (
+    id INTEGER PRIMARY KEY,
+    batch_id INTEGER NOT NULL REFERENCES batches(id),
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    config_hash TEXT,
+    returncode INTEGER NOT NULL,
+    average_damage REAL,
+    duration REAL,
+    dps REAL,
+    min_dps REAL,
+    max_dps REAL,
+    std_dps REAL,
+    optimize_seconds REAL,
+    sim_seconds REAL
+);
+CREATE TABLE IF NOT EXISTS characters (
+    config_id INTEGER NOT NULL REFERENCES configs(id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    weapon TEXT,
+    refine INTEGER,
+    artifact_sets TEXT,
+    min REAL,
+    max REAL,
+    mean REAL,
+    sd REAL,
+    PRIMARY KEY (config_id, position)
+);
+CREATE INDEX IF NOT EXISTS configs_batch ON configs(batch_id);
+CREATE INDEX IF NOT EXISTS configs_dps ON configs(dps);
+CREATE INDEX IF NOT EXISTS configs_hash ON configs(config_hash);
+CREATE INDEX IF NOT EXISTS characters_gear ON characters(name, weapon, refine, artifact_sets);
+CREATE INDEX IF NOT EXISTS characters_mean ON characters(name, mean);
+"""
+
+EXPORT_COLUMNS = ["batch", "config", "config_hash", "team_dps", "team_min_dps", "team_max_dps", "team_std_dps",
+                  "character", "weapon", "refine", "artifact_sets", "min_dps", "max_dps", "mean_dps", "std_dps"]
+
+
+class ResultStore:
+    """
+    An SQLite database of results from any number of batches, with one row per config and one per character in each
+    config. Each character's weapon, refine and artifact sets are read from the config itself, so results can be
+    ranked and filtered by gear across batches.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def start_batch(self, name: str) -> int:
+        with self._lock, self._connection:
+            cursor = self._connection.execute("INSERT INTO batches (name, started) VALUES (?, ?)",
+                                              (name, datetime.now(timezone.utc).isoformat()))
+            return cursor.lastrowid
+
+    def add_results(self, batch_id: int, results: Iterable[OptimizerResult]):
+        """
+        Add results to a batch in a single transaction.
+        """
+        with self._lock, self._connection:
+            for result in results:
+                try:
+                    script = Path(result.config_file).read_text()
+                except OSError:
+                    script = None
+                # Prefer the digest taken before the run: gcsim rewrites the config with its optimized substats
+                config_hash = result.script_digest or (script_digest(script) if script is not None else None)
+                gear = read_gear(script) if script is not None else {}
+
+                summary = result.summary
+                cursor = self._connection.execute(
+                    "INSERT INTO configs (batch_id, name, path, config_hash, returncode, average_damage, duration, "
+                    "dps, min_dps, max_dps, std_dps, optimize_seconds, sim_seconds) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (batch_id, result.name, str(result.config_file), config_hash, result.returncode,
+                     summary and summary.average_damage, summary and summary.duration, summary and summary.dps,
+                     summary and summary.min_dps, summary and summary.max_dps, summary and summary.std_dps,
+                     result.optimize_seconds, result.sim_seconds))
+
+                rows = []
+                for position, character in enumerate(result.characters):
+                    character_gear = gear.get(character.name)
+                    weapon = character_gear.weapon if character_gear else None
+                    rows.append((cursor.lastrowid, position, character.name,
+                                 weapon and weapon.name, weapon and weapon.refine,
+                                 " ".join(character_gear.artifact_sets) if character_gear else None,
+                                 character.min, character.max, character.mean, character.sd))
+                self._connection.executemany("INSERT INTO characters VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def query(self,
+              character: str | None = None,
+              weapon: str | None = None,
+              artifact_set: str | None = None,
+              batch: str | None = None,
+              limit: int | None = None) -> list[dict]:
+        """
+        Per-character results, best team DPS first. If `character` is given, only that character's rows are
+        returned, ranked by their own DPS instead. `weapon` and `artifact_set` filter on that character's gear
+        (or any character's, without `character`); `batch` filters on the batch name.
+        """
+        conditions, parameters = [], []
+        for column, value in (("characters.name", character), ("characters.weapon", weapon), ("batches.name", batch)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if artifact_set is not None:
+            conditions.append("(' ' || characters.artifact_sets || ' ') LIKE ?")
+            parameters.append(f"% {artifact_set} %")
+
+        order = "characters.mean DESC" if character else "configs.dps DESC, characters.position"
+        sql = ("SELECT batches.name, configs.name, configs.config_hash, configs.dps, configs.min_dps, configs.max_dps, "
+               "configs.std_dps, characters.name, characters.weapon, characters.refine, characters.artifact_sets, "
+               "characters.min, characters.max, characters.mean, characters.sd "
+               "FROM characters JOIN configs ON characters.config_id = configs.id "
+               "JOIN batches ON configs.batch_id = batches.id")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._lock:
+            return [dict(zip(EXPORT_COLUMNS, row)) for row in self._connection.execute(sql, parameters)]
+
+    def export_csv(self, output, **filters):
+        """
+        Write the rows `query(**filters)` returns as a flat CSV with one row per character.
+        """
+        writer = csv.DictWriter(output, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(self.query(**filters))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a results database written by gcsim-run-batch --store.")
+    parser.add_argument("database", help="The results database.", type=Path)
+    parser.add_argument("--character", help="Only show (and rank by) this character's results.")
+    parser.add_argument("--weapon", help="Only show results with this weapon.")
+    parser.add_argument("--artifact-set", help="Only show results using this artifact set.")
+    parser.add_argument("--batch", help="Only show results from batches with this name.")
+    parser.add_argument("--limit", help="Show at most this many rows.", type=int)
+    parser.add_argument("--csv", help="Write the results to this CSV file ('-' for stdout).", type=Path)
+    args = parser.parse_args()
+
+    if not args.database.exists():
+        parser.error(f"{args.database} does not exist.")
+
+    store = ResultStore(args.database)
+    filters = dict(character=args.character, weapon=args.weapon, artifact_set=args.artifact_set, batch=args.batch,
+                   limit=args.limit)
+    if args.csv is not None:
+        if str(args.csv) == '-':
+            store.export_csv(sys.stdout, **filters)
+        else:
+            with open(args.csv, 'w', newline='') as f:
+                store.export_csv(f, **filters)
+        return
+
+    for row in store.query(**filters):
+        print(f"{row['config']:<60} team {row['team_dps'] or 0:>10.0f}  {row['character']:<12} "
+              f"{row['weapon'] or '':<20} r{row['refine'] or '-'} {row['artifact_sets'] or '':<20} "
+              f"{row['mean_dps']:>10.0f}")
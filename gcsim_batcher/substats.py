@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from .cache import binary_digest, script_digest
+from .optimizer import SUBSTATS_OPTIMIZED_MARKER
+
+
+logger = logging.getLogger(__name__)
+
+
+_GEAR_LINE = re.compile(r'^(?P<character>\S+) add (?P<kind>weapon|set|stats)\b.*$')
+_REFINE_OPTION = re.compile(r'\s*\brefine=\d+')
+
+
+def _builds(script: str) -> dict[str, str]:
+    """
+    The key of each character's build in `script`: the team and rotation (the script without its gear lines), and
+    the character's weapon (ignoring its refine), sets and stats lines. Substats optimized for one build fit any
+    variant with the same key.
+    """
+    context = []
+    gear: dict[str, list[str]] = {}
+    for line in script.splitlines():
+        line = line.strip()
+        match = _GEAR_LINE.match(line)
+        if match is None:
+            if line != SUBSTATS_OPTIMIZED_MARKER:
+                context.append(line)
+            continue
+        if match.group("kind") == "weapon":
+            line = _REFINE_OPTION.sub("", line)
+        gear.setdefault(match.group("character"), []).append(line)
+
+    team = script_digest("\n".join(context))
+    binary = binary_digest()
+    keys = {}
+    for character, lines in gear.items():
+        digest = hashlib.sha256()
+        for part in (binary, team, character, *sorted(lines)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        keys[character] = digest.hexdigest()
+    return keys
+
+
+def _stats_lines(script: str) -> dict[str, list[str]]:
+    stats: dict[str, list[str]] = {}
+    for line in script.splitlines():
+        match = _GEAR_LINE.match(line.strip())
+        if match is not None and match.group("kind") == "stats":
+            stats.setdefault(match.group("character"), []).append(line.strip())
+    return stats
+
+
+def _replace_stats(script: str, stats: dict[str, list[str]]) -> str:
+    """
+    Replace each character's stats lines in `script` with theirs in `stats`, where the first of the old ones was, or
+    after the character's other gear if they had none.
+    """
+    lines: list[str] = []
+    replaced = set()
+    last_gear: dict[str, int] = {}
+    for line in script.splitlines(keepends=True):
+        match = _GEAR_LINE.match(line.strip())
+        if match is None or match.group("character") not in stats:
+            lines.append(line)
+            continue
+        character = match.group("character")
+        if match.group("kind") != "stats":
+            lines.append(line if line.endswith("\n") else f"{line}\n")
+        elif character not in replaced:
+            replaced.add(character)
+            lines.extend(f"{stats_line}\n" for stats_line in stats[character])
+        last_gear[character] = len(lines)
+
+    for character, position in sorted(last_gear.items(), key=lambda item: item[1], reverse=True):
+        if character not in replaced:
+            lines[position:position] = [f"{stats_line}\n" for stats_line in stats[character]]
+    return "".join(lines)
+
+
+class SubstatClaim:
+    """
+    One config's use of a `SubstatMemo`: whether its substats were `reused`, and if not, a way to `record` them once
+    they have been optimized.
+    """
+
+    def __init__(self, memo: "SubstatMemo", config_file: Path, builds: dict[str, str], reused: bool):
+        self._memo = memo
+        self._config_file = config_file
+        self._builds = builds
+        self.reused = reused
+
+    def record(self):
+        """
+        Remember the optimized substats now in the config, for other configs with the same builds.
+        """
+        stats = _stats_lines(self._config_file.read_text())
+        for character, key in self._builds.items():
+            if character in stats:
+                self._memo._save(key, stats[character])
+
+
+class SubstatMemo:
+    """
+    The optimized substats of each character build (see `_builds`) seen so far, kept as small JSON files in
+    `directory`. A config whose characters' builds have all been optimized before, in this batch or an earlier one,
+    gets their substats written into it instead of running the substat optimization again. This is what lets an R5
+    variant reuse the optimization of its R1 sibling.
+
+    While a config is being optimized, other configs needing only the same builds wait for it rather than optimizing
+    them too.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._in_progress: dict[str, threading.Event] = {}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load(self, key: str) -> list[str] | None:
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)["stats"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def _save(self, key: str, stats: list[str]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        temporary_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(temporary_path, 'w') as f:
+            json.dump({"stats": stats}, f)
+        os.replace(temporary_path, path)
+
+    @contextmanager
+    def claim(self, config_file: Path, reuse: bool = True):
+        """
+        Look up the builds of `config_file`. If all of them have known substats (and `reuse` is set), they are
+        written into the config and the claim is `reused`. Otherwise the caller should optimize the config and
+        `record` the result before the context exits.
+        """
+        config_file = Path(config_file)
+        script = config_file.read_text()
+        builds = _builds(script)
+        claimed: dict[str, threading.Event] = {}
+        try:
+            while reuse and builds:
+                with self._lock:
+                    known = {character: stats for character, key in builds.items()
+                             if (stats := self._load(key)) is not None}
+                    missing = [key for character, key in builds.items() if character not in known]
+                    waiting = [self._in_progress[key] for key in missing if key in self._in_progress]
+                    if missing and len(waiting) < len(missing):
+                        for key in missing:
+                            if key not in self._in_progress:
+                                claimed[key] = self._in_progress[key] = threading.Event()
+                        break
+                if not missing:
+                    config_file.write_text(_replace_stats(script, known))
+                    yield SubstatClaim(self, config_file, builds, reused=True)
+                    return
+                logger.info('%s: waiting for another config with the same builds to be optimized', config_file.name)
+                for event in waiting:
+                    event.wait()
+            yield SubstatClaim(self, config_file, builds, reused=False)
+        finally:
+            with self._lock:
+                for key, event in claimed.items():
+                    del self._in_progress[key]
+                    event.set()
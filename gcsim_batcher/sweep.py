@@ -0,0 +1,116 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+from .config import load_scripts
+from .generate import find_scripts, manifest_path, multi_variants_from_files, write_variants
+from .results import OptimizerResult
+from .run import add_run_arguments, run_batch_from_args
+
+
+# How often --watch looks at the inputs
+WATCH_POLL_SECONDS = 1.0
+
+
+def sweep(args: argparse.Namespace, output_directory: Path) -> list[OptimizerResult]:
+    """
+    Generate the sweep's variants into `output_directory` and run them as they are produced. Only variants whose
+    scripts changed since the last sweep into that directory are rewritten, and with the result cache, only those are
+    simmed again.
+
+    With several base scripts, the variants of every team go through the same batch, so the next team's configs start
+    as soon as there is room rather than after the previous team's stragglers.
+    """
+    variants = multi_variants_from_files(args.script_file, args.test_configuration_file, output_directory)
+    manifest = manifest_path(output_directory, args.script_file, args.test_configuration_file)
+    return run_batch_from_args(write_variants(variants, manifest), args)
+
+
+def _input_state(paths: Sequence[Path]) -> list[tuple[int, int] | None]:
+    state = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            state.append(None)
+            continue
+        state.append((stat.st_mtime_ns, stat.st_size))
+    return state
+
+
+def watch(paths: Sequence[Path], rebuild: Callable[[], object], poll_seconds: float = WATCH_POLL_SECONDS):
+    """
+    Call `rebuild` now and again whenever any of `paths` changes on disk, until interrupted. A change is only acted on
+    once the files have stopped changing for `poll_seconds`, so that an editor's save is picked up in one go.
+    """
+    built = None
+    while True:
+        state = _input_state(paths)
+        if state != built:
+            time.sleep(poll_seconds)
+            if _input_state(paths) != state:
+                continue
+            built = state
+            try:
+                rebuild()
+            except Exception as e:
+                logging.error('Sweep failed: %s', e)
+            logging.info('Watching %s for changes (Ctrl-C to stop)', ", ".join(str(path) for path in paths))
+        time.sleep(poll_seconds)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, force=True)
+
+    parser = argparse.ArgumentParser(
+        description="Generate variants of a script from a test configuration and run them as they are generated.")
+    parser.add_argument("script_file",
+                        help="The script file to process. Give several (or a glob pattern such as 'teams/*.txt') to "
+                             "run the tests against every team in one batch; each row is then tagged with its team.",
+                        type=Path,
+                        nargs="+")
+    parser.add_argument("test_configuration_file", help="Configuration file for the test", type=Path)
+    parser.add_argument("output_file", help="The path of the output CSV file.", type=Path)
+    parser.add_argument("--output_directory",
+                        help="Keep the generated scripts in this directory. By default they are only kept until "
+                             "the sweep finishes.",
+                        type=Path)
+    parser.add_argument("--watch",
+                        help="Keep running, and redo the sweep whenever the script or test configuration changes. "
+                             "Only variants that changed are simmed again, and the CSV is rewritten each time.",
+                        action="store_true")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    if args.resume and args.output_directory is None:
+        parser.error("--resume requires --output_directory, so that configs keep the same paths between runs.")
+    if args.watch and (args.resume or args.no_cache):
+        parser.error("--watch can't be combined with --resume or --no-cache.")
+
+    with tempfile.TemporaryDirectory(prefix="gcsim-sweep-") as temporary_directory:
+        output_directory = args.output_directory or Path(temporary_directory)
+        if not args.watch:
+            results = sweep(args, output_directory)
+            logging.info(f"Sweep of {len(results)} configs complete. Output in '{args.output_file}'")
+            return
+
+        def rebuild():
+            # Sweep into a fresh CSV next to the output, and only replace the output once the sweep has finished, so
+            # that a failed sweep (e.g. while an editor is saving an input) leaves the last results in place
+            with tempfile.TemporaryDirectory(prefix=".gcsim-sweep-", dir=args.output_file.parent) as staging:
+                staged = Path(staging) / args.output_file.name
+                staged.touch()
+                results = sweep(argparse.Namespace(**{**vars(args), "output_file": staged}), output_directory)
+                os.replace(staged, args.output_file)
+            logging.info(f"Sweep of {len(results)} configs complete. Output in '{args.output_file}'")
+
+        try:
+            watch([*find_scripts([*args.script_file, *load_scripts(args.test_configuration_file)]),
+                   args.test_configuration_file],
+                  rebuild)
+        except KeyboardInterrupt:
+            pass
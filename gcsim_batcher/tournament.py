@@ -0,0 +1,179 @@
+import csv
+import logging
+import math
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from .generate import iteration_count, update_iterations
+from .journal import Journal, journal_path
+from .optimizer import SUBSTATS_OPTIMIZED_MARKER
+from .results import OptimizerResult
+from .run import ConfigRunner, RunOptions, result_row, run_batch, run_locally
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TournamentSettings:
+    """
+    How a tournament is run: every candidate is simmed at each of the `rounds` iteration counts in turn, and after each
+    round the candidates that are clearly worse than the top `keep` are dropped. Survivors then get a full sim at the
+    iteration count in their own script.
+    """
+    rounds: Sequence[int] = (100, 300)
+    # The number of leaders to protect from elimination
+    keep: int = 3
+    # How many standard errors apart two candidates' DPS must be before one is considered clearly worse
+    confidence: float = 3.0
+
+    def __post_init__(self):
+        if self.keep < 1:
+            raise ValueError(f"A tournament must keep at least one leader, not {self.keep}")
+
+
+def _standard_error(result: OptimizerResult, iterations: int) -> float:
+    return result.summary.std_dps / math.sqrt(iterations)
+
+
+def eliminate(results: Sequence[OptimizerResult], iterations: int, settings: TournamentSettings) -> set[int]:
+    """
+    The indices of the candidates to drop after a round at `iterations` iterations: those that failed, and those whose
+    DPS interval lies entirely below the interval of the `keep`-th best candidate.
+    """
+    failed = {i for i, result in enumerate(results) if not result.ok}
+    ranked = sorted((i for i in range(len(results)) if i not in failed),
+                    key=lambda i: results[i].summary.dps,
+                    reverse=True)
+    if len(ranked) <= settings.keep:
+        return failed
+
+    threshold_result = results[ranked[settings.keep - 1]]
+    threshold = threshold_result.summary.dps - settings.confidence * _standard_error(threshold_result, iterations)
+    return failed | {i for i in ranked[settings.keep:]
+                     if results[i].summary.dps + settings.confidence * _standard_error(results[i], iterations) < threshold}
+
+
+def tournament_directory(csv_path: Path) -> Path:
+    """
+    Where the scripts and results of a tournament's preliminary rounds are kept.
+    """
+    return csv_path.with_name(csv_path.stem + "_tournament")
+
+
+def run_tournament(configs: Iterable[Path],
+                   csv_path: Path,
+                   settings: TournamentSettings = TournamentSettings(),
+                   jobs: int | None = None,
+                   options: RunOptions = RunOptions(),
+                   resume: bool = False,
+                   optimize_jobs: int | None = None,
+                   sim_jobs: int | None = None,
+                   runner: ConfigRunner = run_locally) -> list[OptimizerResult]:
+    """
+    Run a batch as a tournament (see `TournamentSettings`), writing one CSV row per candidate that records the round
+    it was eliminated in, if any. Eliminated candidates are reported with their result from that round.
+
+    Substats are only optimized once per candidate, in the first round: later rounds and the final sim start from the
+    first round's optimized script.
+
+    With `options.store`, the rows written to `csv_path` are stored as one batch named after it, rather than a batch
+    per round. The preliminary rounds aren't recorded in `options.history`, as their durations don't reflect full sims.
+
+    Each round (and the final) keeps its own journal, and `csv_path` is journaled like `run.run_batch`'s CSV, so with
+    `resume` an interrupted tournament picks up where it stopped and writes its rows in place of any it wrote before.
+    """
+    candidates = list(configs)
+    work_directory = tournament_directory(csv_path)
+    best: list[OptimizerResult | None] = [None] * len(candidates)
+    eliminated_in: list[int | None] = [None] * len(candidates)
+    alive = list(range(len(candidates)))
+    # The script each candidate's later rounds are built from: its first round's, once that has optimized it
+    optimized: dict[int, Path] = {}
+
+    def write_script(path: Path, script: str):
+        # A resumed round's script may already have been optimized in place, so leave it as it is
+        if not (resume and path.exists()):
+            path.write_text(script)
+
+    def round_script(i: int, iterations: int) -> str:
+        if i not in optimized:
+            return update_iterations(candidates[i].read_text(), iterations)
+        script = update_iterations(optimized[i].read_text(), iterations)
+        return script if SUBSTATS_OPTIMIZED_MARKER in script else f"{SUBSTATS_OPTIMIZED_MARKER}\n{script}"
+
+    def run_round(round_configs: list[Path], round_csv: Path, options: RunOptions) -> list[OptimizerResult]:
+        return run_batch(round_configs, round_csv, jobs=jobs, options=replace(options, store=None), resume=resume,
+                         optimize_jobs=optimize_jobs, sim_jobs=sim_jobs, runner=runner)
+
+    for round_number, iterations in enumerate(settings.rounds, start=1):
+        if len(alive) <= settings.keep:
+            break
+
+        logger.info('Tournament round %d: %d candidates at %d iterations', round_number, len(alive), iterations)
+        round_directory = work_directory / f"round_{round_number}"
+        round_directory.mkdir(parents=True, exist_ok=True)
+        round_configs = []
+        for i in alive:
+            round_config = round_directory / candidates[i].name
+            write_script(round_config, round_script(i, iterations))
+            round_configs.append(round_config)
+
+        # Preliminary rounds run at exactly their iteration count, even if the final sims have a precision target
+        round_results = run_round(round_configs, work_directory / f"round_{round_number}.csv",
+                                  replace(options, precision=None, history=None))
+        dropped = eliminate(round_results, iterations, settings)
+        for position, i in enumerate(alive):
+            best[i] = replace(round_results[position], config_file=candidates[i])
+            if position in dropped:
+                eliminated_in[i] = round_number
+            elif i not in optimized:
+                optimized[i] = round_configs[position]
+        alive = [i for position, i in enumerate(alive) if position not in dropped]
+        logger.info('Tournament round %d eliminated %d candidates; %d remain', round_number, len(dropped), len(alive))
+
+    logger.info('Tournament final: %d candidates at full iterations', len(alive))
+    final_directory = work_directory / "final"
+    final_configs = []
+    for i in alive:
+        if i not in optimized:
+            final_configs.append(candidates[i])
+            continue
+        final_directory.mkdir(parents=True, exist_ok=True)
+        final_config = final_directory / candidates[i].name
+        write_script(final_config, round_script(i, iteration_count(candidates[i].read_text())))
+        final_configs.append(final_config)
+    final_results = run_round(final_configs, work_directory / "final.csv", options)
+    for i, result in zip(alive, final_results):
+        best[i] = replace(result, config_file=candidates[i])
+
+    # Nothing is written to the CSV before this point, so a resumed tournament replaces the rows from where the
+    # interrupted one started writing them, rather than adding them again
+    journal = Journal(journal_path(csv_path))
+    if resume and journal.path.exists():
+        csv_offset, _ = journal.resume()
+        if csv_path.exists():
+            with open(csv_path, 'r+b') as csvfile:
+                csvfile.truncate(csv_offset)
+    else:
+        journal.start(csv_path.stat().st_size if csv_path.exists() else 0)
+    try:
+        with open(csv_path, 'a', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            for candidate, result, round_number in zip(candidates, best, eliminated_in):
+                extra = ['Eliminated in round:', round_number]
+                if options.precision is not None:
+                    extra.extend(['Iterations:', result.iterations])
+                writer.writerow(result_row(result, extra))
+        for candidate, result in zip(candidates, best):
+            journal.record(candidate, result)
+    finally:
+        journal.close()
+
+    if options.store is not None:
+        options.store.add_results(options.store.start_batch(csv_path.stem), best)
+
+    saved = sum(1 for round_number in eliminated_in if round_number is not None)
+    logger.info('Tournament complete: %d of %d candidates eliminated before the final round', saved, len(candidates))
+    return best
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+
+STAGES = ("generate", "optimize", "sim", "parse", "write")
+
+
+@dataclass
+class Span:
+    """
+    A timed stage of a single config. Times are in seconds since the tracer started.
+    """
+    config: str
+    stage: str
+    start: float
+    duration: float
+    thread: int
+
+
+class Tracer:
+    """
+    Records timing spans for each stage of each config. Spans are appended to a JSONL file as they finish, and can
+    also be written in Chrome's trace event format (viewable in chrome://tracing or Perfetto) when the tracer is
+    closed.
+    """
+
+    def __init__(self, path: Path | None = None, chrome_path: Path | None = None):
+        self.path = path
+        self.chrome_path = chrome_path
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._file = open(path, 'w') if path is not None else None
+
+    def record(self, config: str, stage: str, start: float, end: float):
+        """
+        Record a span from `start` to `end`, both `time.perf_counter()` values.
+        """
+        span = Span(config=config,
+                    stage=stage,
+                    start=start - self._origin,
+                    duration=end - start,
+                    thread=threading.get_ident())
+        with self._lock:
+            self.spans.append(span)
+            if self._file is not None:
+                self._file.write(json.dumps(asdict(span)) + '\n')
+                self._file.flush()
+
+    @contextmanager
+    def span(self, config: str, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(config, stage, start, time.perf_counter())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.chrome_path is not None:
+            self.write_chrome_trace(self.chrome_path)
+
+    def write_chrome_trace(self, path: Path):
+        events = [{"name": span.stage,
+                   "cat": "gcsim-batcher",
+                   "ph": "X",
+                   "ts": span.start * 1e6,
+                   "dur": span.duration * 1e6,
+                   "pid": os.getpid(),
+                   "tid": span.thread,
+                   "args": {"config": span.config}}
+                  for span in self.spans]
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self, slowest: int = 5) -> str:
+        """
+        A human-readable summary of where the time went: totals for each stage, and the slowest configs.
+        """
+        by_stage: dict[str, list[float]] = defaultdict(list)
+        by_config: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for span in self.spans:
+            by_stage[span.stage].append(span.duration)
+            by_config[span.config][span.stage] += span.duration
+
+        lines = ["Stage timings (total / mean / max seconds):"]
+        for stage in sorted(by_stage, key=lambda stage: STAGES.index(stage) if stage in STAGES else len(STAGES)):
+            durations = by_stage[stage]
+            lines.append(f"  {stage:<10} {sum(durations):10.2f} {sum(durations) / len(durations):8.2f} "
+                         f"{max(durations):8.2f}  ({len(durations)} spans)")
+
+        lines.append("Slowest configs:")
+        ranked = sorted(by_config.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        for config, stages in ranked[:slowest]:
+            breakdown = ", ".join(f"{stage} {duration:.2f}s" for stage, duration in stages.items())
+            lines.append(f"  {config}: {sum(stages.values()):.2f}s ({breakdown})")
+        return "\n".join(lines)
+
+
+def span(tracer: Tracer | None, config: str, stage: str):
+    """
+    `tracer.span(config, stage)`, or a no-op if there is no tracer.
+    """
+    return tracer.span(config, stage) if tracer is not None else nullcontext()
@@ -7,5 +7,16 @@ import gcsim as gcsim_module
 DEBUG = os.getenv("DEBUG") is not None
 
 
-def gcsim(*args):
-    return subprocess.run([gcsim_module.gcsim_binary_path()] + list(args))
+def gcsim(*args, **kwargs):
+    """
+    Run the gcsim binary with `args`; keyword arguments are passed through to `subprocess.run`.
+    """
+    return subprocess.run([gcsim_module.gcsim_binary_path()] + list(args), **kwargs)
+
+
+def gcsim_popen(*args, **kwargs):
+    """
+    Start the gcsim binary with `args` without waiting for it; keyword arguments are passed through to
+    `subprocess.Popen`.
+    """
+    return subprocess.Popen([gcsim_module.gcsim_binary_path()] + list(args), **kwargs)
@@ -0,0 +1,250 @@
+import gzip
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import TextIO
+
+from .results import CharacterStats, OptimizerResult, result_from_dict, result_to_dict
+
+
+logger = logging.getLogger(__name__)
+
+
+_CHUNK_SIZE = 64 * 1024
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_SCALAR_END = re.compile(r'[,}\]\s]')
+
+
+class _Scanner:
+    """
+    A minimal pull parser over a JSON text stream. It reads in fixed-size chunks and can skip over a value without
+    decoding it, so only the parts of a document that are asked for are ever built in memory.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.buffer = ''
+        self.position = 0
+
+    def _fill(self) -> bool:
+        chunk = self.stream.read(_CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        The next non-whitespace character, without consuming it.
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} but found {self.peek()!r}")
+        self.position += 1
+
+    def next_item(self, close: str) -> bool:
+        """
+        Consume a separating comma, returning False instead if the enclosing container ends with `close`.
+        """
+        char = self.peek()
+        if char == close:
+            self.position += 1
+            return False
+        if char == ',':
+            self.position += 1
+        return True
+
+    def _find(self, pattern: re.Pattern, pieces: list[str] | None) -> re.Match:
+        while True:
+            match = pattern.search(self.buffer, self.position)
+            if match is not None:
+                if pieces is not None:
+                    pieces.append(self.buffer[self.position:match.start()])
+                return match
+            if pieces is not None:
+                pieces.append(self.buffer[self.position:])
+            self.position = len(self.buffer)
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def _skip_string(self, pieces: list[str] | None):
+        # Assumes the opening quote has already been consumed
+        while True:
+            match = self._find(_STRING_SPECIAL, pieces)
+            if match.group() == '"':
+                if pieces is not None:
+                    pieces.append('"')
+                self.position = match.end()
+                return
+            # A backslash escapes whatever comes next, which may be in the next chunk
+            self.position = match.end()
+            if self.position >= len(self.buffer) and not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+            if pieces is not None:
+                pieces.append('\\' + self.buffer[self.position])
+            self.position += 1
+
+    def skip(self, pieces: list[str] | None = None):
+        """
+        Skip over the next value. If `pieces` is given, the raw text of the value is appended to it.
+        """
+        char = self.peek()
+        if char == '"':
+            self.position += 1
+            if pieces is not None:
+                pieces.append('"')
+            self._skip_string(pieces)
+        elif char in '{[':
+            depth = 0
+            while True:
+                match = self._find(_STRUCTURAL, pieces)
+                token = match.group()
+                if pieces is not None:
+                    pieces.append(token)
+                self.position = match.end()
+                if token == '"':
+                    self._skip_string(pieces)
+                elif token in '{[':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        else:
+            match = None
+            while match is None:
+                match = _SCALAR_END.search(self.buffer, self.position)
+                if match is None:
+                    if pieces is not None:
+                        pieces.append(self.buffer[self.position:])
+                    self.position = len(self.buffer)
+                    if not self._fill():
+                        return  # A bare scalar at the very end of the document
+            if pieces is not None:
+                pieces.append(self.buffer[self.position:match.start()])
+            self.position = match.start()
+
+    def value(self):
+        """
+        Decode the next value. Only use this for values known to be small.
+        """
+        pieces = []
+        self.skip(pieces)
+        return json.loads(''.join(pieces))
+
+    def keys(self):
+        """
+        Iterate over the keys of the object at the current position. The caller must consume (or skip) each key's
+        value before asking for the next key.
+        """
+        self.expect('{')
+        while self.next_item('}'):
+            key = self.value()
+            self.expect(':')
+            yield key
+
+    def items(self):
+        """
+        Iterate over the elements of the array at the current position, leaving the scanner at each element in turn.
+        """
+        self.expect('[')
+        while self.next_item(']'):
+            yield
+
+
+def _open_viewer(path: Path) -> TextIO:
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def find_viewer_file(output_file: Path) -> Path | None:
+    """
+    Find the viewer file gcsim wrote for `-out output_file`, which may have had `.gz` appended to it.
+    """
+    for candidate in (output_file, output_file.with_name(output_file.name + '.gz')):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def read_character_stats(path: Path) -> list[CharacterStats]:
+    """
+    Stream per-character DPS statistics out of a (possibly gzipped) gcsim viewer file. Only the character names and
+    `statistics.character_dps` are decoded; everything else is skipped without being built in memory. Returns an
+    empty list if the file is missing or malformed.
+    """
+    names: list[str] = []
+    character_dps: list[dict] = []
+    try:
+        with _open_viewer(path) as stream:
+            scanner = _Scanner(stream)
+            for key in scanner.keys():
+                if key == 'character_details':
+                    for _ in scanner.items():
+                        for detail_key in scanner.keys():
+                            if detail_key == 'name':
+                                names.append(scanner.value())
+                            else:
+                                scanner.skip()
+                elif key == 'statistics':
+                    for statistics_key in scanner.keys():
+                        if statistics_key == 'character_dps':
+                            character_dps = scanner.value()
+                        else:
+                            scanner.skip()
+                else:
+                    scanner.skip()
+    except FileNotFoundError:
+        logger.warning('JSON file not found: %s', path)
+        return []
+    except (ValueError, OSError, EOFError) as e:
+        logger.error('Error decoding JSON from file %s: %s', path, str(e))
+        return []
+
+    return [CharacterStats(name=name, min=stats['min'], max=stats['max'], mean=stats['mean'], sd=stats['sd'])
+            for name, stats in zip(names, character_dps)]
+
+
+def summary_sidecar_path(output_file: Path) -> Path:
+    """
+    Where the small summary of a viewer file is kept, alongside it.
+    """
+    return output_file.with_name(output_file.name.removesuffix('.gz').removesuffix('.json') + '.summary.json')
+
+
+def write_summary_sidecar(result: OptimizerResult):
+    """
+    Save the parsed summary of `result` next to its viewer file, so that it can be read back without opening the
+    viewer file again.
+    """
+    path = summary_sidecar_path(result.output_file)
+    temporary_path = path.with_name(path.name + '.tmp')
+    with open(temporary_path, 'w') as f:
+        json.dump(result_to_dict(result), f)
+    os.replace(temporary_path, path)
+
+
+def read_summary_sidecar(output_file: Path) -> OptimizerResult | None:
+    """
+    Read the summary saved by `write_summary_sidecar`, or None if there isn't one.
+    """
+    try:
+        with open(summary_sidecar_path(output_file), 'r') as f:
+            return result_from_dict(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
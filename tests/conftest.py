@@ -0,0 +1,14 @@
+from pathlib import Path
+
+import gcsim
+import pytest
+
+
+FAKE_GCSIM = Path(__file__).parent / "fake_gcsim.py"
+
+
+@pytest.fixture
+def fake_gcsim(monkeypatch):
+    """Point `gcsim.gcsim_binary_path()` at the stand-in gcsim in this directory."""
+    monkeypatch.setattr(gcsim, "gcsim_binary_path", lambda: FAKE_GCSIM)
+    yield FAKE_GCSIM
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+A stand-in for the gcsim binary. It understands just enough of gcsim's command line for the batcher: `-c` for the
+config, `-out` for the viewer file, and `-substatOptimFull` for the optimization phase.
+
+The config controls the result through comments:
+
+    # fake_dps=1234     the team DPS to report (default 1000)
+    # fake_delay=0.5    seconds to sleep before finishing (default $FAKE_GCSIM_DELAY or 0)
+    # fake_fail         exit with a non-zero code
+    # fake_substats     when optimizing, write an optimized stats line for each character into the config, like gcsim
+
+If $FAKE_GCSIM_CALLS is set, each invocation's arguments are appended to that file, one line per call.
+"""
+import gzip
+import json
+import os
+import re
+import sys
+import time
+
+
+def main(argv):
+    if os.getenv("FAKE_GCSIM_CALLS"):
+        with open(os.environ["FAKE_GCSIM_CALLS"], "a") as f:
+            f.write(" ".join(argv) + "\n")
+
+    config_path = argv[argv.index("-c") + 1]
+    with open(config_path) as f:
+        config = f.read()
+
+    def option(name, default):
+        match = re.search(rf"^# {name}=(\S+)", config, re.MULTILINE)
+        return float(match.group(1)) if match else default
+
+    time.sleep(option("fake_delay", float(os.getenv("FAKE_GCSIM_DELAY", "0"))))
+    if re.search(r"^# fake_fail", config, re.MULTILINE):
+        print("error: fake failure")
+        return 1
+
+    dps = option("fake_dps", 1000.0)
+    characters = re.findall(r"^(\w+) add weapon", config, re.MULTILINE)
+    if "-substatOptimFull" in argv and re.search(r"^# fake_substats", config, re.MULTILINE):
+        config = re.sub(r"^\w+ add stats.*\n", "", config, flags=re.MULTILINE)
+        config += "".join(f"{name} add stats er=0.55 cr=0.33;\n" for name in characters)
+        with open(config_path, "w") as f:
+            f.write(config)
+    print(f"Average {dps * 90:.2f} damage over 90.00 seconds, resulting in {dps:.0f} dps "
+          f"(min: {dps * 0.9:.2f} max: {dps * 1.1:.2f} std: {dps * 0.05:.2f})")
+
+    if "-out" in argv:
+        share = dps / max(len(characters), 1)
+        viewer = {
+            "config_file": config,
+            "character_details": [{"name": name, "talents": {"attack": 9}, "note": "{[\"]}"} for name in characters],
+            "statistics": {
+                "iterations": 1000,
+                "character_dps": [{"min": share * 0.9, "max": share * 1.1, "mean": share, "sd": share * 0.05}
+                                  for _ in characters],
+                "damage_buckets": [[i, i * 2.5, None, True] for i in range(100)],
+            },
+        }
+        out = argv[argv.index("-out") + 1]
+        if "-gz=true" in argv:
+            with gzip.open(out + ".gz", "wt") as f:
+                json.dump(viewer, f)
+        else:
+            with open(out, "w") as f:
+                json.dump(viewer, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
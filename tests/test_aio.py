@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import pytest
+
+from gcsim_batcher import aio
+from gcsim_batcher.cache import ResultCache
+from gcsim_batcher.progress import Progress
+from gcsim_batcher.run import RunOptions
+
+from test_run import _fake_config
+
+
+def test_run_batch_yields_results_as_they_finish(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, "slow", "# fake_dps=100\n# fake_delay=0.6"),
+               _fake_config(tmp_path, "fast", "# fake_dps=200"),
+               _fake_config(tmp_path, "broken", "# fake_fail")]
+
+    async def collect():
+        return [result async for result in aio.run_batch(configs, jobs=3)]
+
+    results = asyncio.run(collect())
+
+    assert [result.name for result in results][-1] == "slow"
+    by_name = {result.name: result for result in results}
+    assert by_name["fast"].summary.dps == 200
+    assert [character.name for character in by_name["fast"].characters] == ["bennett", "sara"]
+    assert by_name["broken"].returncode == 1
+
+
+def test_run_batch_shares_a_process_limit(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = [_fake_config(tmp_path, f"a{i}", "# fake_delay=0.3") for i in range(2)]
+    second = [_fake_config(tmp_path, f"b{i}", "# fake_delay=0.3") for i in range(2)]
+    options = RunOptions(substats_optimized=True, cache=ResultCache(tmp_path / "cache"))
+
+    async def both():
+        processes = asyncio.Semaphore(1)
+
+        async def collect(configs):
+            return [result async for result in aio.run_batch(configs, jobs=2, options=options, processes=processes)]
+
+        return await asyncio.gather(collect(first), collect(second))
+
+    start = time.perf_counter()
+    results = asyncio.run(both())
+    assert time.perf_counter() - start >= 1.2
+    assert all(result.ok for batch in results for result in batch)
+
+
+def test_closing_the_iterator_kills_running_sims(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    configs = [_fake_config(tmp_path, "fast", "# fake_dps=200")]
+    configs += [_fake_config(tmp_path, f"slow_{i}", "# fake_delay=30") for i in range(4)]
+
+    async def first_result():
+        results = aio.run_batch(configs, jobs=2)
+        try:
+            return await anext(results)
+        finally:
+            await results.aclose()
+
+    start = time.perf_counter()
+    result = asyncio.run(first_result())
+
+    assert result.name == "fast"
+    assert time.perf_counter() - start < 10
+    # Only as many configs as can be in flight were started
+    assert len(calls.read_text().splitlines()) <= 4
+
+
+def test_run_batch_pulls_plain_iterables_off_the_event_loop(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, f"config_{i}", "# fake_dps=100") for i in range(2)]
+
+    async def collect():
+        loop = asyncio.get_running_loop()
+        pulled_on_loop = []
+
+        def generate():
+            for config in configs:
+                try:
+                    pulled_on_loop.append(asyncio.get_running_loop() is loop)
+                except RuntimeError:
+                    pulled_on_loop.append(False)
+                yield config
+
+        results = [result async for result in aio.run_batch(generate(), jobs=2)]
+        return results, pulled_on_loop
+
+    results, pulled_on_loop = asyncio.run(collect())
+
+    assert all(result.ok for result in results)
+    assert pulled_on_loop == [False, False]
+
+
+def test_unsupported_options_raise(tmp_path):
+    options = RunOptions(progress=Progress())
+
+    async def first_result():
+        return await anext(aio.run_batch([tmp_path / "config.txt"], jobs=1, options=options))
+
+    with pytest.raises(ValueError, match="progress"):
+        asyncio.run(first_result())
+    with pytest.raises(ValueError, match="progress"):
+        asyncio.run(aio.run_config(tmp_path / "config.txt", options))
+    with pytest.raises(ValueError, match="pin_cores"):
+        asyncio.run(aio.run_config(tmp_path / "config.txt", RunOptions(pin_cores=True)))
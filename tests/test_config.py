@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from gcsim_batcher.config import PlainTextConfigType, Test, load_config
+from gcsim_batcher.config import Combination, PlainTextConfigType, Test, load_config
 
 
 def test_load_yaml_config():
@@ -44,3 +44,30 @@ def test_load_plain_artifacts_config():
                                     artifact_sets=[["no", "esf"], ["no"], ["esf"]])
         )
     ]
+
+
+def test_load_matrix_config():
+    _, config = load_config(Path("tests/matrix.yaml"))
+    assert config[0].test.characters == ["bennett"]
+    assert list(config[0].test.combinations()) == [
+        Combination("bennett", "absolution", 1, ["no"]),
+        Combination("bennett", "absolution", 5, ["no"]),
+        Combination("bennett", "absolution", 5, ["no", "esf"]),
+        Combination("bennett", "aquilafavonia", 1, ["no"]),
+    ]
+    assert list(config[1].test.combinations()) == [
+        Combination("bennett", None, None, ["no"]),
+        Combination("chevreuse", None, None, ["no"]),
+        Combination("chevreuse", None, None, ["esf"]),
+    ]
+    assert config[2].test.refines == [3]
+
+
+def test_matrix_combinations_are_lazy():
+    matrix = Test.MatrixTest(characters=["bennett"],
+                             weapons=[f"weapon{i}" for i in range(1000)],
+                             refines=[1, 2, 3, 4, 5],
+                             artifact_sets=[[f"set{i}"] for i in range(1000)])
+    combinations = matrix.combinations()
+    assert next(combinations) == Combination("bennett", "weapon0", 1, ["set0"])
+    assert next(combinations) == Combination("bennett", "weapon0", 1, ["set1"])
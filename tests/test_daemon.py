@@ -0,0 +1,52 @@
+import csv
+import threading
+
+import gcsim
+import pytest
+
+from gcsim_batcher.client import forward
+from gcsim_batcher.daemon import Daemon
+
+from conftest import FAKE_GCSIM
+
+
+def use_fake_gcsim():
+    gcsim.gcsim_binary_path = lambda: FAKE_GCSIM
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = Daemon(str(tmp_path / "daemon.sock"), jobs=2, initializer=use_fake_gcsim)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    daemon.close()
+
+
+def test_forward_without_daemon(tmp_path):
+    assert forward("gcsim-run-batch", [], str(tmp_path / "missing.sock")) is None
+
+
+def test_daemon_runs_batch(daemon, tmp_path, monkeypatch, capfdbinary):
+    monkeypatch.chdir(tmp_path)
+    configs = tmp_path / "configs"
+    configs.mkdir()
+    for i in range(3):
+        (configs / f"config_{i}.txt").write_text(f"# fake_dps={100 * (i + 1)}\n")
+
+    arguments = ["configs", "out.csv", "--no-cache", "--cache-directory", str(tmp_path / "cache")]
+    assert forward("gcsim-run-batch", arguments, daemon.path) == 0
+
+    with open(tmp_path / "out.csv", newline='') as f:
+        assert [row[4] for row in csv.reader(f)] == ["100", "200", "300"]
+    output = capfdbinary.readouterr()
+    assert b"Batch run Complete!" in output.out
+    assert b"Script finished." in output.err
+
+
+def test_daemon_reports_exit_codes(daemon, tmp_path, monkeypatch, capfdbinary):
+    monkeypatch.chdir(tmp_path)
+    assert forward("gcsim-run-batch", ["--bogus"], daemon.path) == 2
+    assert b"the following arguments are required" in capfdbinary.readouterr().err
+    assert forward("rm", ["-rf", "/"], daemon.path) == 2
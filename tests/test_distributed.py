@@ -0,0 +1,89 @@
+import csv
+import threading
+import time
+
+from gcsim_batcher.distributed import Coordinator, work
+from gcsim_batcher.run import RunOptions, run_batch
+
+
+def _configs(tmp_path, dps_values):
+    directory = tmp_path / "configs"
+    directory.mkdir()
+    configs = []
+    for i, dps in enumerate(dps_values):
+        config = directory / f"config_{i}.txt"
+        config.write_text(f"# fake_dps={dps}\n")
+        configs.append(config)
+    return configs
+
+
+def test_workers_run_batch(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = _configs(tmp_path, [1000, 2000, 3000, 4000, 5000])
+    coordinator = Coordinator(port=0, token="secret", collect_viewer=True)
+    coordinator.start()
+    workers = [threading.Thread(target=work, args=(coordinator.url,),
+                                kwargs=dict(jobs=2, name=f"worker{i}", token="secret", poll_seconds=0.05))
+               for i in range(2)]
+    for worker in workers:
+        worker.start()
+    try:
+        results = run_batch(configs, tmp_path / "out.csv", jobs=4, options=RunOptions(), runner=coordinator.run)
+    finally:
+        coordinator.finish()
+        for worker in workers:
+            worker.join(timeout=10)
+        coordinator.stop()
+
+    assert not any(worker.is_alive() for worker in workers)
+    assert [result.summary.dps for result in results] == [1000, 2000, 3000, 4000, 5000]
+    assert [result.config_file for result in results] == configs
+    assert all(result.output_file.exists() for result in results)
+    with open(tmp_path / "out.csv", newline='') as f:
+        assert [row[0] for row in csv.reader(f)] == [f"config_{i}" for i in range(5)]
+
+
+def test_expired_lease_is_reassigned(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = _configs(tmp_path, [1234])
+    coordinator = Coordinator(port=0, lease_seconds=0.2, worker_timeout=10)
+    coordinator.start()
+    try:
+        batch = threading.Thread(target=run_batch, args=(configs, tmp_path / "out.csv"),
+                                 kwargs=dict(jobs=1, runner=coordinator.run))
+        batch.start()
+        while "id" not in (lost := coordinator._lease("vanished")):
+            time.sleep(0.01)
+        time.sleep(0.3)
+
+        worker = threading.Thread(target=work, args=(coordinator.url,),
+                                  kwargs=dict(jobs=1, name="survivor", poll_seconds=0.05))
+        worker.start()
+        batch.join(timeout=10)
+        assert not batch.is_alive()
+        # The vanished worker's late result is ignored
+        assert coordinator._complete(lost["id"], "vanished", {}, None) == {"ok": False}
+    finally:
+        coordinator.finish()
+        worker.join(timeout=10)
+        coordinator.stop()
+
+    with open(tmp_path / "out.csv", newline='') as f:
+        assert next(csv.reader(f))[4] == "1234"
+
+
+def test_batch_fails_without_workers(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = _configs(tmp_path, [1000, 2000])
+    coordinator = Coordinator(port=0, lease_seconds=0.2)
+    coordinator.start()
+    try:
+        start = time.perf_counter()
+        results = run_batch(configs, tmp_path / "out.csv", jobs=1, runner=coordinator.run)
+    finally:
+        coordinator.finish()
+        coordinator.stop()
+
+    assert time.perf_counter() - start < 10
+    assert [result.returncode for result in results] == [-1, -1]
+
@@ -1,12 +1,15 @@
 import logging
+import os
 import shutil
 from pathlib import Path
 
 import pytest
 
-from gcsim_batcher.generate import (Mode, _output_directory_name,
+from gcsim_batcher.generate import (TEAM_MARKER, Mode, ScriptTemplate, Weapon,
+                                    _output_directory_name, config_team,
                                     generate_artifacts_scripts,
-                                    generate_multi_scripts)
+                                    generate_multi_scripts, update_artifact_sets,
+                                    update_weapon, write_variants)
 
 
 logger = logging.getLogger(__name__)
@@ -122,3 +125,113 @@ def test_generate_multi_scripts_specified_output(multi_test_env):
         assert not directory.is_file()
         for file in directory.iterdir():
             assert file.is_file()
+
+
+@pytest.mark.parametrize("weapons, artifact_sets", [
+    ({}, {}),
+    ({"bennett": Weapon("aquilafavonia", 5)}, {}),
+    ({}, {"sara": ["no", "esf"]}),
+    ({"bennett": Weapon("absolution", 1), "sara": Weapon("favbow", 5)}, {"bennett": ["esf"], "chevreuse": ["no"]}),
+])
+def test_script_template_matches_line_updates(weapons, artifact_sets):
+    script = (Path(__file__).parent / "ChevSaraBen.txt").read_text()
+    script += '\nbennett add set="crimsonwitch" count=2;\n'  # A second set line, which should be dropped
+
+    lines = script.splitlines()
+    for character, weapon in weapons.items():
+        lines = update_weapon(lines, character, weapon.name, weapon.refine)
+    for character, sets in artifact_sets.items():
+        lines = update_artifact_sets(lines, character, sets)
+
+    assert ScriptTemplate(script).render(weapons, artifact_sets) == '\n'.join(lines)
+
+
+def test_generate_matrix_scripts(tmp_path, monkeypatch):
+    test_src_dir = Path(__file__).parent
+    shutil.copy(test_src_dir / "ChevSaraBen.txt", tmp_path)
+    shutil.copy(test_src_dir / "matrix.yaml", tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    generate_multi_scripts(Path("ChevSaraBen.txt"), Path("matrix.yaml"), tmp_path / "out")
+
+    assert {f.name for f in (tmp_path / "out" / "ChevSaraBen_bennett_matrix").iterdir()} == {
+        "bennett_weapon_absolution_r1_artifacts_no.txt",
+        "bennett_weapon_absolution_r5_artifacts_no.txt",
+        "bennett_weapon_absolution_r5_artifacts_no_esf.txt",
+        "bennett_weapon_aquilafavonia_r1_artifacts_no.txt",
+    }
+    assert {f.name for f in (tmp_path / "out" / "sets").iterdir()} == {
+        "bennett_artifacts_no.txt",
+        "chevreuse_artifacts_no.txt",
+        "chevreuse_artifacts_esf.txt",
+    }
+    content = (tmp_path / "out" / "ChevSaraBen_bennett_matrix" / "bennett_weapon_absolution_r5_artifacts_no_esf.txt").read_text()
+    assert 'bennett add weapon="absolution" refine=5 lvl=90/90;' in content
+    assert 'bennett add set="esf" count=2;' in content
+
+
+
+def test_generate_matrix_scripts_reports_missing_sets_once(tmp_path, monkeypatch, caplog):
+    test_src_dir = Path(__file__).parent
+    script = (test_src_dir / "ChevSaraBen.txt").read_text()
+    (tmp_path / "team.txt").write_text("\n".join(line for line in script.splitlines()
+                                                 if not line.startswith("bennett add set")))
+    shutil.copy(test_src_dir / "matrix.yaml", tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    generate_multi_scripts(Path("team.txt"), Path("matrix.yaml"), tmp_path / "out")
+
+    missing = [record for record in caplog.records if "No artifact sets found for bennett" in record.getMessage()]
+    assert len(missing) == 3  # once for each test that changes bennett's sets
+
+
+def test_write_variants_only_rewrites_changed_variants(tmp_path):
+    manifest = tmp_path / "manifest"
+    first = list(write_variants([(tmp_path / "a.txt", "a"), (tmp_path / "b.txt", "b"), (tmp_path / "c.txt", "c")],
+                                manifest))
+    assert len(first) == 3
+    (tmp_path / "a.txt").touch()
+    os.utime(tmp_path / "a.txt", ns=(0, 0))
+
+    list(write_variants([(tmp_path / "a.txt", "a"), (tmp_path / "b.txt", "b2")], manifest))
+
+    assert (tmp_path / "a.txt").stat().st_mtime_ns == 0
+    assert (tmp_path / "b.txt").read_text() == "b2"
+    assert not (tmp_path / "c.txt").exists()
+    assert [line.split("\t")[0] for line in manifest.read_text().splitlines()] == [str(tmp_path / "a.txt"),
+                                                                                   str(tmp_path / "b.txt")]
+
+
+def test_write_variants_keeps_variants_rewritten_by_gcsim(tmp_path):
+    manifest = tmp_path / "manifest"
+    list(write_variants([(tmp_path / "a.txt", "a")], manifest))
+    (tmp_path / "a.txt").write_text("a with optimized substats")
+
+    list(write_variants([(tmp_path / "a.txt", "a")], manifest))
+    assert (tmp_path / "a.txt").read_text() == "a with optimized substats"
+
+    list(write_variants([(tmp_path / "a.txt", "a2")], manifest))
+    assert (tmp_path / "a.txt").read_text() == "a2"
+
+
+def test_generate_multi_scripts_for_several_teams(tmp_path, monkeypatch):
+    test_src_dir = Path(__file__).parent
+    (tmp_path / "teams").mkdir()
+    shutil.copy(test_src_dir / "ChevSaraBen.txt", tmp_path / "teams" / "burst.txt")
+    shutil.copy(test_src_dir / "ChevSaraBen.txt", tmp_path / "teams" / "quickswap.txt")
+    shutil.copy(test_src_dir / "ChevSaraBen.txt", tmp_path / "extra.txt")
+    (tmp_path / "tests.yaml").write_text((test_src_dir / "matrix.yaml").read_text() + "scripts: [extra.txt]\n")
+    monkeypatch.chdir(tmp_path)
+
+    generate_multi_scripts(Path("teams/*.txt"), Path("tests.yaml"), tmp_path / "out")
+
+    generated = sorted((tmp_path / "out" / "sets").iterdir())
+    assert [f.name for f in generated] == sorted(f"{team}_{name}"
+                                                 for team in ("burst", "extra", "quickswap")
+                                                 for name in ("bennett_artifacts_no.txt",
+                                                              "chevreuse_artifacts_esf.txt",
+                                                              "chevreuse_artifacts_no.txt"))
+    script = (tmp_path / "out" / "sets" / "quickswap_bennett_artifacts_no.txt").read_text()
+    assert script.startswith(f"{TEAM_MARKER}quickswap\n")
+    assert config_team(script) == "quickswap"
+    assert (tmp_path / "out" / "burst_bennett_matrix").is_dir()
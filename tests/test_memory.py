@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from gcsim_batcher.memory import MemoryGovernor, parse_size
+from gcsim_batcher.run import RunOptions, run_batch
+
+from test_run import _fake_config
+
+
+def test_parse_size():
+    assert parse_size("1024") == 1024
+    assert parse_size("512M") == 512 * 2**20
+    assert parse_size("1.5GiB") == 3 * 2**29
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_governor_keeps_running_processes_within_budget():
+    governor = MemoryGovernor(budget=250)
+    running, most_running = 0, 0
+    lock = threading.Lock()
+
+    def process():
+        nonlocal running, most_running
+        with governor.admit("sim"):
+            with lock:
+                running += 1
+                most_running = max(most_running, running)
+            time.sleep(0.05)
+            governor.observe("sim", 100)
+            with lock:
+                running -= 1
+
+    threads = [threading.Thread(target=process) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The first process runs alone until its peak is known; after that, two 100 byte processes fit in 250
+    assert most_running == 2
+    assert governor.estimates == {"sim": 100}
+
+
+def test_governor_always_admits_when_idle():
+    governor = MemoryGovernor(budget=10)
+    governor.observe("optimize", 1000)
+    with governor.admit("optimize"):
+        pass
+
+
+def test_run_batch_reports_peak_memory(fake_gcsim, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, f"config_{i}", f"# fake_dps={100 + i}") for i in range(3)]
+
+    results = run_batch(configs, tmp_path / "out.csv", jobs=3, options=RunOptions(memory_budget=2**40))
+
+    assert all(result.optimize_peak_rss > 0 and result.sim_peak_rss > 0 for result in results)
+    output = capsys.readouterr().out
+    assert "Peak memory per config (highest 3 of 3):" in output
+    assert "config_0: " in output
@@ -0,0 +1,63 @@
+import io
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from gcsim_batcher.progress import MetricsServer, Progress, ProgressDisplay
+from gcsim_batcher.results import DPSSummary, OptimizerResult
+from gcsim_batcher.run import RunOptions, run_batch
+
+from test_run import _fake_config
+
+
+def test_run_batch_counts_progress(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, "first", "# fake_dps=100"),
+               _fake_config(tmp_path, "copy", "# fake_dps=100"),
+               _fake_config(tmp_path, "broken", "# fake_fail")]
+    progress = Progress()
+    seen_while_reading = []
+
+    def read_configs():
+        for config in configs:
+            seen_while_reading.append(progress.total_known)
+            yield config
+
+    run_batch(read_configs(), tmp_path / "out.csv", jobs=2, options=RunOptions(progress=progress))
+
+    assert seen_while_reading == [False, False, False]
+    assert progress.total_known
+    assert (progress.total, progress.done, progress.failed, progress.cached, progress.running) == (3, 3, 1, 1, 0)
+    assert progress.configs_per_minute() > 0
+    assert progress.summary().startswith("[3/3] 100% | 0 running | 1 failed | ")
+    assert progress.eta_seconds() == 0
+
+
+def test_progress_display_logs_when_not_a_terminal(caplog):
+    progress = Progress()
+    progress.expect(2)
+    progress.config_finished(OptimizerResult(config_file=Path("config.txt"), returncode=0,
+                                             summary=DPSSummary(1, 1, 1, 1, 1, 1)))
+    with caplog.at_level("INFO"), ProgressDisplay(progress, io.StringIO()):
+        pass
+    assert "Progress: [1/2] 50%" in caplog.text
+
+
+def test_metrics_server_serves_prometheus_text():
+    progress = Progress()
+    progress.expect(4)
+    progress.config_started()
+
+    with MetricsServer(progress, 0) as server:
+        with urllib.request.urlopen(server.url) as response:
+            text = response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(server.url.removesuffix("/metrics") + "/other")
+
+    assert server.url.startswith("http://127.0.0.1:")
+    assert "# TYPE gcsim_batcher_configs_done_total counter" in text
+    assert "gcsim_batcher_configs_expected 4" in text
+    assert "gcsim_batcher_configs_running 1" in text
+    assert "gcsim_batcher_eta_seconds NaN" in text
@@ -0,0 +1,234 @@
+import csv
+from pathlib import Path
+
+from gcsim_batcher.cache import ResultCache
+from gcsim_batcher.journal import journal_path
+from gcsim_batcher.optimizer import SUBSTATS_OPTIMIZED_MARKER, PrecisionTarget
+from gcsim_batcher.results import DPSSummary, OptimizerResult, pool_summaries
+from gcsim_batcher.run import RunOptions, run_batch
+
+
+def _fake_config(directory: Path, name: str, options: str) -> Path:
+    config = directory / f"{name}.txt"
+    config.write_text(f"{options}\n"
+                      "bennett add weapon=\"alleyflash\" refine=1 lvl=90/90;\n"
+                      "sara add weapon=\"favbow\" refine=3 lvl=90/90;\n")
+    return config
+
+
+def test_run_batch_parallel_keeps_order(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, f"config_{i}", f"# fake_dps={100 + i}\n# fake_delay={0.3 - 0.1 * i}")
+               for i in range(3)]
+    configs.append(_fake_config(tmp_path, "broken", "# fake_fail"))
+
+    csv_path = tmp_path / "out.csv"
+    results = run_batch(configs, csv_path, jobs=4)
+
+    with open(csv_path, newline='') as f:
+        rows = list(csv.reader(f))
+
+    assert [row[0] for row in rows] == ["config_0", "config_1", "config_2", "broken"]
+    assert [row[4] for row in rows[:3]] == ["100", "101", "102"]
+    assert rows[0][11] == "bennett"
+    assert rows[3][4] == ""
+    assert results[3].returncode == 1
+
+
+def test_run_batch_reuses_cached_results(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = ResultCache(tmp_path / "cache")
+    unchanged = _fake_config(tmp_path, "unchanged", "# fake_dps=100")
+    changed = _fake_config(tmp_path, "changed", "# fake_dps=200")
+
+    first = run_batch([unchanged, changed], tmp_path / "first.csv", jobs=2, options=RunOptions(cache=cache))
+    assert not any(result.cached for result in first)
+
+    _fake_config(tmp_path, "changed", "# fake_dps=300")
+    second = run_batch([unchanged, changed], tmp_path / "second.csv", jobs=2, options=RunOptions(cache=cache))
+    assert [result.cached for result in second] == [True, False]
+    assert second[0].summary == first[0].summary
+    assert second[0].characters == first[0].characters
+    assert second[1].summary.dps == 300
+
+
+
+def test_run_batch_caches_skipped_optimization_separately(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    cache = ResultCache(tmp_path / "cache")
+    configs = [_fake_config(tmp_path, "config", "# fake_dps=100")]
+
+    run_batch(configs, tmp_path / "first.csv", options=RunOptions(cache=cache, substats_optimized=True))
+    [result] = run_batch(configs, tmp_path / "second.csv", options=RunOptions(cache=cache))
+
+    assert not result.cached
+    assert sum("-substatOptimFull" in line for line in calls.read_text().splitlines()) == 1
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=0)
+    result = OptimizerResult(config_file=Path("a.txt"), returncode=0, summary=DPSSummary(1, 1, 1, 1, 1, 1))
+    cache.put("a", result)
+    assert cache.get("a", Path("a.txt")) is None
+
+
+def test_run_batch_resume_skips_finished_configs(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, f"config_{i}", f"# fake_dps={100 + i}") for i in range(3)]
+    configs[1] = _fake_config(tmp_path, "config_1", "# fake_fail")
+
+    csv_path = tmp_path / "out.csv"
+    csv_path.write_text("earlier,row\n")
+    run_batch(configs, csv_path, jobs=2)
+
+    # Simulate an interruption that left a torn final entry behind
+    with open(journal_path(csv_path), "a") as f:
+        f.write('{"event": "done", "con')
+
+    configs[1] = _fake_config(tmp_path, "config_1", "# fake_dps=101")
+    (tmp_path / "config_0.txt").write_text("# fake_fail\n")  # Would fail if it were run again
+    results = run_batch(configs, csv_path, jobs=2, resume=True)
+
+    assert [result.summary.dps for result in results] == [100, 101, 102]
+    with open(csv_path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert [row[0] for row in rows] == ["earlier", "config_0", "config_1", "config_2"]
+
+
+def test_run_batch_keeps_logs_only_when_requested(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, "logged", "# fake_dps=100")]
+
+    run_batch(configs, tmp_path / "out.csv", jobs=1)
+    assert not (tmp_path / "logs").exists()
+
+    run_batch(configs, tmp_path / "out.csv", jobs=1, options=RunOptions(log_directory=tmp_path / "logs"))
+    assert "resulting in 100 dps" in (tmp_path / "logs" / "logged.log").read_text()
+
+
+def test_run_batch_starts_a_new_log_when_optimization_is_skipped(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, "logged", "# fake_dps=100")]
+    options = RunOptions(log_directory=tmp_path / "logs", substats_optimized=True)
+
+    run_batch(configs, tmp_path / "first.csv", options=options)
+    run_batch(configs, tmp_path / "second.csv", options=options)
+
+    assert (tmp_path / "logs" / "logged.log").read_text().count("resulting in 100 dps") == 1
+
+
+def test_run_batch_gzip_viewer(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, "compressed", "# fake_dps=100")]
+
+    [result] = run_batch(configs, tmp_path / "out.csv", jobs=1, options=RunOptions(compress_viewer=True))
+
+    assert result.output_file == Path("viewer_json/compressed.json.gz")
+    assert [character.name for character in result.characters] == ["bennett", "sara"]
+    assert (tmp_path / "viewer_json" / "compressed.summary.json").exists()
+
+
+def test_run_batch_skips_optimization_for_marked_configs(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    configs = [_fake_config(tmp_path, "optimized", f"{SUBSTATS_OPTIMIZED_MARKER}\n# fake_dps=100"),
+               _fake_config(tmp_path, "unoptimized", "# fake_dps=200")]
+
+    results = run_batch(configs, tmp_path / "out.csv", jobs=2, optimize_jobs=1, sim_jobs=1)
+
+    assert [result.summary.dps for result in results] == [100, 200]
+    assert results[0].optimize_seconds == 0
+    lines = calls.read_text().splitlines()
+    assert sum("-substatOptimFull" in line for line in lines) == 1
+    assert sum("-out" in line for line in lines) == 2
+
+
+def test_run_batch_consumes_configs_lazily(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_path = tmp_path / "out.csv"
+    rows_seen_while_generating = []
+
+    def configs():
+        for i in range(10):
+            rows_seen_while_generating.append(csv_path.exists())
+            yield _fake_config(tmp_path, f"config_{i}", f"# fake_dps={100 + i}")
+
+    results = run_batch(configs(), csv_path, jobs=1)
+
+    assert len(results) == 10
+    assert not rows_seen_while_generating[0]
+    assert rows_seen_while_generating[-1]
+
+
+def test_run_batch_sims_identical_configs_once(fake_gcsim, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    configs = [_fake_config(tmp_path, "first", "# fake_dps=100\n# fake_delay=0.2"),
+               _fake_config(tmp_path, "other", "# fake_dps=200"),
+               _fake_config(tmp_path, "second", "# fake_dps=100   \r\n\n# fake_delay=0.2"),
+               _fake_config(tmp_path, "third", "# fake_dps=100\n# fake_delay=0.2")]
+
+    results = run_batch(configs, tmp_path / "out.csv", jobs=4)
+
+    assert [result.config_file for result in results] == configs
+    assert [result.summary.dps for result in results] == [100, 200, 100, 100]
+    with open(tmp_path / "out.csv", newline='') as f:
+        assert [row[0] for row in csv.reader(f)] == ["first", "other", "second", "third"]
+    assert sum("-out" in line for line in calls.read_text().splitlines()) == 2
+    assert "2 duplicate configs" in capsys.readouterr().out
+
+
+def test_run_batch_fails_unreadable_configs_only(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, "first", "# fake_dps=100"), tmp_path / "missing.txt", tmp_path / "directory",
+               _fake_config(tmp_path, "last", "# fake_dps=200")]
+    configs[2].mkdir()
+
+    results = run_batch(configs, tmp_path / "out.csv", jobs=2)
+
+    assert [result.returncode for result in results] == [0, -1, -1, 0]
+    with open(tmp_path / "out.csv", newline='') as f:
+        assert [row[0] for row in csv.reader(f)] == ["first", "missing", "directory", "last"]
+
+
+def test_run_batch_sims_until_precision_target(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    config = _fake_config(tmp_path, "config", f"# fake_dps=1000\n{SUBSTATS_OPTIMIZED_MARKER}")
+    script = config.read_text()
+
+    # The fake's std is 50, so a standard error of 2 needs (50 / 2)^2 = 625 iterations: 100, then 525 more
+    options = RunOptions(cache=ResultCache(tmp_path / "cache"), precision=PrecisionTarget(2.0))
+    [result] = run_batch([config], tmp_path / "out.csv", options=options)
+
+    assert result.iterations == 625
+    assert result.summary.dps == 1000
+    assert result.summary.std_dps == 50
+    assert [character.name for character in result.characters] == ["bennett", "sara"]
+    assert sum("-out" in line for line in calls.read_text().splitlines()) == 2
+    assert config.read_text() == script
+    with open(tmp_path / "out.csv", newline='') as f:
+        row = next(csv.reader(f))
+    assert row[11:13] == ["Iterations:", "625"]
+
+    [cached] = run_batch([config], tmp_path / "again.csv", options=options)
+    assert cached.cached and cached.iterations == 625
+
+
+def test_precision_target_parse():
+    assert PrecisionTarget.parse("50") == PrecisionTarget(50.0)
+    target = PrecisionTarget.parse("0.5%")
+    assert target.relative and target.threshold(2000) == 10
+
+
+def test_pool_summaries_combines_spread_between_chunks():
+    pooled = pool_summaries([(100, DPSSummary(900, 10, 90, 80, 100, 0)),
+                             (100, DPSSummary(1100, 10, 110, 100, 120, 0))])
+    assert pooled.dps == 100
+    assert pooled.std_dps == 10
+    assert (pooled.min_dps, pooled.max_dps) == (80, 120)
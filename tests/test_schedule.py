@@ -0,0 +1,47 @@
+from gcsim_batcher.results import DPSSummary, OptimizerResult
+from gcsim_batcher.run import RunOptions, run_batch
+from gcsim_batcher.schedule import CorePool, DurationHistory, plan
+from gcsim_batcher.trace import Tracer
+
+from test_run import _fake_config
+
+
+def test_plan():
+    assert plan(8) == (8, 1)
+    assert plan(8, configs=100) == (8, 1)
+    assert plan(8, configs=3) == (3, 2)
+    assert plan(8, jobs=2) == (2, 4)
+    assert plan(8, threads=4) == (2, 4)
+    assert plan(8, jobs=3, threads=3) == (3, 3)
+    assert plan(2, threads=4) == (1, 4)
+
+
+def test_core_pool_gives_out_disjoint_cores():
+    pool = CorePool(range(4), threads=2, pin=True)
+    with pool.allocate() as first, pool.allocate() as second:
+        assert first.cores == {0, 1}
+        assert second.cores == {2, 3}
+        assert first.environment()["GOMAXPROCS"] == "2"
+    with pool.allocate() as third:
+        assert len(third.cores) == 2
+
+    with CorePool(range(4), threads=1).allocate() as unpinned:
+        assert unpinned.cores is None
+
+
+def test_run_batch_starts_longest_configs_first(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = [_fake_config(tmp_path, name, f"# fake_dps={dps}")
+               for name, dps in (("quick", 100), ("new", 200), ("slow", 300))]
+    history = DurationHistory(tmp_path / "durations.json")
+    for config, seconds in ((configs[0], 1), (configs[2], 30)):
+        history.record(OptimizerResult(config_file=config, returncode=0, summary=DPSSummary(0, 0, 0, 0, 0, 0),
+                                       sim_seconds=seconds))
+
+    tracer = Tracer()
+    results = run_batch(configs, tmp_path / "out.csv", jobs=1, options=RunOptions(history=history, tracer=tracer))
+
+    assert [result.summary.dps for result in results] == [100, 200, 300]
+    # Unknown configs are expected to take the median time
+    assert [span.config for span in tracer.spans if span.stage == "generate"] == ["slow", "new", "quick"]
+    assert DurationHistory(tmp_path / "durations.json").expected(configs[1]) is not None
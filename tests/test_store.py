@@ -0,0 +1,67 @@
+import csv
+import io
+
+from gcsim_batcher.cache import script_digest
+from gcsim_batcher.run import RunOptions, run_batch
+from gcsim_batcher.store import ResultStore
+from gcsim_batcher.tournament import TournamentSettings, run_tournament
+
+
+def test_run_batch_saves_to_store(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = []
+    for i, (weapon, sets) in enumerate([("absolution", ["no"]), ("aquilafavonia", ["no", "esf"])]):
+        config = tmp_path / f"bennett_{weapon}.txt"
+        config.write_text(f"# fake_dps={100 * (i + 1)}\n"
+                          f"bennett add weapon=\"{weapon}\" refine=5 lvl=90/90;\n"
+                          + "".join(f"bennett add set=\"{s}\" count={4 // len(sets)};\n" for s in sets) +
+                          "sara add weapon=\"favbow\" refine=3 lvl=90/90;\n"
+                          "sara add set=\"esf\" count=4;\n")
+        configs.append(config)
+
+    store = ResultStore(tmp_path / "results.sqlite")
+    run_batch(configs, tmp_path / "weapons.csv", jobs=2, options=RunOptions(store=store))
+    run_batch(configs[:1], tmp_path / "again.csv", jobs=1, options=RunOptions(store=store))
+
+    ranked = store.query(character="bennett", batch="weapons")
+    assert [(row["weapon"], row["refine"], row["artifact_sets"]) for row in ranked] == [
+        ("aquilafavonia", 5, "no esf"), ("absolution", 5, "no")]
+    assert ranked[0]["mean_dps"] == 100.0
+    assert len(ranked[0]["config_hash"]) == 64
+
+    assert len(store.query(weapon="absolution")) == 2
+    assert [row["config"] for row in store.query(artifact_set="esf", character="bennett")] == ["bennett_aquilafavonia"]
+
+    output = io.StringIO()
+    store.export_csv(output, batch="again")
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert [row["character"] for row in rows] == ["bennett", "sara"]
+
+
+def test_store_hashes_scripts_before_they_are_run(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    script = "# fake_substats\n# fake_dps=100\nbennett add weapon=\"absolution\" refine=5 lvl=90/90;\n"
+    configs = [tmp_path / "first.txt", tmp_path / "copy.txt"]
+    for config in configs:
+        config.write_text(script)
+
+    store = ResultStore(tmp_path / "results.sqlite")
+    run_batch(configs, tmp_path / "out.csv", jobs=2, options=RunOptions(store=store))
+
+    assert {row["config_hash"] for row in store.query()} == {script_digest(script)}
+
+
+def test_tournament_is_stored_as_one_batch(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = []
+    for i, dps in enumerate([1000, 990, 400, 100]):
+        config = tmp_path / f"candidate_{i}.txt"
+        config.write_text(f"# fake_dps={dps}\nbennett add weapon=\"absolution\" refine=5 lvl=90/90;\n")
+        configs.append(config)
+
+    store = ResultStore(tmp_path / "results.sqlite")
+    run_tournament(configs, tmp_path / "out.csv", TournamentSettings(rounds=(10, 20), keep=1), jobs=2,
+                   options=RunOptions(store=store))
+
+    assert sorted(row["config"] for row in store.query()) == [f"candidate_{i}" for i in range(4)]
+    assert {row["batch"] for row in store.query()} == {"out"}
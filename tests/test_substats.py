@@ -0,0 +1,60 @@
+from gcsim_batcher.run import RunOptions, run_batch
+from gcsim_batcher.substats import SubstatMemo, _builds
+
+
+_TEAM = ("# fake_substats\n"
+         "# fake_delay=0.2\n"
+         "sara add weapon=\"favbow\" refine=3 lvl=90/90;\n"
+         "sara add set=\"noblesseoblige\" count=4;\n"
+         "sara add stats hp=4780 atk=311 er=0.518 electro%=0.466 cr=0.311;\n"
+         "bennett add weapon=\"{weapon}\" refine={refine} lvl=90/90;\n"
+         "bennett add set=\"{set}\" count=4;\n"
+         "active bennett;\n")
+
+
+def _variant(directory, name, weapon="alleyflash", refine=1, artifact_set="noblesseoblige"):
+    config = directory / f"{name}.txt"
+    config.write_text(_TEAM.format(weapon=weapon, refine=refine, set=artifact_set))
+    return config
+
+
+def test_builds_ignore_refine_but_not_gear(tmp_path, fake_gcsim):
+    r1 = _builds(_variant(tmp_path, "r1").read_text())
+    r5 = _builds(_variant(tmp_path, "r5", refine=5).read_text())
+    other_set = _builds(_variant(tmp_path, "other", artifact_set="emblemofseveredfate").read_text())
+
+    assert r1 == r5
+    assert other_set["sara"] == r1["sara"]
+    assert other_set["bennett"] != r1["bennett"]
+
+
+def test_run_batch_reuses_substats_of_sibling_refines(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    configs = [_variant(tmp_path, "r1"), _variant(tmp_path, "r5", refine=5)]
+
+    results = run_batch(configs, tmp_path / "out.csv", jobs=2,
+                        options=RunOptions(substat_memo=SubstatMemo(tmp_path / "substats")))
+
+    assert all(result.ok for result in results)
+    assert sum("-substatOptimFull" in line for line in calls.read_text().splitlines()) == 1
+    r5 = configs[1].read_text()
+    assert "bennett add stats er=0.55 cr=0.33;" in r5
+    assert "sara add stats er=0.55 cr=0.33;" in r5
+    assert "electro%" not in r5
+    assert 'refine=5' in r5
+
+
+def test_run_batch_reoptimizes_substats_when_asked(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    memo = SubstatMemo(tmp_path / "substats")
+    run_batch([_variant(tmp_path, "first")], tmp_path / "first.csv", options=RunOptions(substat_memo=memo))
+
+    configs = [_variant(tmp_path, "r1"), _variant(tmp_path, "r5", refine=5)]
+    run_batch(configs, tmp_path / "out.csv", jobs=2,
+              options=RunOptions(substat_memo=memo, reoptimize_substats=True))
+
+    assert sum("-substatOptimFull" in line for line in calls.read_text().splitlines()) == 3
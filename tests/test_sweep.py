@@ -0,0 +1,148 @@
+import csv
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from gcsim_batcher import sweep
+
+
+def test_sweep_generates_and_runs(fake_gcsim, tmp_path, monkeypatch):
+    test_src_dir = Path(__file__).parent
+    shutil.copy(test_src_dir / "ChevSaraBen.txt", tmp_path)
+    shutil.copy(test_src_dir / "same_character.yaml", tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setattr(sys, "argv", ["gcsim-sweep", "ChevSaraBen.txt", "same_character.yaml", "out.csv",
+                                      "--no-cache", "--jobs", "2"])
+    sweep.main()
+
+    with open("out.csv", newline='') as f:
+        rows = list(csv.reader(f))
+    # 2 artifact tests x 2 refines x 2 sets, 1 weapon test x 2 refines, 1 artifact test x 2 refines x 2 sets
+    assert len(rows) == 14
+    assert all(row[4] == "1000" for row in rows)
+    assert not Path("configs").exists()
+
+
+def test_sweep_runs_every_team_in_one_batch(fake_gcsim, tmp_path, monkeypatch):
+    test_src_dir = Path(__file__).parent
+    shutil.copy(test_src_dir / "ChevSaraBen.txt", tmp_path / "burst.txt")
+    (tmp_path / "quickswap.txt").write_text("# fake_dps=2000\n" + (test_src_dir / "ChevSaraBen.txt").read_text())
+    shutil.copy(test_src_dir / "same_character.yaml", tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setattr(sys, "argv", ["gcsim-sweep", "burst.txt", "quickswap.txt", "same_character.yaml", "out.csv",
+                                      "--no-cache", "--jobs", "4"])
+    sweep.main()
+
+    with open("out.csv", newline='') as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 28
+    assert {(row[11], row[12], row[4]) for row in rows} == {("Team:", "burst", "1000"),
+                                                            ("Team:", "quickswap", "2000")}
+    assert all(row[0].startswith(row[12] + "_") for row in rows)
+
+
+def test_sweep_keeps_scripts_when_asked(fake_gcsim, tmp_path, monkeypatch):
+    test_src_dir = Path(__file__).parent
+    shutil.copy(test_src_dir / "ChevSaraBen.txt", tmp_path)
+    shutil.copy(test_src_dir / "same_character.yaml", tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setattr(sys, "argv", ["gcsim-sweep", "ChevSaraBen.txt", "same_character.yaml", "out.csv",
+                                      "--no-cache", "--output_directory", "audit"])
+    sweep.main()
+
+    assert len(list(Path("audit").rglob("*.txt"))) == 14
+
+
+def test_sweep_only_resims_changed_variants(fake_gcsim, tmp_path, monkeypatch):
+    test_src_dir = Path(__file__).parent
+    # Optimizing rewrites each variant in place, as gcsim does
+    (tmp_path / "ChevSaraBen.txt").write_text("# fake_substats\n" + (test_src_dir / "ChevSaraBen.txt").read_text())
+    shutil.copy(test_src_dir / "same_character.yaml", tmp_path)
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    argv = ["gcsim-sweep", "ChevSaraBen.txt", "same_character.yaml", "out.csv", "--output_directory", "audit",
+            "--cache-directory", "cache"]
+
+    rebuilds = 0
+    first_sims = []
+
+    def sims():
+        return [line for line in calls.read_text().splitlines() if "-out" in line]
+
+    class Stop(BaseException):
+        pass
+
+    def fake_watch(paths, rebuild, poll_seconds=0):
+        nonlocal rebuilds
+        for edit in (None, "- artifact_set: [no]\n  weapons:\n  - favoniussword\n"):
+            if edit is not None:
+                with open("same_character.yaml", "a") as f:
+                    f.write(edit)
+            rebuild()
+            rebuilds += 1
+            first_sims[:] = first_sims or sims()
+        raise Stop()
+
+    monkeypatch.setattr(sweep, "watch", fake_watch)
+    monkeypatch.setattr(sys, "argv", argv + ["--watch"])
+    with pytest.raises(Stop):
+        sweep.main()
+
+    assert rebuilds == 2
+    # Every distinct variant the first time, then only the new weapon at R1 and R5
+    assert len(sims()) == len(first_sims) + 2
+    assert all("favoniussword" in line for line in sims()[len(first_sims):])
+    with open("out.csv", newline='') as f:
+        assert len(list(csv.reader(f))) == 16
+
+
+
+def test_failed_rebuild_keeps_scripts_and_results(fake_gcsim, tmp_path, monkeypatch):
+    test_src_dir = Path(__file__).parent
+    shutil.copy(test_src_dir / "ChevSaraBen.txt", tmp_path)
+    shutil.copy(test_src_dir / "same_character.yaml", tmp_path)
+    monkeypatch.chdir(tmp_path)
+    argv = ["gcsim-sweep", "ChevSaraBen.txt", "same_character.yaml", "out.csv", "--output_directory", "audit",
+            "--cache-directory", "cache"]
+
+    def fake_watch(paths, rebuild, poll_seconds=0):
+        rebuild()
+        # An editor saving by writing a new file and renaming it over the old one
+        Path("same_character.yaml").rename("same_character.yaml~")
+        with pytest.raises(FileNotFoundError):
+            rebuild()
+
+    monkeypatch.setattr(sweep, "watch", fake_watch)
+    monkeypatch.setattr(sys, "argv", argv + ["--watch"])
+    sweep.main()
+
+    assert len(list(Path("audit").rglob("*.txt"))) == 14
+    with open("out.csv", newline='') as f:
+        assert len(list(csv.reader(f))) == 14
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith(".gcsim-sweep-")] == []
+
+
+def test_watch_waits_for_inputs_to_settle(tmp_path):
+    watched = tmp_path / "script.txt"
+    watched.write_text("a")
+    builds = []
+
+    class Stop(BaseException):
+        pass
+
+    def rebuild():
+        builds.append(watched.read_text())
+        if len(builds) == 1:
+            watched.write_text("bb")
+        else:
+            raise Stop()
+
+    with pytest.raises(Stop):
+        sweep.watch([watched], rebuild, poll_seconds=0.01)
+    assert builds == ["a", "bb"]
@@ -0,0 +1,105 @@
+import csv
+from pathlib import Path
+
+import pytest
+
+from gcsim_batcher.results import DPSSummary, OptimizerResult
+from gcsim_batcher.run import RunOptions
+from gcsim_batcher.schedule import DurationHistory
+from gcsim_batcher.tournament import TournamentSettings, eliminate, run_tournament
+
+
+def _result(dps: float, std: float) -> OptimizerResult:
+    return OptimizerResult(config_file=Path("x.txt"), returncode=0, summary=DPSSummary(0, 0, dps, 0, 0, std))
+
+
+def test_eliminate_keeps_leaders_and_close_candidates():
+    results = [_result(1000, 100), _result(990, 100), _result(940, 100), _result(500, 100),
+               OptimizerResult(config_file=Path("failed.txt"), returncode=1)]
+    # Standard error is 10 at 100 iterations, so the 2nd best's interval starts at 960
+    assert eliminate(results, 100, TournamentSettings(keep=2, confidence=3)) == {3, 4}
+    assert eliminate(results, 100, TournamentSettings(keep=4)) == {4}
+
+
+def test_run_tournament(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = []
+    for i, dps in enumerate([1000, 400, 990, 100]):
+        config = tmp_path / f"candidate_{i}.txt"
+        config.write_text(f"# fake_dps={dps}\noptions iteration=1000;\nbennett add weapon=\"a\" refine=1 lvl=90/90;\n")
+        configs.append(config)
+
+    csv_path = tmp_path / "out.csv"
+    results = run_tournament(configs, csv_path, TournamentSettings(rounds=(10,), keep=2), jobs=2,
+                             options=RunOptions())
+
+    assert [result.summary.dps for result in results] == [1000, 400, 990, 100]
+    with open(csv_path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert [row[0] for row in rows] == [f"candidate_{i}" for i in range(4)]
+    assert [row[12] for row in rows] == ["", "1", "", "1"]
+    assert "iteration=10;" in (tmp_path / "out_tournament" / "round_1" / "candidate_1.txt").read_text()
+
+
+def test_run_tournament_optimizes_substats_once(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    configs = []
+    for i, dps in enumerate([1000, 990, 400, 100]):
+        config = tmp_path / f"candidate_{i}.txt"
+        config.write_text(f"# fake_dps={dps}\noptions iteration=1000;\nbennett add weapon=\"a\" refine=1 lvl=90/90;\n")
+        configs.append(config)
+
+    results = run_tournament(configs, tmp_path / "out.csv", TournamentSettings(rounds=(10, 20), keep=1), jobs=2,
+                             options=RunOptions())
+
+    assert all(result.ok for result in results)
+    assert [result.config_file for result in results] == configs
+    assert (tmp_path / "out_tournament" / "round_2" / "candidate_0.txt").exists()
+    assert "iteration=1000;" in (tmp_path / "out_tournament" / "final" / "candidate_0.txt").read_text()
+    assert sum("-substatOptimFull" in line for line in calls.read_text().splitlines()) == 4
+
+
+def _candidates(directory, dps_values, extra=""):
+    configs = []
+    for i, dps in enumerate(dps_values):
+        config = directory / f"candidate_{i}.txt"
+        config.write_text(f"{extra}# fake_dps={dps}\noptions iteration=1000;\n"
+                          "bennett add weapon=\"a\" refine=1 lvl=90/90;\n")
+        configs.append(config)
+    return configs
+
+
+def test_tournament_rounds_are_left_out_of_the_history(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = _candidates(tmp_path, [1000, 990, 400, 100])
+    history = DurationHistory(tmp_path / "durations.json")
+
+    run_tournament(configs, tmp_path / "out.csv", TournamentSettings(rounds=(10,), keep=1), jobs=2,
+                   options=RunOptions(history=history))
+
+    assert [history.expected(config) is not None for config in configs] == [True, True, False, False]
+
+
+def test_run_tournament_resumes_without_repeating_work(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("FAKE_GCSIM_CALLS", str(calls))
+    configs = _candidates(tmp_path, [1000, 990, 400, 100], extra="# fake_substats\n")
+    csv_path = tmp_path / "out.csv"
+    settings = TournamentSettings(rounds=(10, 20), keep=1)
+
+    run_tournament(configs, csv_path, settings, jobs=2, options=RunOptions())
+    calls.unlink()
+    run_tournament(configs, csv_path, settings, jobs=2, options=RunOptions(), resume=True)
+
+    assert not calls.exists()
+    with open(csv_path, newline='') as f:
+        assert [row[0] for row in csv.reader(f)] == [f"candidate_{i}" for i in range(4)]
+    assert "bennett add stats" in (tmp_path / "out_tournament" / "round_1" / "candidate_0.txt").read_text()
+
+
+def test_tournament_must_keep_a_leader():
+    with pytest.raises(ValueError):
+        TournamentSettings(keep=0)
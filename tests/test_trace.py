@@ -0,0 +1,31 @@
+import json
+from pathlib import Path
+
+from gcsim_batcher.run import RunOptions, run_batch
+from gcsim_batcher.trace import Tracer
+
+
+def test_run_batch_traces_each_stage(fake_gcsim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs = []
+    for i in range(2):
+        config = tmp_path / f"config_{i}.txt"
+        config.write_text(f"# fake_dps={100 + i}\n# fake_delay={0.05 * (i + 1)}\nbennett add weapon=\"a\" refine=1 lvl=90/90;\n")
+        configs.append(config)
+
+    tracer = Tracer(tmp_path / "trace.jsonl", tmp_path / "trace.json")
+    run_batch(iter(configs), tmp_path / "out.csv", jobs=2, options=RunOptions(tracer=tracer))
+    tracer.close()
+
+    spans = [json.loads(line) for line in (tmp_path / "trace.jsonl").read_text().splitlines()]
+    for config in ("config_0", "config_1"):
+        stages = {span["stage"] for span in spans if span["config"] == config}
+        assert stages == {"generate", "optimize", "sim", "parse", "write"}
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert len(events) == len(spans)
+    assert all(event["ph"] == "X" for event in events)
+
+    summary = tracer.summary(slowest=1)
+    assert "optimize" in summary
+    assert summary.splitlines()[-1].startswith("  config_1:")
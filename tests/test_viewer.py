@@ -0,0 +1,62 @@
+import gzip
+import json
+
+import pytest
+
+from gcsim_batcher import viewer
+from gcsim_batcher.results import CharacterStats, DPSSummary, OptimizerResult
+from gcsim_batcher.viewer import (read_character_stats, read_summary_sidecar,
+                                  write_summary_sidecar)
+
+
+VIEWER = {
+    "config_file": "a \"quoted\" \\ string with {braces} and [brackets]\n",
+    "character_details": [
+        {"talents": {"attack": 9}, "name": "bennett", "sets": {"no": 4}},
+        {"name": "xiangling", "weapon": {"name": "the \"catch\"", "refine": 5}},
+    ],
+    "statistics": {
+        "iterations": 1000,
+        "character_dps": [
+            {"min": 1.0, "max": 3.0, "mean": 2.0, "sd": 0.5},
+            {"min": 10.0, "max": 30.0, "mean": 20.0, "sd": 5.0},
+        ],
+        "damage_buckets": [[i, -i * 2.5e-3, None, True, False] for i in range(5000)],
+    },
+}
+
+EXPECTED = [CharacterStats("bennett", 1.0, 3.0, 2.0, 0.5), CharacterStats("xiangling", 10.0, 30.0, 20.0, 5.0)]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_read_character_stats_plain(tmp_path, monkeypatch, indent):
+    # Small chunks so that tokens straddle chunk boundaries
+    monkeypatch.setattr(viewer, "_CHUNK_SIZE", 7)
+    path = tmp_path / "viewer.json"
+    path.write_text(json.dumps(VIEWER, indent=indent))
+    assert read_character_stats(path) == EXPECTED
+
+
+def test_read_character_stats_gzip(tmp_path):
+    path = tmp_path / "viewer.json.gz"
+    with gzip.open(path, "wt") as f:
+        json.dump(VIEWER, f)
+    assert read_character_stats(path) == EXPECTED
+
+
+def test_read_character_stats_malformed(tmp_path):
+    path = tmp_path / "viewer.json"
+    path.write_text(json.dumps(VIEWER)[:-100])
+    assert read_character_stats(path) == []
+    assert read_character_stats(tmp_path / "missing.json") == []
+
+
+def test_summary_sidecar_round_trip(tmp_path):
+    result = OptimizerResult(config_file=tmp_path / "a.txt",
+                             returncode=0,
+                             output_file=tmp_path / "a.json.gz",
+                             summary=DPSSummary(1, 2, 3, 4, 5, 6),
+                             characters=EXPECTED)
+    write_summary_sidecar(result)
+    assert (tmp_path / "a.summary.json").exists()
+    assert read_summary_sidecar(result.output_file) == result